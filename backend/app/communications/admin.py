@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import EmailAttachment, InboundEmail, OutboundEmail, ParseError
+from .models import EmailAttachment, InboundEmail, MailboxSyncState, OutboundEmail, ParseError
 
 
 class EmailAttachmentInline(admin.TabularInline):
@@ -45,3 +45,9 @@ class ParseErrorAdmin(admin.ModelAdmin):
     list_display = ("id", "created_at", "code", "inbound_email")
     list_filter = ("code", "created_at")
     search_fields = ("message", "inbound_email__subject", "inbound_email__message_id")
+
+
+@admin.register(MailboxSyncState)
+class MailboxSyncStateAdmin(admin.ModelAdmin):
+    list_display = ("id", "mailbox", "folder", "uidvalidity", "last_uid", "last_synced_at")
+    readonly_fields = ("updated_at",)
@@ -0,0 +1,349 @@
+from __future__ import annotations
+
+import email
+import hashlib
+import imaplib
+import re
+import select
+import ssl
+import time
+from dataclasses import dataclass
+from datetime import date, timedelta
+from email.header import decode_header
+from email.utils import parsedate_to_datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from communications.models import EmailAttachment, InboundEmail, MailboxSyncState
+
+
+REQUIRED_SETTINGS = ("MAILBOX_EMAIL", "MAILBOX_PASSWORD", "IMAP_HOST", "IMAP_PORT", "IMAP_FOLDER")
+
+_FETCH_UID_RE = re.compile(rb"\bUID (\d+)")
+_EXISTS_RE = re.compile(rb"^\* \d+ EXISTS")
+# IMAP dates use English month names whatever the locale (RFC 3501 date-text).
+_IMAP_MONTHS = ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+
+
+class ImapSyncError(Exception):
+    pass
+
+
+@dataclass
+class SyncResult:
+    uidvalidity: int
+    last_uid: int
+    processed: int = 0
+    created: int = 0
+    skipped: int = 0
+    resynced: bool = False
+
+
+def missing_imap_settings() -> list[str]:
+    return [name for name in REQUIRED_SETTINGS if not getattr(settings, name, None)]
+
+
+def connect_imap():
+    if settings.IMAP_USE_SSL:
+        imap = imaplib.IMAP4_SSL(settings.IMAP_HOST, settings.IMAP_PORT)
+    else:
+        imap = imaplib.IMAP4(settings.IMAP_HOST, settings.IMAP_PORT)
+    imap.login(settings.MAILBOX_EMAIL, settings.MAILBOX_PASSWORD)
+    return imap
+
+
+def select_folder(imap, folder: str) -> int:
+    """SELECT the folder and return its UIDVALIDITY."""
+    status, _ = imap.select(folder)
+    if status != "OK":
+        raise ImapSyncError(f"IMAP select {folder} failed")
+    _, data = imap.response("UIDVALIDITY")
+    try:
+        return int(data[0])
+    except (TypeError, ValueError, IndexError):
+        raise ImapSyncError(f"IMAP server sent no UIDVALIDITY for {folder}")
+
+
+def sync_mailbox(
+    imap,
+    *,
+    mailbox: str,
+    folder: str,
+    limit: int = 50,
+    batch_size: int = 20,
+    mark_seen: bool = False,
+) -> SyncResult:
+    """
+    Store messages with UIDs above the folder's checkpoint, oldest first, at most `limit` per call.
+
+    Messages are fetched with BODY.PEEK[] in UID batches, so reading them does not change \\Seen
+    and staff reading the mailbox does not hide anything. The checkpoint advances after each
+    batch; a crash in between only refetches that batch, which Message-ID dedupe absorbs.
+    Without a valid checkpoint (first run, or UIDVALIDITY changed so old UIDs are meaningless)
+    one is seeded by seed_checkpoint() instead of importing the folder from UID 1.
+    """
+    uidvalidity = select_folder(imap, folder)
+    state, _ = MailboxSyncState.objects.get_or_create(mailbox=mailbox, folder=folder)
+    result = SyncResult(uidvalidity=uidvalidity, last_uid=state.last_uid)
+    if state.uidvalidity != uidvalidity:
+        result.resynced = state.uidvalidity is not None
+        result.last_uid = seed_checkpoint(imap, state)
+        MailboxSyncState.objects.filter(pk=state.pk).update(uidvalidity=uidvalidity, last_uid=result.last_uid)
+
+    uids = search_uids_after(imap, result.last_uid)[:limit]
+    for start in range(0, len(uids), batch_size):
+        batch = uids[start : start + batch_size]
+        for uid, raw_bytes in fetch_messages(imap, batch):
+            result.processed += 1
+            if store_inbound_message(raw_bytes, mailbox=mailbox):
+                result.created += 1
+            else:
+                result.skipped += 1
+        if mark_seen:
+            imap.uid("STORE", _uid_set(batch), "+FLAGS", "\\Seen")
+        # UIDs missing from the FETCH response were expunged meanwhile; skip past them too.
+        result.last_uid = batch[-1]
+        MailboxSyncState.objects.filter(pk=state.pk, uidvalidity=uidvalidity).update(
+            last_uid=Greatest("last_uid", Value(result.last_uid))
+        )
+
+    MailboxSyncState.objects.filter(pk=state.pk).update(last_synced_at=timezone.now())
+    return result
+
+
+def seed_checkpoint(imap, state: MailboxSyncState) -> int:
+    """
+    Checkpoint (last UID treated as done) for a folder without a valid one.
+
+    First run: just below the oldest unseen message, which is what the UNSEEN-based fetch
+    used to pick up, so already-read history is not imported. After a UIDVALIDITY change:
+    just below the oldest message since the last sync (minus a day), which dedupe covers.
+    Both look back at most RETENTION_EMAIL_DAYS: older mail may have been deleted from
+    InboundEmail and would no longer be deduped. With nothing to pick up, the checkpoint is
+    the highest UID in the folder.
+    """
+    since = None
+    if settings.RETENTION_EMAIL_DAYS > 0:
+        since = timezone.localdate() - timedelta(days=settings.RETENTION_EMAIL_DAYS)
+    if state.uidvalidity is not None and state.last_synced_at is not None:
+        last_sync = timezone.localdate(state.last_synced_at) - timedelta(days=1)
+        since = max(since, last_sync) if since else last_sync
+        criteria = ["SINCE", _imap_date(since)]
+    else:
+        criteria = ["UNSEEN"] + (["SINCE", _imap_date(since)] if since else [])
+
+    uids = _search_uids(imap, *criteria)
+    if uids:
+        return min(uids) - 1
+    return max(_search_uids(imap, "UID", "*"), default=0)
+
+
+def supports_idle(imap) -> bool:
+    return "IDLE" in imap.capabilities
+
+
+def idle_wait(imap, timeout: float) -> bool:
+    """
+    IDLE (RFC 2177) on the selected folder until the server reports EXISTS or `timeout` passes.
+
+    Returns True when new mail arrived. Responses are read with imaplib's own reader, but only
+    after select() (or already buffered input) says a line is there, so the timeout never hits
+    a blocking read and the connection stays usable.
+    """
+    tag = imap._new_tag()
+    imap.tagged_commands.pop(tag, None)
+    imap.send(tag + b" IDLE\r\n")
+    line = _idle_readline(imap)
+    if not line.startswith(b"+"):
+        raise ImapSyncError(f"IMAP IDLE refused: {line.strip()!r}")
+
+    changed = False
+    deadline = time.monotonic() + timeout
+    while not changed:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0 or not _wait_readable(imap, remaining):
+            break
+        changed = bool(_EXISTS_RE.match(_idle_readline(imap)))
+
+    imap.send(b"DONE\r\n")
+    while True:
+        line = _idle_readline(imap)
+        if line.startswith(tag + b" "):
+            if not line.startswith(tag + b" OK"):
+                raise ImapSyncError(f"IMAP IDLE failed: {line.strip()!r}")
+            return changed
+        changed = changed or bool(_EXISTS_RE.match(line))
+
+
+def search_uids_after(imap, last_uid: int) -> list[int]:
+    # "N:*" always matches the highest UID, even when it is below N.
+    return [uid for uid in _search_uids(imap, "UID", f"{last_uid + 1}:*") if uid > last_uid]
+
+
+def fetch_messages(imap, uids: list[int]) -> list[tuple[int, bytes]]:
+    status, data = imap.uid("FETCH", _uid_set(uids), "(UID BODY.PEEK[])")
+    if status != "OK":
+        raise ImapSyncError("IMAP UID FETCH failed")
+    messages = []
+    pending = None
+    for item in data or []:
+        if isinstance(item, tuple):
+            match = _FETCH_UID_RE.search(item[0])
+            pending = [int(match.group(1)) if match else None, item[1]]
+            messages.append(pending)
+        elif pending is not None and pending[0] is None and isinstance(item, bytes):
+            # Some servers send UID after the literal: b" UID 42)".
+            match = _FETCH_UID_RE.search(item)
+            pending[0] = int(match.group(1)) if match else None
+    return sorted((uid, raw) for uid, raw in messages if uid is not None)
+
+
+def store_inbound_message(raw_bytes: bytes, *, mailbox: str) -> InboundEmail | None:
+    """Store one RFC 822 message; returns None when its Message-ID is already stored."""
+    message = email.message_from_bytes(raw_bytes)
+
+    normalized_message_id = (message.get("Message-ID") or "").strip()
+    if not normalized_message_id:
+        # Content hash keeps dedupe stable across runs and UIDVALIDITY resyncs.
+        normalized_message_id = f"missing:{hashlib.sha256(raw_bytes).hexdigest()}"
+
+    if InboundEmail.objects.filter(message_id=normalized_message_id).exists():
+        return None
+
+    body_text, body_html, attachments = extract_parts(message)
+
+    with transaction.atomic():
+        inbound = InboundEmail.objects.create(
+            source="imap",
+            message_id=normalized_message_id,
+            mailbox=mailbox,
+            sender=decode_header_value(message.get("From", "")),
+            subject=decode_header_value(message.get("Subject", "")),
+            received_at=parse_received_at(message.get("Date")),
+            body_text=body_text,
+            body_html=body_html,
+            raw_headers=str(message),
+        )
+        EmailAttachment.objects.bulk_create(
+            [
+                EmailAttachment(
+                    inbound_email=inbound,
+                    filename=a["filename"],
+                    content_type=a["content_type"],
+                    size_bytes=a["size_bytes"],
+                )
+                for a in attachments
+            ]
+        )
+    return inbound
+
+
+def decode_header_value(value: str) -> str:
+    parts = decode_header(value)
+    decoded = []
+    for payload, encoding in parts:
+        if isinstance(payload, bytes):
+            decoded.append(payload.decode(encoding or "utf-8", errors="replace"))
+        else:
+            decoded.append(payload)
+    return "".join(decoded).strip()
+
+
+def parse_received_at(value: str | None):
+    if not value:
+        return None
+    try:
+        return parsedate_to_datetime(value)
+    except Exception:
+        return None
+
+
+def extract_parts(message):
+    body_text = ""
+    body_html = ""
+    attachments = []
+
+    if message.is_multipart():
+        for part in message.walk():
+            content_disposition = (part.get("Content-Disposition") or "").lower()
+            content_type = part.get_content_type()
+            filename = part.get_filename()
+
+            if filename:
+                payload = part.get_payload(decode=True) or b""
+                attachments.append(
+                    {
+                        "filename": decode_header_value(filename),
+                        "content_type": content_type,
+                        "size_bytes": len(payload),
+                    }
+                )
+                continue
+
+            if "attachment" in content_disposition:
+                continue
+
+            payload = part.get_payload(decode=True)
+            if payload is None:
+                continue
+            charset = part.get_content_charset() or "utf-8"
+            decoded_payload = payload.decode(charset, errors="replace")
+
+            if content_type == "text/plain" and not body_text:
+                body_text = decoded_payload
+            elif content_type == "text/html" and not body_html:
+                body_html = decoded_payload
+    else:
+        payload = message.get_payload(decode=True) or b""
+        charset = message.get_content_charset() or "utf-8"
+        decoded_payload = payload.decode(charset, errors="replace")
+        if message.get_content_type() == "text/html":
+            body_html = decoded_payload
+        else:
+            body_text = decoded_payload
+
+    return body_text, body_html, attachments
+
+
+def _idle_readline(imap) -> bytes:
+    line = imap.readline()
+    if not line or line.startswith(b"* BYE"):
+        raise imaplib.IMAP4.abort(f"IMAP connection closed during IDLE: {line.strip()!r}")
+    return line
+
+
+def _wait_readable(imap, timeout: float) -> bool:
+    return _has_buffered_input(imap) or bool(select.select([imap.sock], [], [], timeout)[0])
+
+
+def _has_buffered_input(imap) -> bool:
+    # imaplib's buffered reader (and the TLS layer) may already hold the next line, which
+    # select() on the socket cannot see. A non-blocking peek finds it without consuming it.
+    sock = imap.sock
+    previous = sock.gettimeout()
+    sock.setblocking(False)
+    try:
+        return bool(imap.file.peek(1))
+    except (BlockingIOError, ssl.SSLWantReadError):
+        return False
+    finally:
+        sock.settimeout(previous)
+
+
+def _search_uids(imap, *criteria: str) -> list[int]:
+    status, data = imap.uid("SEARCH", *criteria)
+    if status != "OK":
+        raise ImapSyncError(f"IMAP UID SEARCH {' '.join(criteria)} failed")
+    return sorted(int(token) for token in (data[0] or b"").split())
+
+
+def _imap_date(value: date) -> str:
+    return f"{value.day}-{_IMAP_MONTHS[value.month - 1]}-{value.year}"
+
+
+def _uid_set(uids: list[int]) -> str:
+    return ",".join(str(uid) for uid in uids)
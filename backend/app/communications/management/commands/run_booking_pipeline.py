@@ -1,7 +1,19 @@
+import imaplib
 import time
 
+from django.conf import settings
 from django.core.management import call_command
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, close_old_connections
+
+from communications.imap_sync import (
+    ImapSyncError,
+    connect_imap,
+    idle_wait,
+    missing_imap_settings,
+    supports_idle,
+    sync_mailbox,
+)
 
 
 class Command(BaseCommand):
@@ -25,6 +37,22 @@ class Command(BaseCommand):
             default=False,
             help="Run a single iteration and exit (useful for cron).",
         )
+        parser.add_argument(
+            "--idle",
+            action="store_true",
+            default=False,
+            help=(
+                "Keep one IMAP connection open and wake on new mail (IMAP IDLE). "
+                "Servers without IDLE are polled every --interval seconds on the same connection."
+            ),
+        )
+        parser.add_argument(
+            "--idle-timeout",
+            type=int,
+            default=540,
+            help="Seconds before IDLE is re-issued (and a catch-up sync runs); keep below 29 minutes.",
+        )
+        parser.add_argument("--max-backoff", type=int, default=300, help="Max seconds between reconnect attempts.")
 
     def handle(self, *args, **options):
         interval = max(5, int(options["interval"] or 60))
@@ -35,6 +63,19 @@ class Command(BaseCommand):
         once = bool(options["once"])
         only_pending = not bool(options["include_non_pending"])
 
+        if options["idle"] and not once:
+            self._run_idle(
+                interval=interval,
+                idle_timeout=max(30, int(options["idle_timeout"] or 540)),
+                max_backoff=max(1, int(options["max_backoff"] or 300)),
+                fetch_limit=fetch_limit,
+                process_limit=process_limit,
+                mark_seen=mark_seen,
+                only_pending=only_pending,
+                dry_run=dry_run,
+            )
+            return
+
         while True:
             try:
                 self.stdout.write("booking-pipeline: fetch_booking_emails ...")
@@ -43,19 +84,89 @@ class Command(BaseCommand):
                 # Keep the loop alive; IMAP issues shouldn't kill the worker.
                 self.stderr.write(f"booking-pipeline: fetch failed: {e}")
 
-            try:
-                self.stdout.write("booking-pipeline: process_booking_emails ...")
-                cmd_args = ["process_booking_emails", "--limit", str(process_limit)]
-                if only_pending:
-                    cmd_args.append("--only-pending")
-                if dry_run:
-                    cmd_args.append("--dry-run")
-                call_command(*cmd_args)
-            except Exception as e:
-                self.stderr.write(f"booking-pipeline: process failed: {e}")
+            self._process(process_limit=process_limit, only_pending=only_pending, dry_run=dry_run)
 
             if once:
                 return
 
             time.sleep(interval)
 
+    def _process(self, *, process_limit, only_pending, dry_run):
+        try:
+            self.stdout.write("booking-pipeline: process_booking_emails ...")
+            cmd_args = ["process_booking_emails", "--limit", str(process_limit)]
+            if only_pending:
+                cmd_args.append("--only-pending")
+            if dry_run:
+                cmd_args.append("--dry-run")
+            call_command(*cmd_args)
+        except Exception as e:
+            self.stderr.write(f"booking-pipeline: process failed: {e}")
+
+    def _run_idle(self, *, interval, idle_timeout, max_backoff, fetch_limit, process_limit, mark_seen, only_pending, dry_run):
+        missing = missing_imap_settings()
+        if missing:
+            raise CommandError(f"Missing IMAP settings: {', '.join(missing)}")
+
+        backoff = 1
+        while True:
+            imap = None
+            try:
+                imap = connect_imap()
+                idle = supports_idle(imap)
+                if not idle:
+                    self.stdout.write(f"booking-pipeline: server has no IDLE, polling every {interval}s")
+                while True:
+                    # The worker lives for days on one DB connection; drop it when broken or expired.
+                    close_old_connections()
+                    try:
+                        self._sync(imap, fetch_limit=fetch_limit, mark_seen=mark_seen)
+                    except DatabaseError as e:
+                        # The IMAP side is fine; retry on the same connection once the database is back.
+                        self.stderr.write(f"booking-pipeline: database error during fetch: {e}; retrying in {backoff}s")
+                        time.sleep(backoff)
+                        backoff = min(backoff * 2, max_backoff)
+                        imap.noop()
+                        continue
+                    backoff = 1
+                    close_old_connections()
+                    self._process(process_limit=process_limit, only_pending=only_pending, dry_run=dry_run)
+                    if idle:
+                        idle_wait(imap, idle_timeout)
+                    else:
+                        time.sleep(interval)
+                        imap.noop()
+            except (imaplib.IMAP4.error, ImapSyncError, OSError) as e:
+                # IMAP4.abort/readonly are IMAP4.error subclasses; socket and TLS errors are OSError.
+                self.stderr.write(f"booking-pipeline: IMAP connection failed: {e}; reconnecting in {backoff}s")
+                time.sleep(backoff)
+                backoff = min(backoff * 2, max_backoff)
+            except Exception as e:
+                # Keep the worker alive, as the polling loop does; start over on a fresh connection.
+                self.stderr.write(f"booking-pipeline: fetch failed: {e}; reconnecting in {backoff}s")
+                time.sleep(backoff)
+                backoff = min(backoff * 2, max_backoff)
+            finally:
+                if imap is not None:
+                    try:
+                        imap.logout()
+                    except Exception:
+                        pass
+
+    def _sync(self, imap, *, fetch_limit, mark_seen):
+        # Drain everything above the checkpoint, fetch_limit messages per round.
+        while True:
+            result = sync_mailbox(
+                imap,
+                mailbox=settings.MAILBOX_EMAIL,
+                folder=settings.IMAP_FOLDER,
+                limit=fetch_limit,
+                mark_seen=mark_seen,
+            )
+            if result.processed:
+                self.stdout.write(
+                    f"booking-pipeline: fetched processed={result.processed} created={result.created} "
+                    f"skipped={result.skipped} last_uid={result.last_uid}"
+                )
+            if result.processed < fetch_limit:
+                return
@@ -0,0 +1,25 @@
+# Generated by Django 6.0.2 on 2026-10-16 23:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('communications', '0003_inboundemail_parsed_payload'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='emailattachment',
+            index=models.Index(fields=['created_at'], name='emailattachment_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inboundemail',
+            index=models.Index(fields=['created_at'], name='inboundemail_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='parseerror',
+            index=models.Index(fields=['created_at'], name='parseerror_created_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 6.0.2 on 2026-10-16 23:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('communications', '0004_retention_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MailboxSyncState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mailbox', models.EmailField(max_length=254)),
+                ('folder', models.CharField(max_length=255)),
+                ('uidvalidity', models.BigIntegerField(blank=True, null=True)),
+                ('last_uid', models.BigIntegerField(default=0)),
+                ('last_synced_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'IMAP sinkronizacija',
+                'verbose_name_plural': 'IMAP sinkronizacije',
+                'ordering': ['mailbox', 'folder'],
+                'constraints': [models.UniqueConstraint(fields=('mailbox', 'folder'), name='mailboxsyncstate_mailbox_folder_uniq')],
+            },
+        ),
+    ]
@@ -33,6 +33,9 @@ class InboundEmail(models.Model):
         ordering = ["-received_at", "-id"]
         verbose_name = "Dolazni email"
         verbose_name_plural = "Dolazni emailovi"
+        indexes = [
+            models.Index(fields=["created_at"], name="inboundemail_created_idx"),
+        ]
 
     def __str__(self) -> str:
         return f"{self.subject or '(no subject)'} [{self.message_id}]"
@@ -76,6 +79,9 @@ class EmailAttachment(models.Model):
         ordering = ["inbound_email_id", "id"]
         verbose_name = "Privitak emaila"
         verbose_name_plural = "Privitci emaila"
+        indexes = [
+            models.Index(fields=["created_at"], name="emailattachment_created_idx"),
+        ]
 
     def __str__(self) -> str:
         return self.filename
@@ -96,6 +102,31 @@ class ParseError(models.Model):
         ordering = ["-created_at", "-id"]
         verbose_name = "Greska parsiranja"
         verbose_name_plural = "Greske parsiranja"
+        indexes = [
+            models.Index(fields=["created_at"], name="parseerror_created_idx"),
+        ]
 
     def __str__(self) -> str:
         return f"{self.code}: {self.message[:60]}"
+
+
+class MailboxSyncState(models.Model):
+    """IMAP checkpoint per mailbox/folder: UIDs up to last_uid are stored (valid while uidvalidity matches)."""
+
+    mailbox = models.EmailField()
+    folder = models.CharField(max_length=255)
+    uidvalidity = models.BigIntegerField(null=True, blank=True)
+    last_uid = models.BigIntegerField(default=0)
+    last_synced_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["mailbox", "folder"]
+        verbose_name = "IMAP sinkronizacija"
+        verbose_name_plural = "IMAP sinkronizacije"
+        constraints = [
+            models.UniqueConstraint(fields=["mailbox", "folder"], name="mailboxsyncstate_mailbox_folder_uniq"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.mailbox}/{self.folder} uid>{self.last_uid}"
@@ -5,11 +5,17 @@ from decimal import Decimal
 from django.utils.dateparse import parse_date
 
 from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
 
 from communications.booking_parser import BookingParseException, parse_booking_email
 from communications.models import InboundEmail, ParseError, ParseStatus
 from reception.booking_import import status_from_booking_kind, upsert_reservation_from_booking_payload
-from reception.models import Reservation, ReservationStatus
+from reception.changes import record_changes
+from reception.models import ChangeEntity, Reservation, ReservationStatus
+from rooms.allocation import lock_allocation_room_types
+from rooms.occupancy import refresh_room_occupancy
+from rooms.public_cache import bump_public_data_version
 from rooms.services import canonical_room_info, preferred_room_code_from_parsed_room_name
 
 
@@ -73,10 +79,16 @@ def process_booking_inbound_email(*, inbound_email_id: int, dry_run: bool = Fals
 
         # Cancellation emails can apply to multi-room bookings; cancel all reservations for this booking.
         if status == ReservationStatus.CANCELED:
-            Reservation.objects.filter(external_id=payload.booking_number).update(status=ReservationStatus.CANCELED)
-            Reservation.objects.filter(external_id__startswith=f"{payload.booking_number}-").update(
-                status=ReservationStatus.CANCELED
+            booking_reservations = Reservation.objects.filter(
+                Q(external_id=payload.booking_number) | Q(external_id__startswith=f"{payload.booking_number}-")
             )
+            affected = list(booking_reservations.values_list("id", "room_id"))
+            booking_reservations.update(status=ReservationStatus.CANCELED, updated_at=timezone.now())
+            # Bulk update skips model signals; keep the room occupancy index, change feed and
+            # public response version in sync explicitly.
+            refresh_room_occupancy(room_id for _, room_id in affected)
+            record_changes(ChangeEntity.RESERVATION, [reservation_id for reservation_id, _ in affected])
+            bump_public_data_version()
 
             inbound.parse_status = ParseStatus.PARSED
             inbound.save(update_fields=["parsed_payload", "parse_status", "parse_note", "updated_at"])
@@ -95,6 +107,7 @@ def process_booking_inbound_email(*, inbound_email_id: int, dry_run: bool = Fals
         reservation_ids: list[int] = []
         primary_guest_ids: list[int] = []
 
+        planned = []
         for idx, item in enumerate(room_items):
             external_id = payload.booking_number if idx == 0 else f"{payload.booking_number}-{idx + 1}"
             parsed_room_name = (item.get("room_name") or "").strip() or payload.room_name
@@ -103,7 +116,15 @@ def process_booking_inbound_email(*, inbound_email_id: int, dry_run: bool = Fals
                 parsed_room_name=parsed_room_name,
                 fallback_room_name=payload.property_name,
             )
+            planned.append((external_id, item, preferred_code, room_type, room_name))
 
+        # Each room is allocated separately below; take every room-type lock of the booking
+        # now, in one sorted order, so concurrent multi-room imports cannot deadlock.
+        lock_allocation_room_types(
+            (room_type.id if room_type else None, preferred_code) for _, _, preferred_code, room_type, _ in planned
+        )
+
+        for external_id, item, preferred_code, room_type, room_name in planned:
             amount = None
             raw_amount = item.get("amount")
             if raw_amount:
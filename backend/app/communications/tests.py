@@ -1,3 +1,383 @@
-from django.test import TestCase
+import socket
+import threading
+from datetime import datetime, timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.management import call_command
+from django.db import OperationalError
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from communications.imap_sync import idle_wait, sync_mailbox
+from communications.models import EmailAttachment, InboundEmail, MailboxSyncState, ParseError
+from config.retention import RETENTION_POLICIES, apply_policy
+from reception.models import ChangeEntity, ChangeLog
+
+
+def _policy(name):
+    return next(policy for policy in RETENTION_POLICIES if policy.name == name)
+
+
+@override_settings(
+    RETENTION_EMAIL_BODY_DAYS=90,
+    RETENTION_EMAIL_DAYS=365,
+    RETENTION_PARSE_ERROR_DAYS=365,
+    RETENTION_CHANGE_LOG_DAYS=30,
+)
+class RetentionTests(TestCase):
+    def _email(self, message_id, age_days):
+        email = InboundEmail.objects.create(
+            message_id=message_id,
+            mailbox="booking@example.com",
+            body_text="text",
+            body_html="<p>html</p>",
+            raw_headers="From: noreply@booking.com",
+        )
+        EmailAttachment.objects.create(inbound_email=email, filename="a.pdf", content=b"%PDF", size_bytes=4)
+        ParseError.objects.create(inbound_email=email, code="x", message="y")
+        created_at = timezone.now() - timedelta(days=age_days)
+        InboundEmail.objects.filter(pk=email.pk).update(created_at=created_at)
+        EmailAttachment.objects.filter(inbound_email=email).update(created_at=created_at)
+        ParseError.objects.filter(inbound_email=email).update(created_at=created_at)
+        return email
+
+    def test_compacts_old_bodies_in_batches_and_keeps_recent(self):
+        old = [self._email(f"<old-{i}@x>", 120) for i in range(3)]
+        recent = self._email("<recent@x>", 10)
+
+        self.assertEqual(apply_policy(_policy("email_bodies"), batch_size=2), 3)
+        self.assertEqual(apply_policy(_policy("email_attachment_content"), batch_size=2), 3)
+        # Already compacted rows are not touched again.
+        self.assertEqual(apply_policy(_policy("email_bodies")), 0)
+
+        for email in old:
+            email.refresh_from_db()
+            self.assertEqual((email.body_text, email.body_html, email.raw_headers), ("", "", ""))
+            self.assertIsNone(email.attachments.get().content)
+        recent.refresh_from_db()
+        self.assertEqual(recent.body_text, "text")
+        self.assertIsNotNone(recent.attachments.get().content)
+
+    def test_deletes_expired_emails_with_their_rows(self):
+        expired = self._email("<expired@x>", 400)
+        kept = self._email("<kept@x>", 120)
+
+        self.assertEqual(apply_policy(_policy("emails"), dry_run=True), 1)
+        self.assertTrue(InboundEmail.objects.filter(pk=expired.pk).exists())
+
+        self.assertEqual(apply_policy(_policy("emails")), 1)
+        self.assertEqual(list(InboundEmail.objects.values_list("pk", flat=True)), [kept.pk])
+        self.assertEqual(EmailAttachment.objects.count(), 1)
+        self.assertEqual(ParseError.objects.count(), 1)
+
+    def test_change_log_and_disabled_policy(self):
+        ChangeLog.objects.create(entity=ChangeEntity.RESERVATION, entity_id=1)
+        ChangeLog.objects.create(entity=ChangeEntity.RESERVATION, entity_id=2)
+        ChangeLog.objects.filter(entity_id=1).update(created_at=timezone.now() - timedelta(days=31))
+
+        with override_settings(RETENTION_CHANGE_LOG_DAYS=0):
+            self.assertEqual(apply_policy(_policy("change_log")), 0)
+        self.assertEqual(apply_policy(_policy("change_log")), 1)
+        self.assertEqual(list(ChangeLog.objects.values_list("entity_id", flat=True)), [2])
+
+    def test_command(self):
+        self._email("<expired@x>", 400)
+        out = StringIO()
+        call_command("apply_retention", "--dry-run", "--policy", "emails", stdout=out)
+        self.assertIn("emails: expired=1", out.getvalue())
+        self.assertEqual(InboundEmail.objects.count(), 1)
+
+        out = StringIO()
+        call_command("apply_retention", "--batch-size", "1", stdout=out)
+        self.assertIn("email_bodies: compacted=1", out.getvalue())
+        self.assertIn("emails: deleted=1", out.getvalue())
+        self.assertFalse(InboundEmail.objects.exists())
+
+
+def _raw_message(message_id, subject="Nova rezervacija"):
+    headers = f"Message-ID: {message_id}\r\n" if message_id else ""
+    return (
+        f"{headers}From: noreply@booking.com\r\nSubject: {subject}\r\n"
+        "Date: Fri, 16 Oct 2026 10:00:00 +0000\r\nContent-Type: text/plain\r\n\r\nBody\r\n"
+    ).encode()
+
+
+class FakeImap:
+    """Just enough of imaplib.IMAP4 for UID SEARCH/FETCH/STORE against one folder."""
+
+    def __init__(self, messages, uidvalidity=1, capabilities=("IMAP4REV1", "IDLE"), seen=(), dates=None):
+        self.messages = dict(messages)
+        self.uidvalidity = uidvalidity
+        self.capabilities = capabilities
+        self.fetched = []
+        self.seen = set(seen)
+        # Internal (arrival) dates; messages arrived today unless given.
+        self.dates = dates or {}
+
+    def select(self, folder):
+        return "OK", [str(len(self.messages)).encode()]
+
+    def response(self, code):
+        return code, [str(self.uidvalidity).encode()]
+
+    def _search(self, criteria):
+        uids = sorted(self.messages)
+        while criteria:
+            key = criteria.pop(0)
+            if key == "UID":
+                spec = criteria.pop(0)
+                if spec == "*":
+                    uids = uids[-1:]
+                else:
+                    start = int(spec.split(":")[0])
+                    uids = [uid for uid in uids if uid >= start] or uids[-1:]
+            elif key == "UNSEEN":
+                uids = [uid for uid in uids if uid not in self.seen]
+            elif key == "SINCE":
+                since = datetime.strptime(criteria.pop(0), "%d-%b-%Y").date()
+                uids = [uid for uid in uids if self.dates.get(uid, timezone.localdate()) >= since]
+            else:
+                raise AssertionError(key)
+        return uids
+
+    def uid(self, command, *args):
+        if command == "SEARCH":
+            return "OK", [" ".join(str(uid) for uid in self._search(list(args))).encode()]
+        if command == "FETCH":
+            uids = [int(uid) for uid in args[0].split(",")]
+            self.fetched.append(uids)
+            data = []
+            for seq, uid in enumerate(uids, start=1):
+                if uid in self.messages:
+                    raw = self.messages[uid]
+                    data += [(f"{seq} (UID {uid} BODY[] {{{len(raw)}}}".encode(), raw), b")"]
+            return "OK", data
+        if command == "STORE":
+            self.seen.update(int(uid) for uid in args[0].split(","))
+            return "OK", []
+        raise AssertionError(command)
+
+    def noop(self):
+        return "OK", []
+
+    def logout(self):
+        return "BYE", []
+
+
+class MailboxSyncTests(TestCase):
+    def _sync(self, imap, **kwargs):
+        return sync_mailbox(imap, mailbox="booking@example.com", folder="INBOX", **kwargs)
+
+    def test_fetches_only_uids_above_checkpoint_in_batches(self):
+        imap = FakeImap({uid: _raw_message(f"<m{uid}@x>") for uid in (3, 4, 7, 9, 12)})
+
+        result = self._sync(imap, limit=4, batch_size=2)
+        self.assertEqual((result.processed, result.created, result.last_uid), (4, 4, 9))
+        self.assertEqual(imap.fetched, [[3, 4], [7, 9]])
+        self.assertEqual(imap.seen, set())
+
+        result = self._sync(imap, batch_size=2)
+        self.assertEqual((result.created, result.last_uid), (1, 12))
+        self.assertEqual(imap.fetched[-1], [12])
+
+        # Nothing new: "13:*" still returns UID 12, which must not be refetched.
+        result = self._sync(imap)
+        self.assertEqual((result.processed, result.last_uid), (0, 12))
+        self.assertEqual(len(imap.fetched), 3)
+
+        imap.messages[15] = _raw_message("<m15@x>")
+        result = self._sync(imap, mark_seen=True)
+        self.assertEqual((result.created, result.last_uid), (1, 15))
+        self.assertEqual(imap.seen, {15})
+
+        state = MailboxSyncState.objects.get(mailbox="booking@example.com", folder="INBOX")
+        self.assertEqual((state.uidvalidity, state.last_uid), (1, 15))
+        self.assertIsNotNone(state.last_synced_at)
+        self.assertEqual(InboundEmail.objects.count(), 6)
+
+    @override_settings(RETENTION_EMAIL_DAYS=365)
+    def test_first_run_skips_read_history(self):
+        today = timezone.localdate()
+        imap = FakeImap(
+            {uid: _raw_message(f"<m{uid}@x>") for uid in range(1, 8)},
+            seen={2, 3, 5, 6},
+            # UID 1 is unread too, but older than retention: never imported.
+            dates={1: today - timedelta(days=600), 2: today - timedelta(days=500), 4: today - timedelta(days=30)},
+        )
+
+        result = self._sync(imap)
+        # Oldest unseen message within retention is UID 4; everything after it is fetched.
+        self.assertEqual(imap.fetched, [[4, 5, 6, 7]])
+        self.assertEqual((result.created, result.last_uid), (4, 7))
+
+    def test_first_run_with_everything_read_starts_at_the_top(self):
+        imap = FakeImap({uid: _raw_message(f"<m{uid}@x>") for uid in (3, 9)}, seen={3, 9})
+        result = self._sync(imap)
+        self.assertEqual((result.processed, result.last_uid), (0, 9))
+
+        imap.messages[10] = _raw_message("<m10@x>")
+        self.assertEqual(self._sync(imap).created, 1)
+        self.assertEqual(imap.fetched, [[10]])
+
+    def test_uidvalidity_change_resyncs_with_message_id_dedupe(self):
+        self._sync(FakeImap({10: _raw_message("<a@x>"), 11: _raw_message(None)}))
+
+        # Folder recreated: same messages renumbered, plus one new.
+        imap = FakeImap({1: _raw_message("<a@x>"), 2: _raw_message(None), 3: _raw_message("<b@x>")}, uidvalidity=2)
+        result = self._sync(imap)
+
+        self.assertTrue(result.resynced)
+        self.assertEqual((result.processed, result.created, result.skipped), (3, 1, 2))
+        self.assertEqual(imap.fetched, [[1, 2, 3]])
+        state = MailboxSyncState.objects.get()
+        self.assertEqual((state.uidvalidity, state.last_uid), (2, 3))
+        self.assertEqual(InboundEmail.objects.count(), 3)
+
+
+class SocketImap:
+    """The imaplib.IMAP4 internals idle_wait uses, over one end of a socket pair."""
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.file = sock.makefile("rb")
+        self.tagged_commands = {}
+
+    def _new_tag(self):
+        self.tagged_commands[b"A1"] = None
+        return b"A1"
+
+    def send(self, data):
+        self.sock.sendall(data)
+
+    def readline(self):
+        return self.file.readline()
+
+
+class ImapIdleTests(TestCase):
+    def setUp(self):
+        client, self.server = socket.socketpair()
+        self.imap = SocketImap(client)
+        self.server_file = self.server.makefile("rb")
+        self.addCleanup(client.close)
+        self.addCleanup(self.server.close)
+
+    def _serve(self, before_done, after_done=b""):
+        def run():
+            assert self.server_file.readline() == b"A1 IDLE\r\n"
+            self.server.sendall(before_done)
+            assert self.server_file.readline() == b"DONE\r\n"
+            self.server.sendall(after_done + b"A1 OK IDLE terminated\r\n")
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        self.addCleanup(thread.join)
+
+    def test_wakes_on_exists(self):
+        # Continuation and EXISTS in one segment: the second line sits in imaplib's buffer.
+        self._serve(b"+ idling\r\n* 1 RECENT\r\n* 4 EXISTS\r\n")
+        self.assertTrue(idle_wait(self.imap, timeout=5))
+        self.assertEqual(self.imap.tagged_commands, {})
+
+    def test_timeout_ends_idle_and_keeps_connection_usable(self):
+        self._serve(b"+ idling\r\n", after_done=b"* 5 EXISTS\r\n")
+        self.assertTrue(idle_wait(self.imap, timeout=0.1))
+
+    def test_timeout_without_new_mail(self):
+        self._serve(b"+ idling\r\n")
+        self.assertFalse(idle_wait(self.imap, timeout=0.1))
+
+
+class _Stop(BaseException):
+    pass
+
+
+@override_settings(
+    MAILBOX_EMAIL="booking@example.com",
+    MAILBOX_PASSWORD="x",
+    IMAP_HOST="imap.example.com",
+    IMAP_PORT=993,
+    IMAP_FOLDER="INBOX",
+)
+class BookingPipelineIdleTests(TestCase):
+    command = "communications.management.commands.run_booking_pipeline"
+
+    def setUp(self):
+        # Closing the connection would break TestCase's wrapping transaction.
+        patcher = mock.patch(f"{self.command}.close_old_connections")
+        self.close_old_connections = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_reconnects_with_backoff_and_polls_without_idle(self):
+        imap = FakeImap({1: _raw_message("<a@x>")}, capabilities=("IMAP4REV1",))
+        sleeps = []
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            if len(sleeps) == 4:
+                raise _Stop
+
+        with (
+            mock.patch(f"{self.command}.connect_imap", side_effect=[OSError("down"), OSError("down"), imap]),
+            mock.patch(f"{self.command}.time.sleep", side_effect=sleep),
+            mock.patch(f"{self.command}.call_command") as call,
+            self.assertRaises(_Stop),
+        ):
+            call_command("run_booking_pipeline", "--idle", "--interval", "30", stdout=StringIO(), stderr=StringIO())
+
+        self.assertEqual(sleeps, [1, 2, 30, 30])
+        self.assertEqual(InboundEmail.objects.get().message_id, "<a@x>")
+        self.assertEqual(call.call_args_list[0].args, ("process_booking_emails", "--limit", "50", "--only-pending"))
+
+    def test_idle_wakes_sync_on_same_connection(self):
+        imap = FakeImap({1: _raw_message("<a@x>")})
+
+        def idle(conn, timeout):
+            self.assertIs(conn, imap)
+            if 2 in imap.messages:
+                raise _Stop
+            imap.messages[2] = _raw_message("<b@x>")
+            return True
+
+        with (
+            mock.patch(f"{self.command}.connect_imap", return_value=imap) as connect,
+            mock.patch(f"{self.command}.idle_wait", side_effect=idle),
+            mock.patch(f"{self.command}.call_command"),
+            self.assertRaises(_Stop),
+        ):
+            call_command("run_booking_pipeline", "--idle", stdout=StringIO(), stderr=StringIO())
+
+        connect.assert_called_once()
+        self.assertEqual(imap.fetched, [[1], [2]])
+        self.assertEqual(InboundEmail.objects.count(), 2)
+
+    def test_database_errors_do_not_stop_the_worker(self):
+        imap = FakeImap({1: _raw_message("<a@x>")})
+        failures = [OperationalError("server closed the connection"), RuntimeError("bug")]
+        sleeps = []
+
+        def sync(*args, **kwargs):
+            if failures:
+                raise failures.pop(0)
+            return sync_mailbox(*args, **kwargs)
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            if len(sleeps) > 2:
+                raise _Stop
+
+        with (
+            mock.patch(f"{self.command}.connect_imap", return_value=imap) as connect,
+            mock.patch(f"{self.command}.sync_mailbox", side_effect=sync),
+            mock.patch(f"{self.command}.idle_wait", side_effect=_Stop),
+            mock.patch(f"{self.command}.time.sleep", side_effect=sleep),
+            mock.patch(f"{self.command}.call_command"),
+            self.assertRaises(_Stop),
+        ):
+            call_command("run_booking_pipeline", "--idle", stdout=StringIO(), stderr=StringIO())
+
+        # The DB error retries on the same IMAP connection; anything else reconnects.
+        self.assertEqual(sleeps, [1, 2])
+        self.assertEqual(connect.call_count, 2)
+        self.assertGreaterEqual(self.close_old_connections.call_count, 4)
+        self.assertEqual(InboundEmail.objects.count(), 1)
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from config.retention import RETENTION_POLICIES, apply_policy
+
+
+class Command(BaseCommand):
+    help = "Compact or delete expired email, OCR and change-feed rows according to the RETENTION_* settings."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--policy", action="append", default=None, help="Only this policy (repeatable).")
+        parser.add_argument("--batch-size", type=int, default=1000, help="Rows per statement/transaction.")
+        parser.add_argument("--dry-run", action="store_true", default=False, help="Only count expired rows.")
+
+    def handle(self, *args, **options):
+        policies = RETENTION_POLICIES
+        if options["policy"]:
+            known = {policy.name for policy in RETENTION_POLICIES}
+            unknown = sorted(set(options["policy"]) - known)
+            if unknown:
+                raise CommandError(f"Unknown policy: {', '.join(unknown)} (known: {', '.join(sorted(known))})")
+            policies = [policy for policy in RETENTION_POLICIES if policy.name in options["policy"]]
+
+        for policy in policies:
+            if policy.days <= 0:
+                self.stdout.write(f"{policy.name}: disabled")
+                continue
+            count = apply_policy(policy, batch_size=max(1, options["batch_size"]), dry_run=options["dry_run"])
+            action = "expired" if options["dry_run"] else "compacted" if policy.compact else "deleted"
+            self.stdout.write(f"{policy.name}: {action}={count} (older than {policy.days} days)")
+        self.stdout.write(self.style.SUCCESS("retention done"))
@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+
+@dataclass(frozen=True)
+class RetentionPolicy:
+    """
+    Rows of `model` whose `date_field` is older than settings.<days_setting> days are either
+    deleted (with their cascades) or, when `compact` is given, have those fields reset.
+    `pending` narrows compaction to rows not compacted yet, so reruns touch nothing.
+    0 days disables the policy.
+    """
+
+    name: str
+    model: str
+    date_field: str
+    days_setting: str
+    compact: dict = field(default_factory=dict)
+    pending: Q = field(default_factory=Q)
+
+    @property
+    def days(self) -> int:
+        return int(getattr(settings, self.days_setting))
+
+    def expired(self, now: datetime):
+        model = apps.get_model(self.model)
+        cutoff = now - timedelta(days=self.days)
+        return model.objects.filter(self.pending, **{f"{self.date_field}__lt": cutoff})
+
+
+RETENTION_POLICIES = [
+    RetentionPolicy(
+        name="email_bodies",
+        model="communications.InboundEmail",
+        date_field="created_at",
+        days_setting="RETENTION_EMAIL_BODY_DAYS",
+        compact={"body_text": "", "body_html": "", "raw_headers": ""},
+        pending=~Q(body_text="") | ~Q(body_html="") | ~Q(raw_headers=""),
+    ),
+    RetentionPolicy(
+        name="email_attachment_content",
+        model="communications.EmailAttachment",
+        date_field="created_at",
+        days_setting="RETENTION_EMAIL_BODY_DAYS",
+        compact={"content": None},
+        pending=Q(content__isnull=False),
+    ),
+    RetentionPolicy(
+        name="emails",
+        model="communications.InboundEmail",
+        date_field="created_at",
+        days_setting="RETENTION_EMAIL_DAYS",
+    ),
+    RetentionPolicy(
+        name="parse_errors",
+        model="communications.ParseError",
+        date_field="created_at",
+        days_setting="RETENTION_PARSE_ERROR_DAYS",
+    ),
+    RetentionPolicy(
+        name="ocr_payloads",
+        model="reception.OcrScanPayload",
+        date_field="scan__created_at",
+        days_setting="RETENTION_OCR_PAYLOAD_DAYS",
+    ),
+    RetentionPolicy(
+        name="ocr_inline_payloads",
+        model="reception.OcrScanLog",
+        date_field="created_at",
+        days_setting="RETENTION_OCR_PAYLOAD_DAYS",
+        compact={"raw_payload": {}},
+        pending=~Q(raw_payload={}),
+    ),
+    RetentionPolicy(
+        name="ocr_logs",
+        model="reception.OcrScanLog",
+        date_field="created_at",
+        days_setting="RETENTION_OCR_LOG_DAYS",
+    ),
+    RetentionPolicy(
+        name="change_log",
+        model="reception.ChangeLog",
+        date_field="created_at",
+        days_setting="RETENTION_CHANGE_LOG_DAYS",
+    ),
+]
+
+
+def apply_policy(policy: RetentionPolicy, *, now: datetime | None = None, batch_size: int = 1000, dry_run: bool = False) -> int:
+    """
+    Apply one policy in primary-key batches; returns the number of rows compacted or deleted.
+
+    Each batch is one UPDATE (or one DELETE plus its cascade DELETEs) over at most
+    `batch_size` ids picked through the date index, in its own transaction, so long runs
+    neither hold locks nor build huge cascades.
+    """
+    if policy.days <= 0:
+        return 0
+    expired = policy.expired(now or timezone.now())
+    if dry_run:
+        return expired.count()
+
+    model = expired.model
+    total = 0
+    while True:
+        ids = list(expired.order_by("pk").values_list("pk", flat=True)[:batch_size])
+        if not ids:
+            return total
+        with transaction.atomic():
+            batch = model.objects.filter(pk__in=ids)
+            if policy.compact:
+                batch.update(**policy.compact)
+            else:
+                batch.delete()
+        total += len(ids)
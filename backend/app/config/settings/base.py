@@ -27,6 +27,8 @@ CSRF_TRUSTED_ORIGINS = [
 ]
 
 INSTALLED_APPS = [
+    # ASGI runserver, needed for the reception event stream.
+    "daphne",
     "django.contrib.admin",
     "django.contrib.auth",
     "django.contrib.contenttypes",
@@ -71,6 +73,9 @@ TEMPLATES = [
 WSGI_APPLICATION = "config.wsgi.application"
 ASGI_APPLICATION = "config.asgi.application"
 
+# Benchmarks (@tag("bench")) are left out of `manage.py test`; run them with `--tag bench`.
+TEST_RUNNER = "config.test_runner.TestRunner"
+
 DATABASES = {
     "default": {
         "ENGINE": env("DB_ENGINE", "django.db.backends.postgresql"),
@@ -119,6 +124,36 @@ SPECTACULAR_SETTINGS = {
     "VERSION": "1.0.0",
 }
 
+# Materialized nightly rates (rooms.RoomRateDay) are kept this many days ahead.
+ROOM_RATE_HORIZON_DAYS = int(env("ROOM_RATE_HORIZON_DAYS", "540"))
+
+# Max physical rooms per public availability combo recommendation.
+BOOKING_COMBO_MAX_ROOMS = int(env("BOOKING_COMBO_MAX_ROOMS", "3"))
+
+# Room reallocation (rooms.reallocation): look-ahead window and the shortest stay worth selling,
+# free runs shorter than this between two stays count as unsellable gaps.
+REALLOCATION_HORIZON_DAYS = int(env("REALLOCATION_HORIZON_DAYS", "365"))
+REALLOCATION_MIN_SELLABLE_NIGHTS = int(env("REALLOCATION_MIN_SELLABLE_NIGHTS", "2"))
+
+# Public availability/calendar responses: server-side cache TTL and Cache-Control max-age (seconds).
+# Entries are keyed by data version, so the TTL only bounds memory use, not staleness.
+PUBLIC_RESPONSE_CACHE_SECONDS = int(env("PUBLIC_RESPONSE_CACHE_SECONDS", "300"))
+PUBLIC_CACHE_MAX_AGE = int(env("PUBLIC_CACHE_MAX_AGE", "0"))
+
+# Reception event stream (reception.events): change feed poll interval and SSE keepalive (seconds).
+RECEPTION_EVENTS_POLL_SECONDS = float(env("RECEPTION_EVENTS_POLL_SECONDS", "1"))
+RECEPTION_EVENTS_HEARTBEAT_SECONDS = float(env("RECEPTION_EVENTS_HEARTBEAT_SECONDS", "15"))
+
+# Retention (config.retention, `manage.py apply_retention`), in days; 0 keeps rows forever.
+# Email bodies/headers/attachment content and OCR raw payloads are compacted earlier than metadata rows.
+RETENTION_EMAIL_BODY_DAYS = int(env("RETENTION_EMAIL_BODY_DAYS", "90"))
+RETENTION_EMAIL_DAYS = int(env("RETENTION_EMAIL_DAYS", "365"))
+RETENTION_PARSE_ERROR_DAYS = int(env("RETENTION_PARSE_ERROR_DAYS", "365"))
+RETENTION_OCR_PAYLOAD_DAYS = int(env("RETENTION_OCR_PAYLOAD_DAYS", "90"))
+RETENTION_OCR_LOG_DAYS = int(env("RETENTION_OCR_LOG_DAYS", "365"))
+# Change feed clients whose cursor predates the oldest kept entry get 410 and must resync.
+RETENTION_CHANGE_LOG_DAYS = int(env("RETENTION_CHANGE_LOG_DAYS", "30"))
+
 # Mail / IMAP configuration (M2)
 MAILBOX_EMAIL = env("MAILBOX_EMAIL", "")
 MAILBOX_PASSWORD = env("MAILBOX_PASSWORD", "")
@@ -0,0 +1,13 @@
+from django.test.runner import DiscoverRunner
+
+
+BENCH_TAG = "bench"
+
+
+class TestRunner(DiscoverRunner):
+    """Django's runner, except that @tag("bench") tests only run when asked for (`--tag bench`)."""
+
+    def __init__(self, *args, tags=None, exclude_tags=None, **kwargs):
+        if not tags or BENCH_TAG not in tags:
+            exclude_tags = {*(exclude_tags or ()), BENCH_TAG}
+        super().__init__(*args, tags=tags, exclude_tags=exclude_tags, **kwargs)
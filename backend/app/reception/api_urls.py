@@ -1,8 +1,12 @@
 from django.urls import path
 
 from .views import (
+    OcrScanLogDetailView,
     OcrScanLogListView,
     OcrScanStatsView,
+    ReceptionChangesView,
+    ReceptionDashboardView,
+    ReceptionEventsView,
     ReceptionHealthView,
     ReservationDetailView,
     ReservationGuestDetailView,
@@ -12,6 +16,9 @@ from .views import (
 
 urlpatterns = [
     path("health/", ReceptionHealthView.as_view(), name="api-reception-health"),
+    path("changes/", ReceptionChangesView.as_view(), name="api-reception-changes"),
+    path("events/", ReceptionEventsView.as_view(), name="api-reception-events"),
+    path("dashboard/", ReceptionDashboardView.as_view(), name="api-reception-dashboard"),
     path("reservations/", ReservationTimelineListView.as_view(), name="api-reservations-list"),
     path("reservations/<int:pk>/", ReservationDetailView.as_view(), name="api-reservations-detail"),
     path(
@@ -25,5 +32,6 @@ urlpatterns = [
         name="api-reservation-guest-ocr",
     ),
     path("ocr/logs/", OcrScanLogListView.as_view(), name="api-ocr-logs"),
+    path("ocr/logs/<int:pk>/", OcrScanLogDetailView.as_view(), name="api-ocr-log-detail"),
     path("ocr/stats/", OcrScanStatsView.as_view(), name="api-ocr-stats"),
 ]
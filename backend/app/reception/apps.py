@@ -5,3 +5,6 @@ class ReceptionConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "reception"
     verbose_name = "Recepcija"
+
+    def ready(self):
+        from reception import signals  # noqa: F401
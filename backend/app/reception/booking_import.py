@@ -3,9 +3,10 @@ from __future__ import annotations
 from dataclasses import dataclass
 from datetime import date
 
+from django.core.exceptions import ValidationError
 from django.db import transaction
 
-from reception.models import Guest, Reservation, ReservationStatus
+from reception.models import ROOM_OVERLAP_CODE, Guest, Reservation, ReservationStatus
 from rooms.allocation import assign_room_for_reservation
 from rooms.models import RoomType
 
@@ -75,8 +76,19 @@ def upsert_reservation_from_booking_payload(
     if currency and reservation.currency != currency:
         reservation.currency = currency
         changed = True
+    if preferred_room_code and reservation.preferred_room_code != preferred_room_code:
+        reservation.preferred_room_code = preferred_room_code
+        changed = True
     if changed:
-        reservation.save()
+        try:
+            reservation.save()
+        except ValidationError as exc:
+            room_errors = getattr(exc, "error_dict", {}).get("room", [])
+            if not any(error.code == ROOM_OVERLAP_CODE for error in room_errors):
+                raise
+            # Modified dates overlap another stay in the assigned room; let allocation pick a unit again.
+            reservation.room = None
+            reservation.save()
 
     first_name, last_name = _split_name(guest_full_name)
     primary_guest_id: int | None = None
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+from typing import Iterable
+
+from django.db import connection
+from django.db.models import Q
+
+from reception.models import ChangeLog
+
+
+def record_changes(entity: str, ids: Iterable[int | None], *, created: bool = False, deleted: bool = False) -> None:
+    """Append feed entries for the given rows, in the caller's transaction."""
+    ids = sorted({entity_id for entity_id in ids if entity_id})
+    if ids:
+        ChangeLog.objects.bulk_create(
+            [ChangeLog(entity=entity, entity_id=entity_id, created=created, deleted=deleted) for entity_id in ids]
+        )
+
+
+def encode_cursor(txid: int, change_id: int) -> str:
+    return f"{txid}-{change_id}"
+
+
+def decode_cursor(cursor: str) -> tuple[int, int]:
+    """Parse a feed cursor; raises ValueError when malformed."""
+    txid, change_id = cursor.split("-")
+    return int(txid), int(change_id)
+
+
+def committed_watermark() -> int:
+    # Every transaction with a lower id has finished, so no entry below it can still appear.
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT txid_snapshot_xmin(txid_current_snapshot())")
+        return cursor.fetchone()[0]
+
+
+def _committed_entries(cursor: tuple[int, int] | None):
+    qs = ChangeLog.objects.filter(txid__lt=committed_watermark())
+    if cursor is not None:
+        txid, change_id = cursor
+        qs = qs.filter(Q(txid__gt=txid) | Q(txid=txid, id__gt=change_id))
+    return qs
+
+
+def cursor_expired(cursor: tuple[int, int]) -> bool:
+    """
+    Whether entries after `cursor` may have been pruned by retention (RETENTION_CHANGE_LOG_DAYS).
+
+    True when the cursor sorts before the oldest retained entry, or nothing is retained at all;
+    such a client can no longer catch up from the feed (it could miss tombstones) and has to
+    reload its data and start from a fresh cursor.
+    """
+    oldest = ChangeLog.objects.order_by("txid", "id").values_list("txid", "id").first()
+    return oldest is None or cursor < oldest
+
+
+def latest_cursor() -> tuple[int, int] | None:
+    """Cursor of the newest committed entry (the live edge of the feed)."""
+    return _committed_entries(None).order_by("-txid", "-id").values_list("txid", "id").first()
+
+
+def entries_since(cursor: tuple[int, int] | None, *, limit: int) -> list[tuple[int, int, str, int, bool, bool]]:
+    """Up to `limit` committed entries after `cursor` as (txid, id, entity, entity_id, created, deleted)."""
+    return list(
+        _committed_entries(cursor)
+        .order_by("txid", "id")
+        .values_list("txid", "id", "entity", "entity_id", "created", "deleted")[:limit]
+    )
+
+
+def changes_since(
+    cursor: tuple[int, int] | None, *, limit: int
+) -> tuple[dict[tuple[str, int], bool], tuple[int, int] | None, bool]:
+    """
+    Entries after `cursor`, ordered by (txid, id) and limited to transactions below the watermark.
+
+    Sequence ids are taken at insert time and commit out of order, so a plain id cursor could
+    skip a slow transaction's entries. Ordering by writing transaction and holding back every
+    transaction that might still be running makes the cursor monotonic: anything that commits
+    later sorts after it. Returns {(entity, id): deleted} (last action wins), the next cursor
+    (unchanged when nothing new) and whether more entries are ready.
+    """
+    rows = entries_since(cursor, limit=limit + 1)
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    changes: dict[tuple[str, int], bool] = {}
+    for _, _, entity, entity_id, _, deleted in rows:
+        changes.pop((entity, entity_id), None)
+        changes[(entity, entity_id)] = deleted
+    next_cursor = (rows[-1][0], rows[-1][1]) if rows else cursor
+    return changes, next_cursor, has_more
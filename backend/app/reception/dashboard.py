@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+from datetime import date
+
+from django.db.models import Prefetch, Q
+
+from reception.models import Guest, Reservation, ReservationStatus
+from rooms.models import Room
+
+
+def _window_flags(reservation: Reservation, date_from: date, date_to: date) -> dict[str, bool]:
+    # Days are inclusive; a stay is in house on a day when it occupies that night.
+    arrival = date_from <= reservation.check_in_date <= date_to
+    departure = date_from <= reservation.check_out_date <= date_to
+    in_house = reservation.check_in_date <= date_to and reservation.check_out_date > date_from
+    return {
+        "arrivals": arrival,
+        "departures": departure,
+        "in_house": in_house,
+        "stay_overs": in_house and not arrival and not departure,
+    }
+
+
+def front_desk_dashboard(*, date_from: date, date_to: date) -> dict:
+    """
+    Arrivals, departures, stay-overs and in-house stays for the days [date_from, date_to].
+
+    The stays touching the window are one query plus one guest prefetch; all counts (totals,
+    per status, per room) are tallied from that list, and canceled stays only show up in
+    `by_status`. Active rooms are one more query. Returns reservation objects under
+    `arrivals`/`departures`/`stay_overs` for the caller to serialize.
+    """
+    touching = (
+        Q(check_in_date__gte=date_from, check_in_date__lte=date_to)
+        | Q(check_out_date__gte=date_from, check_out_date__lte=date_to)
+        | Q(check_in_date__lte=date_to, check_out_date__gt=date_from)
+    )
+    reservations = (
+        Reservation.objects.filter(touching)
+        .prefetch_related(Prefetch("guests", queryset=Guest.objects.order_by("-is_primary", "id")))
+        .order_by("check_in_date", "room_name", "id")
+    )
+
+    keys = ("arrivals", "departures", "in_house", "stay_overs")
+    counts = {key: 0 for key in keys}
+    counts["unassigned"] = 0
+    by_status = {value: 0 for value in ReservationStatus.values}
+    per_room: dict[int, dict[str, int]] = {}
+    lists: dict[str, list[Reservation]] = {"arrivals": [], "departures": [], "stay_overs": []}
+    for reservation in reservations:
+        by_status[reservation.status] += 1
+        if reservation.status == ReservationStatus.CANCELED:
+            continue
+        flags = _window_flags(reservation, date_from, date_to)
+        for key, flag in flags.items():
+            if not flag:
+                continue
+            counts[key] += 1
+            if key in lists:
+                lists[key].append(reservation)
+            if reservation.room_id is not None:
+                per_room.setdefault(reservation.room_id, {k: 0 for k in keys})[key] += 1
+        if reservation.room_id is None and flags["in_house"]:
+            counts["unassigned"] += 1
+    counts["by_status"] = by_status
+
+    rooms = [
+        {"room_id": room_id, "room_code": code, **per_room.get(room_id, {key: 0 for key in keys})}
+        for room_id, code in Room.objects.filter(is_active=True).order_by("code").values_list("id", "code")
+    ]
+    return {"counts": counts, "rooms": rooms, **lists}
@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from dataclasses import dataclass
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+from reception.changes import cursor_expired, encode_cursor, entries_since, latest_cursor
+from reception.models import ChangeEntity, OcrScanLog, Reservation, ReservationStatus
+
+
+EVENT_BATCH = 500
+# Longest pause between polls while the database keeps failing (seconds).
+POLL_MAX_BACKOFF = 30
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ReceptionEvent:
+    cursor: tuple[int, int]
+    name: str
+    data: dict
+
+    def encode(self) -> str:
+        # `id` is the change feed cursor, so EventSource resumes via Last-Event-ID.
+        payload = json.dumps(self.data, separators=(",", ":"), default=str)
+        return f"id: {encode_cursor(*self.cursor)}\nevent: {self.name}\ndata: {payload}\n\n"
+
+
+def _reservation_event(reservation: Reservation | None, reservation_id: int, created: bool, deleted: bool) -> tuple[str, dict]:
+    if deleted or reservation is None:
+        return "reservation.deleted", {"id": reservation_id}
+    if reservation.status == ReservationStatus.CANCELED:
+        name = "reservation.canceled"
+    else:
+        name = "reservation.created" if created else "reservation.modified"
+    return name, {
+        "id": reservation.id,
+        "external_id": reservation.external_id,
+        "status": reservation.status,
+        "room": reservation.room_id,
+        "check_in_date": reservation.check_in_date,
+        "check_out_date": reservation.check_out_date,
+        "guests_count": reservation.guests_count,
+        "primary_guest_name": reservation.primary_guest_name,
+    }
+
+
+def events_since(cursor: tuple[int, int] | None) -> tuple[list[ReceptionEvent], tuple[int, int] | None]:
+    """
+    Reception events for committed changes after `cursor`, and the cursor to continue from.
+
+    Reservation entries collapse to one event per reservation (latest state, "created" if any
+    entry in the batch created it); guest entries surface through their reservation's entry.
+    """
+    rows = entries_since(cursor, limit=EVENT_BATCH)
+    if not rows:
+        return [], cursor
+
+    reservation_rows: dict[int, tuple[tuple[int, int], bool, bool]] = {}
+    scan_rows: dict[int, tuple[int, int]] = {}
+    for txid, change_id, entity, entity_id, created, deleted in rows:
+        if entity == ChangeEntity.RESERVATION:
+            was_created = reservation_rows.pop(entity_id, (None, False, False))[1]
+            reservation_rows[entity_id] = ((txid, change_id), was_created or created, deleted)
+        elif entity == ChangeEntity.OCR_SCAN and created:
+            scan_rows[entity_id] = (txid, change_id)
+
+    reservations = Reservation.objects.in_bulk(list(reservation_rows))
+    scans = OcrScanLog.objects.in_bulk(list(scan_rows))
+    events = []
+    for reservation_id, (row_cursor, created, deleted) in reservation_rows.items():
+        name, data = _reservation_event(reservations.get(reservation_id), reservation_id, created, deleted)
+        events.append(ReceptionEvent(row_cursor, name, data))
+    for scan_id, row_cursor in scan_rows.items():
+        scan = scans.get(scan_id)
+        if scan is not None:
+            data = {
+                "id": scan.id,
+                "reservation": scan.reservation_id,
+                "guest": scan.guest_id,
+                "provider": scan.provider,
+                "status": scan.status,
+            }
+            events.append(ReceptionEvent(row_cursor, "ocr.completed", data))
+    events.sort(key=lambda event: event.cursor)
+    return events, (rows[-1][0], rows[-1][1])
+
+
+class ReceptionEventBroadcaster:
+    """
+    In-process fan-out of reception events to connected streams.
+
+    One polling task per process reads the change feed (which also carries writes from other
+    processes, e.g. the booking worker) and hands each event to every subscriber queue, so
+    the database sees one small query per poll interval however many clients are connected.
+    The task runs only while someone is subscribed. A subscriber that falls too far behind
+    gets None and should reconnect (and resume from its Last-Event-ID). Failed polls are
+    logged and retried with backoff from the same cursor, so nothing is skipped.
+    """
+
+    queue_size = 1000
+
+    def __init__(self):
+        self.subscribers: set[asyncio.Queue] = set()
+        self.cursor: tuple[int, int] | None = None
+        self.task: asyncio.Task | None = None
+
+    async def subscribe(self) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        if self.task is None or self.task.done() or self.task.get_loop() is not asyncio.get_running_loop():
+            self.cursor = await sync_to_async(latest_cursor)()
+            self.task = asyncio.create_task(self._run())
+        self.subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        self.subscribers.discard(queue)
+
+    async def _run(self) -> None:
+        delay = settings.RECEPTION_EVENTS_POLL_SECONDS
+        while self.subscribers:
+            try:
+                events, self.cursor = await sync_to_async(_poll)(self.cursor)
+            except Exception:
+                logger.exception("Reception event poll failed; retrying in %ss", delay)
+                await asyncio.sleep(delay)
+                delay = min(max(delay, 0.1) * 2, POLL_MAX_BACKOFF)
+                continue
+            delay = settings.RECEPTION_EVENTS_POLL_SECONDS
+            for event in events:
+                self._publish(event)
+            if len(events) < EVENT_BATCH:
+                await asyncio.sleep(settings.RECEPTION_EVENTS_POLL_SECONDS)
+
+    def _publish(self, event: ReceptionEvent | None) -> None:
+        for queue in list(self.subscribers):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                self.subscribers.discard(queue)
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(None)
+
+
+def _poll(cursor: tuple[int, int] | None):
+    # The poll thread lives as long as the process; drop broken or expired connections first.
+    close_old_connections()
+    return events_since(cursor)
+
+
+broadcaster = ReceptionEventBroadcaster()
+
+
+async def event_stream(last_cursor: tuple[int, int] | None):
+    """SSE body: catch up from `last_cursor` (if any), then live events with periodic keepalives."""
+    queue = await broadcaster.subscribe()
+    try:
+        yield "retry: 5000\n\n"
+        if last_cursor is not None and await sync_to_async(cursor_expired)(last_cursor):
+            # Entries after it were pruned; the client reloads and continues live from here.
+            yield 'event: resync\ndata: {"resync":true}\n\n'
+            last_cursor = None
+        if last_cursor is not None:
+            # Subscribed first, so nothing published meanwhile is lost; duplicates are skipped below.
+            while True:
+                events, next_cursor = await sync_to_async(events_since)(last_cursor)
+                for event in events:
+                    yield event.encode()
+                if next_cursor == last_cursor:
+                    break
+                last_cursor = next_cursor
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), settings.RECEPTION_EVENTS_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            if event is None:
+                return
+            if last_cursor is not None and event.cursor <= last_cursor:
+                continue
+            last_cursor = event.cursor
+            yield event.encode()
+    finally:
+        broadcaster.unsubscribe(queue)
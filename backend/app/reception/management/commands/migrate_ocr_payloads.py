@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from reception.models import OcrScanLog
+from reception.ocr_payload import store_scan_payload
+
+
+class Command(BaseCommand):
+    help = "Move inline OcrScanLog.raw_payload JSON into compressed OcrScanPayload rows (images stripped)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=200, help="Scans per transaction.")
+        parser.add_argument("--dry-run", action="store_true", default=False, help="Only count what would move.")
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options["batch_size"])
+        pending = OcrScanLog.objects.exclude(raw_payload={}).order_by("id")
+        if options["dry_run"]:
+            self.stdout.write(f"scans with inline payload: {pending.count()}")
+            return
+
+        moved = raw_bytes = stored_bytes = images = 0
+        last_id = 0
+        while True:
+            with transaction.atomic():
+                batch = list(pending.filter(id__gt=last_id).only("id", "raw_payload")[:batch_size])
+                if not batch:
+                    break
+                for scan in batch:
+                    stored = store_scan_payload(scan, scan.raw_payload)
+                    if stored is not None:
+                        raw_bytes += stored.raw_size
+                        stored_bytes += stored.stored_size
+                        images += stored.images_stripped
+                OcrScanLog.objects.filter(id__in=[scan.id for scan in batch]).update(raw_payload={})
+            moved += len(batch)
+            last_id = batch[-1].id
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"moved={moved} raw_bytes={raw_bytes} stored_bytes={stored_bytes} images_stripped={images}"
+            )
+        )
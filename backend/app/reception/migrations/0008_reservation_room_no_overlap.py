@@ -0,0 +1,53 @@
+# Generated by Django 6.0.2 on 2026-10-16 23:12
+
+import logging
+
+import django.contrib.postgres.constraints
+import django.contrib.postgres.fields.ranges
+from django.db import migrations, models
+
+
+logger = logging.getLogger(__name__)
+
+
+def _detach_overlapping_rooms(apps, schema_editor):
+    # Stays double-booked before the constraint existed keep their dates but lose the physical
+    # room (the later one by check-in, id), so the constraint can be created; each one is logged
+    # so it can be reassigned afterwards.
+    Reservation = apps.get_model("reception", "Reservation")
+    last_checkout: dict[int, object] = {}
+    detach: list[int] = []
+    rows = (
+        Reservation.objects.filter(room__isnull=False)
+        .exclude(status="canceled")
+        .order_by("room_id", "check_in_date", "id")
+        .values_list("id", "external_id", "room_id", "check_in_date", "check_out_date")
+    )
+    for reservation_id, external_id, room_id, check_in, check_out in rows:
+        previous = last_checkout.get(room_id)
+        if previous is not None and check_in < previous:
+            logger.warning(
+                "Detaching room %s from overlapping reservation %s (%s -> %s); reassign it.",
+                room_id, external_id, check_in, check_out,
+            )
+            detach.append(reservation_id)
+            continue
+        last_checkout[room_id] = check_out
+    if detach:
+        Reservation.objects.filter(id__in=detach).update(room=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reception', '0007_reservation_room_reservation_room_type'),
+        ('rooms', '0017_room_occupied_nights'),
+    ]
+
+    operations = [
+        migrations.RunPython(_detach_overlapping_rooms, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='reservation',
+            constraint=django.contrib.postgres.constraints.ExclusionConstraint(condition=models.Q(('room__isnull', False), models.Q(('status', 'canceled'), _negated=True)), expressions=[(models.Func('room', 'room', function='int8range', output_field=django.contrib.postgres.fields.ranges.IntegerRangeField(), template="%(function)s(%(expressions)s, '[]')"), '='), (models.Func('check_in_date', 'check_out_date', function='daterange', output_field=django.contrib.postgres.fields.ranges.DateRangeField(), template="%(function)s(%(expressions)s, '[)')"), '&&')], name='reservation_room_no_overlap', violation_error_code='room_overlap'),
+        ),
+    ]
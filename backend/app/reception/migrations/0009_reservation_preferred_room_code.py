@@ -0,0 +1,30 @@
+# Generated by Django 6.0.2 on 2026-10-16 23:15
+
+import django.contrib.postgres.constraints
+import django.contrib.postgres.fields.ranges
+import django.db.models.constraints
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reception', '0008_reservation_room_no_overlap'),
+        ('rooms', '0017_room_occupied_nights'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='reservation',
+            name='reservation_room_no_overlap',
+        ),
+        migrations.AddField(
+            model_name='reservation',
+            name='preferred_room_code',
+            field=models.CharField(blank=True, max_length=16),
+        ),
+        migrations.AddConstraint(
+            model_name='reservation',
+            constraint=django.contrib.postgres.constraints.ExclusionConstraint(condition=models.Q(('room__isnull', False), models.Q(('status', 'canceled'), _negated=True)), deferrable=django.db.models.constraints.Deferrable['IMMEDIATE'], expressions=[(models.Func('room', 'room', function='int8range', output_field=django.contrib.postgres.fields.ranges.IntegerRangeField(), template="%(function)s(%(expressions)s, '[]')"), '='), (models.Func('check_in_date', 'check_out_date', function='daterange', output_field=django.contrib.postgres.fields.ranges.DateRangeField(), template="%(function)s(%(expressions)s, '[)')"), '&&')], name='reservation_room_no_overlap', violation_error_code='room_overlap'),
+        ),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 6.0.2 on 2026-10-16 23:17
+
+import re
+import unicodedata
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations, models
+from django.db.models import Value
+
+
+# Frozen copy of reception.search as of this migration, so later changes there do not
+# alter what this backfill writes.
+SEARCH_CONFIG = "simple"
+GUEST_SEARCH_FIELDS = ("first_name", "last_name", "email", "document_number", "personal_id_number")
+_EXTRA_FOLDS = str.maketrans({"đ": "d", "Đ": "D", "ł": "l", "Ł": "L", "ø": "o", "Ø": "O", "ß": "ss", "æ": "ae", "Æ": "AE"})
+_TOKEN_RE = re.compile(r"[0-9a-z]+")
+
+
+def _search_tokens(text):
+    if not text:
+        return []
+    decomposed = unicodedata.normalize("NFKD", str(text).translate(_EXTRA_FOLDS))
+    return _TOKEN_RE.findall("".join(ch for ch in decomposed if not unicodedata.combining(ch)).lower())
+
+
+def search_document(reservation_values, guest_values):
+    return " ".join(token for value in (*reservation_values, *guest_values) for token in _search_tokens(value))
+
+
+def _backfill_search_documents(apps, schema_editor):
+    Reservation = apps.get_model("reception", "Reservation")
+    Guest = apps.get_model("reception", "Guest")
+
+    guest_values: dict[int, list[str]] = {}
+    for row in Guest.objects.order_by("id").values_list("reservation_id", *GUEST_SEARCH_FIELDS):
+        guest_values.setdefault(row[0], []).extend(row[1:])
+    for reservation_id, external_id, room_name in Reservation.objects.values_list("id", "external_id", "room_name"):
+        document = search_document([external_id, room_name], guest_values.get(reservation_id, []))
+        Reservation.objects.filter(id=reservation_id).update(
+            search_document=document,
+            search_vector=SearchVector(Value(document), config=SEARCH_CONFIG),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reception', '0009_reservation_preferred_room_code'),
+        ('rooms', '0017_room_occupied_nights'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reservation',
+            name='search_document',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='reservation',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(_backfill_search_documents, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='reservation_search_gin'),
+        ),
+    ]
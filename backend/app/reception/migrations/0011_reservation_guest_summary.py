@@ -0,0 +1,50 @@
+# Generated by Django 6.0.2 on 2026-10-16 23:20
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Concat, Trim, Upper
+
+
+def _backfill_guest_summaries(apps, schema_editor):
+    Reservation = apps.get_model("reception", "Reservation")
+    Guest = apps.get_model("reception", "Guest")
+
+    guests = Guest.objects.filter(reservation_id=OuterRef("pk")).order_by()
+    primary = guests.filter(is_primary=True)
+    Reservation.objects.update(
+        guests_count=Coalesce(Subquery(guests.values("reservation_id").annotate(n=Count("id")).values("n")), 0),
+        primary_guest_name=Coalesce(
+            Subquery(primary.annotate(name=Trim(Concat("first_name", Value(" "), "last_name"))).values("name")[:1]),
+            Value(""),
+        ),
+        primary_guest_nationality=Coalesce(
+            Subquery(primary.annotate(iso2=Upper(Trim("nationality"))).values("iso2")[:1]),
+            Value(""),
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reception', '0010_reservation_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reservation',
+            name='guests_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='reservation',
+            name='primary_guest_name',
+            field=models.CharField(blank=True, editable=False, max_length=201),
+        ),
+        migrations.AddField(
+            model_name='reservation',
+            name='primary_guest_nationality',
+            field=models.CharField(blank=True, editable=False, max_length=2),
+        ),
+        migrations.RunPython(_backfill_guest_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 6.0.2 on 2026-10-16 23:24
+
+import reception.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reception', '0011_reservation_guest_summary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entity', models.CharField(choices=[('reservation', 'Rezervacija'), ('guest', 'Gost')], max_length=16)),
+                ('entity_id', models.BigIntegerField()),
+                ('deleted', models.BooleanField(default=False)),
+                ('txid', models.BigIntegerField(db_default=reception.models.TxidCurrent(), editable=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Promjena',
+                'verbose_name_plural': 'Promjene',
+                'ordering': ['txid', 'id'],
+                'indexes': [models.Index(fields=['txid', 'id'], name='changelog_cursor_idx')],
+            },
+        ),
+    ]
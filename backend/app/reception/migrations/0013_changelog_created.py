@@ -0,0 +1,23 @@
+# Generated by Django 6.0.2 on 2026-10-16 23:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reception', '0012_changelog'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='changelog',
+            name='created',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='changelog',
+            name='entity',
+            field=models.CharField(choices=[('reservation', 'Rezervacija'), ('guest', 'Gost'), ('ocr_scan', 'OCR scan')], max_length=16),
+        ),
+    ]
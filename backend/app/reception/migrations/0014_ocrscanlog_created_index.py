@@ -0,0 +1,19 @@
+# Generated by Django 6.0.2 on 2026-10-16 23:28
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reception', '0013_changelog_created'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ocrscanlog',
+            index=models.Index(fields=['created_at', 'id'], name='ocrscanlog_created_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 6.0.2 on 2026-10-16 23:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reception', '0014_ocrscanlog_created_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OcrScanPayload',
+            fields=[
+                ('scan', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='payload', serialize=False, to='reception.ocrscanlog')),
+                ('data', models.BinaryField()),
+                ('raw_size', models.PositiveIntegerField(default=0)),
+                ('stored_size', models.PositiveIntegerField(default=0)),
+                ('images_stripped', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'OCR payload',
+                'verbose_name_plural': 'OCR payloads',
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 6.0.2 on 2026-10-16 23:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reception', '0015_ocrscanpayload'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='changelog',
+            index=models.Index(fields=['created_at'], name='changelog_created_idx'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 6.0.2 on 2026-10-17 00:05
+
+import logging
+
+from django.db import migrations, models
+
+
+logger = logging.getLogger(__name__)
+
+
+def _report_inverted_stays(apps, schema_editor):
+    # Rows written before the check (only possible without a room, or canceled) are left as
+    # they are: the constraint is added NOT VALID, so it guards new writes only. Log them for repair.
+    Reservation = apps.get_model("reception", "Reservation")
+    rows = Reservation.objects.filter(check_in_date__gt=models.F("check_out_date")).values_list(
+        "external_id", "check_in_date", "check_out_date"
+    )
+    for external_id, check_in, check_out in rows:
+        logger.warning("Reservation %s checks out before it checks in (%s -> %s).", external_id, check_in, check_out)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reception', '0016_retention_indexes'),
+        ('rooms', '0018_publicdataversion'),
+    ]
+
+    operations = [
+        migrations.RunPython(_report_inverted_stays, migrations.RunPython.noop),
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(
+                    "ALTER TABLE reception_reservation ADD CONSTRAINT reservation_stay_dates_order "
+                    "CHECK (check_in_date <= check_out_date) NOT VALID",
+                    "ALTER TABLE reception_reservation DROP CONSTRAINT reservation_stay_dates_order",
+                ),
+            ],
+            state_operations=[
+                migrations.AddConstraint(
+                    model_name='reservation',
+                    constraint=models.CheckConstraint(condition=models.Q(('check_in_date__lte', models.F('check_out_date'))), name='reservation_stay_dates_order', violation_error_code='stay_dates_order'),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 6.0.2 on 2026-10-17 00:07
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reception', '0017_reservation_stay_dates_order'),
+        ('rooms', '0018_publicdataversion'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_document'], name='reservation_search_trgm', opclasses=['gin_trgm_ops']),
+        ),
+    ]
@@ -1,5 +1,10 @@
-from django.db import models
-from django.core.exceptions import ValidationError
+from django.contrib.postgres.constraints import ExclusionConstraint
+from django.contrib.postgres.fields import DateRangeField, IntegerRangeField, RangeOperators
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.core.exceptions import NON_FIELD_ERRORS, ValidationError
+from django.db import IntegrityError, models, transaction
+from django.db.models import Deferrable
 
 
 class ReservationStatus(models.TextChoices):
@@ -9,6 +14,30 @@ class ReservationStatus(models.TextChoices):
     CANCELED = "canceled", "Otkazan"
 
 
+ROOM_OVERLAP_CONSTRAINT = "reservation_room_no_overlap"
+ROOM_OVERLAP_CODE = "room_overlap"
+STAY_DATES_CONSTRAINT = "reservation_stay_dates_order"
+STAY_DATES_CODE = "stay_dates_order"
+
+# Half-open [check_in, check_out) night range.
+STAY_RANGE = models.Func(
+    "check_in_date",
+    "check_out_date",
+    function="daterange",
+    template="%(function)s(%(expressions)s, '[)')",
+    output_field=DateRangeField(),
+)
+# Single-value range so room equality can live in a plain GiST index (no btree_gist needed).
+# Both are plain Funcs, so migrations spell them out with built-ins instead of importing this module.
+ROOM_KEY_RANGE = models.Func(
+    "room",
+    "room",
+    function="int8range",
+    template="%(function)s(%(expressions)s, '[]')",
+    output_field=IntegerRangeField(),
+)
+
+
 class Reservation(models.Model):
     external_id = models.CharField(max_length=128, unique=True)
     room_name = models.CharField(max_length=128)
@@ -26,6 +55,8 @@ class Reservation(models.Model):
         blank=True,
         related_name="reservations",
     )
+    # Physical unit requested by the channel (e.g. "R1" -> K1); kept for later reallocation.
+    preferred_room_code = models.CharField(max_length=16, blank=True)
     check_in_date = models.DateField()
     check_out_date = models.DateField()
     status = models.CharField(
@@ -35,6 +66,14 @@ class Reservation(models.Model):
     )
     total_amount = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     currency = models.CharField(max_length=3, default="EUR")
+    # Guest summary for listings (maintained by reception.signals, see reception.summary).
+    guests_count = models.PositiveIntegerField(default=0, editable=False)
+    primary_guest_name = models.CharField(max_length=201, blank=True, editable=False)
+    primary_guest_nationality = models.CharField(max_length=2, blank=True, editable=False)
+    # Accent-folded tokens of external_id, room_name and guest names/e-mails/documents
+    # (maintained by reception.signals, see reception.search).
+    search_document = models.TextField(blank=True, editable=False)
+    search_vector = SearchVectorField(null=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -42,15 +81,99 @@ class Reservation(models.Model):
         ordering = ["check_in_date", "id"]
         verbose_name = "Rezervacija"
         verbose_name_plural = "Rezervacije"
+        indexes = [
+            GinIndex(fields=["search_vector"], name="reservation_search_gin"),
+            # Infix lookups (LIKE '%token%') on the folded document; needs pg_trgm.
+            GinIndex(fields=["search_document"], opclasses=["gin_trgm_ops"], name="reservation_search_trgm"),
+        ]
+        constraints = [
+            # Listed first: daterange() raises on inverted bounds, and this CHECK runs before
+            # the exclusion index is updated, so bad dates surface as a named violation.
+            models.CheckConstraint(
+                name=STAY_DATES_CONSTRAINT,
+                condition=models.Q(check_in_date__lte=models.F("check_out_date")),
+                violation_error_code=STAY_DATES_CODE,
+            ),
+            ExclusionConstraint(
+                name=ROOM_OVERLAP_CONSTRAINT,
+                expressions=[
+                    (ROOM_KEY_RANGE, RangeOperators.EQUAL),
+                    (STAY_RANGE, RangeOperators.OVERLAPS),
+                ],
+                condition=models.Q(room__isnull=False) & ~models.Q(status=ReservationStatus.CANCELED),
+                violation_error_code=ROOM_OVERLAP_CODE,
+                # Checked per statement; bulk room swaps defer it to commit (see rooms.reallocation).
+                deferrable=Deferrable.IMMEDIATE,
+            ),
+        ]
 
     def __str__(self) -> str:
         return f"{self.external_id} ({self.room_name})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Stay as loaded, so rooms.signals can tell which nights a save moved without re-reading the row.
+        loaded = instance.__dict__
+        if all(name in loaded for name in ("room_id", "check_in_date", "check_out_date", "status")):
+            instance._loaded_stay = (loaded["room_id"], loaded["check_in_date"], loaded["check_out_date"], loaded["status"])
+        return instance
+
+    def save(self, *args, **kwargs):
+        # Savepoint, so an overlap rejected by the exclusion constraint leaves the outer
+        # transaction usable and can be reported like a validation error.
+        try:
+            with transaction.atomic():
+                super().save(*args, **kwargs)
+        except IntegrityError as exc:
+            constraint = getattr(getattr(exc.__cause__, "diag", None), "constraint_name", None)
+            if constraint == STAY_DATES_CONSTRAINT:
+                # Paths that skip full_clean (booking import, scripts) still get a validation error.
+                raise self.stay_dates_error() from exc
+            if constraint != ROOM_OVERLAP_CONSTRAINT:
+                raise
+            raise self.room_overlap_error() from exc
+
+    def stay_dates_error(self) -> ValidationError:
+        return ValidationError({"check_out_date": "Check-out date must be after check-in date."}, code=STAY_DATES_CODE)
+
+    def room_overlap_error(self) -> ValidationError:
+        conflict = (
+            Reservation.objects.filter(room_id=self.room_id)
+            .exclude(pk=self.pk)
+            .exclude(status=ReservationStatus.CANCELED)
+            .filter(check_in_date__lt=self.check_out_date, check_out_date__gt=self.check_in_date)
+            .order_by("check_in_date", "id")
+            .first()
+        )
+        message = f"Room {self.room} is already booked for an overlapping period"
+        if conflict is not None:
+            message += f" ({conflict.check_in_date} -> {conflict.check_out_date}, external_id={conflict.external_id})"
+        return ValidationError({"room": ValidationError(f"{message}.", code=ROOM_OVERLAP_CODE)})
+
+    def validate_constraints(self, exclude=None):
+        checked = not {"check_in_date", "check_out_date"} & set(exclude or ())
+        if checked and self.check_in_date and self.check_out_date and self.check_in_date > self.check_out_date:
+            # The overlap check would build daterange(check_in, check_out) and fail outright.
+            raise self.stay_dates_error()
+        try:
+            super().validate_constraints(exclude=exclude)
+        except ValidationError as exc:
+            errors = exc.update_error_dict({})
+            non_field = errors.get(NON_FIELD_ERRORS, [])
+            if not any(error.code == ROOM_OVERLAP_CODE for error in non_field):
+                raise
+            # Report the overlap on the room field with the conflicting stay, as before.
+            errors[NON_FIELD_ERRORS] = [error for error in non_field if error.code != ROOM_OVERLAP_CODE]
+            if not errors[NON_FIELD_ERRORS]:
+                del errors[NON_FIELD_ERRORS]
+            raise ValidationError(self.room_overlap_error().update_error_dict(errors))
+
     def clean(self):
         super().clean()
 
         if self.check_in_date and self.check_out_date and self.check_in_date >= self.check_out_date:
-            raise ValidationError({"check_out_date": "Check-out date must be after check-in date."})
+            raise self.stay_dates_error()
 
         if self.status == ReservationStatus.CANCELED:
             return
@@ -60,27 +183,8 @@ class Reservation(models.Model):
             if self.room.room_type_id != self.room_type_id:
                 raise ValidationError({"room": "Selected room does not match selected room type."})
 
-        if not self.room_id or not self.check_in_date or not self.check_out_date:
-            return
-
-        # Prevent overlapping reservations for the same physical room.
-        conflict = (
-            Reservation.objects.filter(room_id=self.room_id)
-            .exclude(pk=self.pk)
-            .exclude(status=ReservationStatus.CANCELED)
-            .filter(check_in_date__lt=self.check_out_date, check_out_date__gt=self.check_in_date)
-            .order_by("check_in_date", "id")
-            .first()
-        )
-        if conflict:
-            raise ValidationError(
-                {
-                    "room": (
-                        f"Room {self.room} is already booked for an overlapping period "
-                        f"({conflict.check_in_date} -> {conflict.check_out_date}, external_id={conflict.external_id})."
-                    )
-                }
-            )
+        # Overlapping stays in the same room are rejected by the reservation_room_no_overlap
+        # exclusion constraint (see validate_constraints / save).
 
 
 class Guest(models.Model):
@@ -130,6 +234,15 @@ class Guest(models.Model):
     def __str__(self) -> str:
         return f"{self.first_name} {self.last_name}".strip()
 
+    # Atomic, so the reservation summary/search refresh in reception.signals commits with the guest.
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            return super().delete(*args, **kwargs)
+
 
 class IDDocument(models.Model):
     guest = models.ForeignKey(
@@ -182,6 +295,7 @@ class OcrScanLog(models.Model):
     provider = models.CharField(max_length=32, choices=OcrProvider.choices)
     status = models.CharField(max_length=16, choices=OcrScanStatus.choices)
     duration_ms = models.PositiveIntegerField(null=True, blank=True)
+    # Legacy inline copy; payloads now live in OcrScanPayload (`migrate_ocr_payloads` moves old rows).
     raw_payload = models.JSONField(default=dict, blank=True)
     suggested_fields = models.JSONField(default=dict, blank=True)
     corrected_fields = models.JSONField(default=dict, blank=True)
@@ -199,6 +313,71 @@ class OcrScanLog(models.Model):
         ordering = ["-created_at", "-id"]
         verbose_name = "OCR scan log"
         verbose_name_plural = "OCR scan logs"
+        indexes = [
+            # created_at range filters (stats) and the newest-first keyset list.
+            models.Index(fields=["created_at", "id"], name="ocrscanlog_created_idx"),
+        ]
 
     def __str__(self) -> str:
         return f"OCR {self.provider} {self.status} #{self.id}"
+
+
+class OcrScanPayload(models.Model):
+    """Raw provider payload of an OCR scan, kept out of OcrScanLog (see reception.ocr_payload)."""
+
+    scan = models.OneToOneField(
+        OcrScanLog,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="payload",
+    )
+    # zlib-compressed JSON with image data replaced by {"omitted": "image", ...} markers.
+    data = models.BinaryField()
+    raw_size = models.PositiveIntegerField(default=0)
+    stored_size = models.PositiveIntegerField(default=0)
+    images_stripped = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "OCR payload"
+        verbose_name_plural = "OCR payloads"
+
+    def __str__(self) -> str:
+        return f"OCR payload #{self.scan_id} ({self.stored_size} B)"
+
+
+class TxidCurrent(models.Func):
+    # Id of the writing transaction (assigned on first use, stable until commit).
+    function = "txid_current"
+    template = "%(function)s()"
+    output_field = models.BigIntegerField()
+
+
+class ChangeEntity(models.TextChoices):
+    RESERVATION = "reservation", "Rezervacija"
+    GUEST = "guest", "Gost"
+    OCR_SCAN = "ocr_scan", "OCR scan"
+
+
+class ChangeLog(models.Model):
+    """Append-only change feed of reservations and guests, read through reception.changes."""
+
+    entity = models.CharField(max_length=16, choices=ChangeEntity.choices)
+    entity_id = models.BigIntegerField()
+    created = models.BooleanField(default=False)
+    deleted = models.BooleanField(default=False)
+    txid = models.BigIntegerField(db_default=TxidCurrent(), editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["txid", "id"]
+        verbose_name = "Promjena"
+        verbose_name_plural = "Promjene"
+        indexes = [
+            models.Index(fields=["txid", "id"], name="changelog_cursor_idx"),
+            models.Index(fields=["created_at"], name="changelog_created_idx"),
+        ]
+
+    def __str__(self) -> str:
+        action = "delete" if self.deleted else "create" if self.created else "update"
+        return f"{self.entity} #{self.entity_id} {action} (tx {self.txid})"
@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import zlib
+from typing import Any
+
+from reception.models import OcrScanLog, OcrScanPayload
+
+
+OCR_PAYLOAD_MAX_DEPTH = 7
+# Strings at least this long under an image-like key are image data (base64 crops, frames).
+OCR_IMAGE_MIN_LENGTH = 256
+_IMAGE_KEY_PARTS = ("image", "frame")
+
+
+class OcrPayloadIndex:
+    """
+    First-match key index of an OCR provider payload, built in one walk.
+
+    `find(*keys)` returns what a depth-first search for the first dict (pre-order, at most
+    `max_depth` levels down) holding any of `keys` with a non-empty value would return,
+    preferring earlier keys within that dict. Every guest field is then a dict lookup
+    instead of another walk over the whole (often image-heavy) payload.
+    """
+
+    def __init__(self, root: Any, max_depth: int = OCR_PAYLOAD_MAX_DEPTH):
+        # key -> (pre-order number of the first dict holding it with a non-empty value, value)
+        self._first: dict[str, tuple[int, Any]] = {}
+        self._dicts = 0
+        self._walk(root, max_depth)
+
+    def _walk(self, node: Any, depth: int) -> None:
+        if depth < 0 or node is None:
+            return
+        if isinstance(node, list):
+            for item in node:
+                self._walk(item, depth - 1)
+        elif isinstance(node, dict):
+            order = self._dicts
+            self._dicts += 1
+            first = self._first
+            nested = []
+            for key, value in node.items():
+                if key not in first and value not in (None, "", {}):
+                    first[key] = (order, value)
+                if depth and isinstance(value, (dict, list)):
+                    nested.append(value)
+            for value in nested:
+                self._walk(value, depth - 1)
+
+    def find(self, *keys: str) -> Any:
+        best = None
+        for key in keys:
+            hit = self._first.get(key)
+            if hit is not None and (best is None or hit[0] < best[0]):
+                best = hit
+        return best[1] if best is not None else None
+
+
+def _image_marker(value: str) -> dict:
+    return {"omitted": "image", "sha256": hashlib.sha256(value.encode("utf-8")).hexdigest(), "length": len(value)}
+
+
+def strip_images(node: Any, *, in_image: bool = False) -> tuple[Any, int]:
+    """Copy of the payload with image data replaced by markers, and how many were replaced."""
+    if isinstance(node, dict):
+        stripped, count = {}, 0
+        for key, value in node.items():
+            image_key = in_image or (isinstance(key, str) and any(part in key.lower() for part in _IMAGE_KEY_PARTS))
+            stripped[key], found = strip_images(value, in_image=image_key)
+            count += found
+        return stripped, count
+    if isinstance(node, list):
+        stripped, count = [], 0
+        for item in node:
+            value, found = strip_images(item, in_image=in_image)
+            stripped.append(value)
+            count += found
+        return stripped, count
+    if isinstance(node, str) and (
+        (in_image and len(node) >= OCR_IMAGE_MIN_LENGTH) or node.startswith("data:image/")
+    ):
+        return _image_marker(node), 1
+    return node, 0
+
+
+def store_scan_payload(scan: OcrScanLog, payload: Any) -> OcrScanPayload | None:
+    """Strip, compress and save the raw payload of `scan` in its side row (None for an empty payload)."""
+    if not payload:
+        return None
+    raw = json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    stripped, images = strip_images(payload)
+    data = zlib.compress(json.dumps(stripped, separators=(",", ":"), ensure_ascii=False).encode("utf-8"), 6)
+    stored, _ = OcrScanPayload.objects.update_or_create(
+        scan=scan,
+        defaults={"data": data, "raw_size": len(raw), "stored_size": len(data), "images_stripped": images},
+    )
+    return stored
+
+
+def load_scan_payload(scan: OcrScanLog) -> Any:
+    """Raw payload of `scan`: the side row when present, else the legacy inline column."""
+    try:
+        stored = scan.payload
+    except OcrScanPayload.DoesNotExist:
+        return scan.raw_payload or {}
+    return json.loads(zlib.decompress(bytes(stored.data)).decode("utf-8"))
@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+from datetime import date, datetime, time, timedelta
+
+from django.db.models import Aggregate, Count, FloatField, Q, Sum
+from django.db.models.functions import TruncDay, TruncHour, TruncMonth
+from django.utils import timezone
+
+from reception.models import OcrProvider, OcrScanLog, OcrScanStatus
+
+
+BUCKETS = {"hour": TruncHour, "day": TruncDay, "month": TruncMonth}
+
+
+class PercentileCont(Aggregate):
+    # PostgreSQL ordered-set aggregate: continuous percentile of the expression.
+    function = "percentile_cont"
+    template = "%(function)s(%(fraction)s) WITHIN GROUP (ORDER BY %(expressions)s)"
+    output_field = FloatField()
+
+    def __init__(self, expression, fraction: float, **extra):
+        super().__init__(expression, fraction=float(fraction), **extra)
+
+
+def _local_midnight(day: date):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _rate(success: int, total: int) -> float:
+    return round((success / total) * 100, 2) if total else 0.0
+
+
+def _ms(value) -> int | None:
+    return round(value) if value is not None else None
+
+
+def _avg_ms(duration_sum: int, count: int) -> int | None:
+    # Truncated like the original int(Avg("duration_ms")), so existing clients see the same values.
+    return int(duration_sum / count) if count else None
+
+
+def ocr_scan_stats(*, date_from: date | None = None, date_to: date | None = None, bucket: str | None = None) -> dict:
+    """
+    OCR scan counts and durations per provider, optionally split into hour/day/month buckets.
+
+    One query grouped by provider (and bucket) with conditional counts and percentile_cont;
+    the date filter is a plain `created_at` range in local time, so it uses the index.
+    Provider totals are summed from the buckets; their p50/p95 are only exact (and only
+    returned) without `bucket`, per-bucket rows carry their own.
+    """
+    queryset = OcrScanLog.objects.all()
+    if date_from:
+        queryset = queryset.filter(created_at__gte=_local_midnight(date_from))
+    if date_to:
+        queryset = queryset.filter(created_at__lt=_local_midnight(date_to + timedelta(days=1)))
+
+    group = ["provider"]
+    if bucket:
+        queryset = queryset.annotate(bucket_start=BUCKETS[bucket]("created_at"))
+        group.append("bucket_start")
+    rows = (
+        queryset.order_by()
+        .values(*group)
+        .annotate(
+            total=Count("id"),
+            success=Count("id", filter=Q(status=OcrScanStatus.OK)),
+            failed=Count("id", filter=Q(status=OcrScanStatus.FAILED)),
+            timed=Count("duration_ms"),
+            duration_sum=Sum("duration_ms"),
+            p50=PercentileCont("duration_ms", 0.5),
+            p95=PercentileCont("duration_ms", 0.95),
+        )
+        .order_by(*group)
+    )
+
+    by_provider: dict[str, dict] = {}
+    buckets: dict[str, list[dict]] = {}
+    timing: dict[str, list[int]] = {}
+    for provider in [OcrProvider.MICROBLINK]:
+        by_provider[provider] = {"total": 0, "success": 0, "failed": 0}
+        timing[provider] = [0, 0]
+    for row in rows:
+        totals = by_provider.setdefault(row["provider"], {"total": 0, "success": 0, "failed": 0})
+        for key in ("total", "success", "failed"):
+            totals[key] += row[key]
+        timed = timing.setdefault(row["provider"], [0, 0])
+        timed[0] += row["timed"]
+        timed[1] += row["duration_sum"] or 0
+        if bucket:
+            buckets.setdefault(row["provider"], []).append(
+                {
+                    "start": timezone.localtime(row["bucket_start"]).isoformat(),
+                    "total": row["total"],
+                    "success": row["success"],
+                    "failed": row["failed"],
+                    "avg_duration_ms": _avg_ms(row["duration_sum"], row["timed"]),
+                    "p50_duration_ms": _ms(row["p50"]),
+                    "p95_duration_ms": _ms(row["p95"]),
+                }
+            )
+        else:
+            totals["p50_duration_ms"] = _ms(row["p50"])
+            totals["p95_duration_ms"] = _ms(row["p95"])
+
+    for provider, totals in by_provider.items():
+        count, duration_sum = timing[provider]
+        totals["success_rate"] = _rate(totals["success"], totals["total"])
+        totals["avg_duration_ms"] = _avg_ms(duration_sum, count)
+        if bucket:
+            totals["buckets"] = buckets.get(provider, [])
+        else:
+            totals.setdefault("p50_duration_ms", None)
+            totals.setdefault("p95_duration_ms", None)
+
+    return {
+        "total_scans": sum(totals["total"] for totals in by_provider.values()),
+        "by_provider": by_provider,
+    }
@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import base64
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured, ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Opt-in keyset pagination over the queryset's own ordering.
+
+    Without `cursor`/`page_size` in the query string the list is returned unpaginated, as
+    before. Otherwise rows are fetched with a `WHERE (ordering) > (last row)` filter, so every
+    page costs the same regardless of depth and prefetches run for that page only. The last
+    ordering field must be unique (e.g. `id`). Cursors are opaque base64 of the last row's
+    ordering values.
+    """
+
+    page_size = 50
+    max_page_size = 200
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    invalid_cursor_message = "Neispravan cursor."
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if self.cursor_query_param not in params and self.page_size_query_param not in params:
+            return None
+
+        self.request = request
+        self.ordering = [str(field) for field in queryset.query.order_by]
+        if not self.ordering:
+            raise ImproperlyConfigured("KeysetPagination requires an ordered queryset.")
+        self.page_size_value = self._page_size(params.get(self.page_size_query_param))
+
+        cursor = params.get(self.cursor_query_param)
+        if cursor:
+            queryset = queryset.filter(self._after(queryset.model, self._decode(cursor)))
+
+        rows = list(queryset[: self.page_size_value + 1])
+        self.has_next = len(rows) > self.page_size_value
+        rows = rows[: self.page_size_value]
+        self.next_cursor = self._encode(rows[-1]) if self.has_next else None
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response(
+            OrderedDict(
+                [
+                    ("next", self.get_next_link()),
+                    ("next_cursor", self.next_cursor),
+                    ("page_size", self.page_size_value),
+                    ("results", data),
+                ]
+            )
+        )
+
+    def get_next_link(self):
+        if not self.next_cursor:
+            return None
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.page_size_query_param, self.page_size_value)
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "next_cursor": {"type": "string", "nullable": True},
+                "page_size": {"type": "integer"},
+                "results": schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                "name": self.cursor_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Opaque cursor from `next_cursor`; enables pagination.",
+                "schema": {"type": "string"},
+            },
+            {
+                "name": self.page_size_query_param,
+                "required": False,
+                "in": "query",
+                "description": f"Page size (default {self.page_size}, max {self.max_page_size}); enables pagination.",
+                "schema": {"type": "integer"},
+            },
+        ]
+
+    def _page_size(self, raw) -> int:
+        try:
+            value = int(raw)
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(self.max_page_size, value))
+
+    def _field_values(self, obj) -> list:
+        values = []
+        for field in self.ordering:
+            value = getattr(obj, field.lstrip("-"))
+            values.append(value.isoformat() if hasattr(value, "isoformat") else value)
+        return values
+
+    def _encode(self, obj) -> str:
+        raw = json.dumps(self._field_values(obj), separators=(",", ":"))
+        return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+    def _decode(self, cursor: str) -> list:
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        except (ValueError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return values
+
+    def _after(self, model, values: list) -> Q:
+        # (a, b, c) after (x, y, z) == a > x OR (a = x AND b > y) OR (a = x AND b = y AND c > z),
+        # with > flipped to < for descending fields.
+        condition = Q()
+        equal = Q()
+        for field, raw in zip(self.ordering, values):
+            name = field.lstrip("-")
+            try:
+                value = model._meta.get_field(name).to_python(raw)
+            except FieldDoesNotExist:
+                # Annotation (e.g. a rank); cursors carry its JSON value as is.
+                value = raw
+            except DjangoValidationError:
+                raise NotFound(self.invalid_cursor_message)
+            lookup = "lt" if field.startswith("-") else "gt"
+            condition |= equal & Q(**{f"{name}__{lookup}": value})
+            equal &= Q(**{name: value})
+        return condition
@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import re
+import unicodedata
+from typing import Iterable
+
+from django.contrib.postgres.search import SearchQuery, SearchVector
+from django.db.models import Q, Value
+
+from reception.models import Guest, Reservation
+
+
+SEARCH_CONFIG = "simple"
+# Tokens this long also match inside a word of search_document (LIKE, served by the trigram
+# index), e.g. the tail of a booking number or part of a surname; shorter ones only as prefixes.
+INFIX_MIN_LENGTH = 3
+GUEST_SEARCH_FIELDS = ("first_name", "last_name", "email", "document_number", "personal_id_number")
+
+# Letters NFKD does not decompose into base + combining mark.
+_EXTRA_FOLDS = str.maketrans({"đ": "d", "Đ": "D", "ł": "l", "Ł": "L", "ø": "o", "Ø": "O", "ß": "ss", "æ": "ae", "Æ": "AE"})
+_TOKEN_RE = re.compile(r"[0-9a-z]+")
+
+
+def fold_text(text: str | None) -> str:
+    """Lowercase, accent-free form used both for documents and queries (e.g. "Đurić" -> "duric")."""
+    if not text:
+        return ""
+    decomposed = unicodedata.normalize("NFKD", str(text).translate(_EXTRA_FOLDS))
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch)).lower()
+
+
+def search_tokens(text: str | None) -> list[str]:
+    # Same tokenization for documents and queries, so e-mails and ids split identically on both sides.
+    return _TOKEN_RE.findall(fold_text(text))
+
+
+def search_document(reservation_values: Iterable[str | None], guest_values: Iterable[str | None]) -> str:
+    return " ".join(token for value in (*reservation_values, *guest_values) for token in search_tokens(value))
+
+
+def refresh_search_documents(reservation_ids: Iterable[int | None]) -> None:
+    """Rebuild search_document/search_vector of the given reservations (one UPDATE each, no signals)."""
+    reservation_ids = sorted({reservation_id for reservation_id in reservation_ids if reservation_id})
+    if not reservation_ids:
+        return
+    guest_values: dict[int, list[str]] = {reservation_id: [] for reservation_id in reservation_ids}
+    for row in Guest.objects.filter(reservation_id__in=reservation_ids).order_by("id").values_list(
+        "reservation_id", *GUEST_SEARCH_FIELDS
+    ):
+        guest_values[row[0]].extend(row[1:])
+
+    rows = Reservation.objects.filter(id__in=reservation_ids).values_list("id", "external_id", "room_name")
+    for reservation_id, external_id, room_name in rows:
+        document = search_document([external_id, room_name], guest_values[reservation_id])
+        Reservation.objects.filter(id=reservation_id).update(
+            search_document=document,
+            search_vector=SearchVector(Value(document), config=SEARCH_CONFIG),
+        )
+
+
+def reservation_search_filter(text: str) -> Q | None:
+    """Every folded token must match: "1001 uric" finds BK-1001 of Ivana Đurić."""
+    tokens = search_tokens(text)
+    if not tokens:
+        return None
+    condition = Q()
+    short = [token for token in tokens if len(token) < INFIX_MIN_LENGTH]
+    if short:
+        condition &= Q(search_vector=_prefix_query(short))
+    for token in tokens:
+        if len(token) >= INFIX_MIN_LENGTH:
+            condition &= Q(search_document__contains=token)
+    return condition
+
+
+def reservation_search_query(text: str) -> SearchQuery | None:
+    """Prefix match on every folded token of the input: "ana kov" -> ana:* & kov:*. Used for ranking."""
+    tokens = search_tokens(text)
+    if not tokens:
+        return None
+    return _prefix_query(tokens)
+
+
+def _prefix_query(tokens: list[str]) -> SearchQuery:
+    return SearchQuery(" & ".join(f"{token}:*" for token in tokens), search_type="raw", config=SEARCH_CONFIG)
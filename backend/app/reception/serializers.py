@@ -1,6 +1,9 @@
+from django.db import transaction
 from rest_framework import serializers
 
-from .models import Guest, OcrScanLog, Reservation
+from .changes import record_changes
+from .models import ChangeEntity, Guest, OcrScanLog, Reservation
+from .ocr_payload import load_scan_payload
 
 
 class GuestLiteSerializer(serializers.ModelSerializer):
@@ -18,11 +21,14 @@ class GuestLiteSerializer(serializers.ModelSerializer):
         )
 
 
+class GuestChangeSerializer(GuestLiteSerializer):
+    class Meta(GuestLiteSerializer.Meta):
+        fields = GuestLiteSerializer.Meta.fields + ("reservation",)
+
+
 class ReservationTimelineSerializer(serializers.ModelSerializer):
     guests = GuestLiteSerializer(many=True, read_only=True)
-    guests_count = serializers.IntegerField(read_only=True)
-    primary_guest_name = serializers.SerializerMethodField()
-    primary_guest_nationality_iso2 = serializers.SerializerMethodField()
+    primary_guest_nationality_iso2 = serializers.CharField(source="primary_guest_nationality", read_only=True)
 
     class Meta:
         model = Reservation
@@ -43,17 +49,10 @@ class ReservationTimelineSerializer(serializers.ModelSerializer):
             "guests",
         )
 
-    def get_primary_guest_name(self, obj):
-        primary_guest = next((g for g in obj.guests.all() if g.is_primary), None)
-        if primary_guest:
-            return f"{primary_guest.first_name} {primary_guest.last_name}".strip()
-        return ""
-
-    def get_primary_guest_nationality_iso2(self, obj):
-        primary_guest = next((g for g in obj.guests.all() if g.is_primary), None)
-        if not primary_guest:
-            return ""
-        return (primary_guest.nationality or "").strip().upper()
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if not self.context.get("include_guests", True):
+            self.fields.pop("guests")
 
 
 class GuestDetailSerializer(serializers.ModelSerializer):
@@ -88,11 +87,13 @@ class GuestDetailSerializer(serializers.ModelSerializer):
         )
         read_only_fields = ("id", "reservation")
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         if validated_data.get("is_primary", False):
-            Guest.objects.filter(reservation=instance.reservation).exclude(pk=instance.pk).update(
-                is_primary=False
-            )
+            others = Guest.objects.filter(reservation=instance.reservation, is_primary=True).exclude(pk=instance.pk)
+            other_ids = list(others.values_list("id", flat=True))
+            others.update(is_primary=False)
+            record_changes(ChangeEntity.GUEST, other_ids)
         return super().update(instance, validated_data)
 
 
@@ -119,3 +120,13 @@ class OcrScanLogSerializer(serializers.ModelSerializer):
 
     def get_guest_name(self, obj):
         return f"{obj.guest.first_name} {obj.guest.last_name}".strip()
+
+
+class OcrScanLogDetailSerializer(OcrScanLogSerializer):
+    raw_payload = serializers.SerializerMethodField()
+
+    class Meta(OcrScanLogSerializer.Meta):
+        fields = OcrScanLogSerializer.Meta.fields + ("raw_payload",)
+
+    def get_raw_payload(self, obj):
+        return load_scan_payload(obj)
@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from reception.changes import record_changes
+from reception.models import ChangeEntity, Guest, OcrScanLog, Reservation
+from reception.search import refresh_search_documents
+from reception.summary import refresh_guest_summaries
+
+
+@receiver(post_save, sender=Reservation)
+def _refresh_search_for_reservation(sender, instance: Reservation, update_fields=None, **kwargs):
+    if update_fields is not None and not {"external_id", "room_name"} & set(update_fields):
+        return
+    refresh_search_documents([instance.id])
+
+
+@receiver(post_save, sender=Reservation)
+def _record_reservation_change(sender, instance: Reservation, created=False, **kwargs):
+    record_changes(ChangeEntity.RESERVATION, [instance.id], created=created)
+
+
+@receiver(post_delete, sender=Reservation)
+def _record_reservation_delete(sender, instance: Reservation, **kwargs):
+    record_changes(ChangeEntity.RESERVATION, [instance.id], deleted=True)
+
+
+@receiver(pre_save, sender=Guest)
+def _remember_previous_guest_reservation(sender, instance: Guest, **kwargs):
+    instance._previous_reservation_id = None
+    if instance.pk:
+        instance._previous_reservation_id = (
+            Guest.objects.filter(pk=instance.pk).values_list("reservation_id", flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Guest)
+@receiver(post_delete, sender=Guest)
+def _refresh_reservations_for_guest(sender, instance: Guest, **kwargs):
+    reservation_ids = [instance.reservation_id, getattr(instance, "_previous_reservation_id", None)]
+    refresh_guest_summaries(reservation_ids)
+    refresh_search_documents(reservation_ids)
+    # Summary columns of the reservations changed too.
+    record_changes(ChangeEntity.RESERVATION, reservation_ids)
+    record_changes(
+        ChangeEntity.GUEST,
+        [instance.id],
+        created=kwargs.get("created", False),
+        deleted=kwargs["signal"] is post_delete,
+    )
+
+
+@receiver(post_save, sender=OcrScanLog)
+def _record_ocr_scan(sender, instance: OcrScanLog, created=False, **kwargs):
+    if created:
+        record_changes(ChangeEntity.OCR_SCAN, [instance.id], created=True)
@@ -1,9 +1,26 @@
-from datetime import date
+import asyncio
+import json
+import random
+import threading
+import time
+from datetime import date, datetime
+from io import StringIO
+from unittest import mock
 
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
-from django.test import TestCase
+from django.core.management import call_command
+from django.db import OperationalError, connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings, tag
+from django.utils import timezone
+from rest_framework.test import APIClient
 
-from reception.models import Reservation, ReservationStatus
+from reception.booking_import import upsert_reservation_from_booking_payload
+from reception.changes import record_changes
+from reception.events import ReceptionEvent, ReceptionEventBroadcaster
+from reception.models import ChangeEntity, ChangeLog, Guest, OcrScanLog, Reservation, ReservationStatus
+from reception.ocr_payload import OcrPayloadIndex
 from rooms.models import Room, RoomType
 
 
@@ -56,3 +73,799 @@ class ReservationRoomOverlapValidationTests(TestCase):
             status=ReservationStatus.EXPECTED,
         )
         r2.full_clean()  # should not raise
+
+    def test_full_clean_reports_conflicting_stay_on_room(self):
+        Reservation.objects.create(
+            external_id="A",
+            room_name="Test Room",
+            room=self.room,
+            check_in_date=date(2026, 6, 10),
+            check_out_date=date(2026, 6, 12),
+        )
+        r2 = Reservation(
+            external_id="B",
+            room_name="Test Room",
+            room=self.room,
+            check_in_date=date(2026, 6, 11),
+            check_out_date=date(2026, 6, 13),
+        )
+        with self.assertRaises(ValidationError) as ctx:
+            r2.full_clean()
+        self.assertEqual(list(ctx.exception.message_dict), ["room"])
+        self.assertIn("external_id=A", ctx.exception.message_dict["room"][0])
+
+    def test_database_rejects_overlap_without_full_clean(self):
+        Reservation.objects.create(
+            external_id="A",
+            room_name="Test Room",
+            room=self.room,
+            check_in_date=date(2026, 6, 10),
+            check_out_date=date(2026, 6, 12),
+        )
+        with self.assertRaises(ValidationError) as ctx:
+            Reservation.objects.create(
+                external_id="B",
+                room_name="Test Room",
+                room=self.room,
+                check_in_date=date(2026, 6, 11),
+                check_out_date=date(2026, 6, 13),
+            )
+        self.assertIn("already booked", ctx.exception.message_dict["room"][0])
+
+        # Back-to-back stays and stays without a physical room are fine; the transaction is still usable.
+        Reservation.objects.create(
+            external_id="C",
+            room_name="Test Room",
+            room=self.room,
+            check_in_date=date(2026, 6, 12),
+            check_out_date=date(2026, 6, 13),
+        )
+        Reservation.objects.create(
+            external_id="D",
+            room_name="Test Room",
+            check_in_date=date(2026, 6, 11),
+            check_out_date=date(2026, 6, 13),
+        )
+        self.assertEqual(Reservation.objects.count(), 3)
+
+    def test_inverted_dates_are_a_validation_error(self):
+        reservation = Reservation(
+            external_id="A",
+            room_name="Test Room",
+            room=self.room,
+            check_in_date=date(2026, 6, 12),
+            check_out_date=date(2026, 6, 10),
+        )
+        with self.assertRaises(ValidationError) as ctx:
+            reservation.validate_constraints()
+        self.assertEqual(list(ctx.exception.message_dict), ["check_out_date"])
+
+        # Without full_clean (booking import) the CHECK fires before daterange() can raise DataError.
+        with self.assertRaises(ValidationError) as ctx:
+            reservation.save()
+        self.assertEqual(list(ctx.exception.message_dict), ["check_out_date"])
+        self.assertFalse(Reservation.objects.exists())
+
+    def _import(self, external_id, check_in, check_out):
+        return upsert_reservation_from_booking_payload(
+            external_id=external_id,
+            room_name="Test Room",
+            room_type=self.rt,
+            check_in_date=check_in,
+            check_out_date=check_out,
+            status=ReservationStatus.EXPECTED,
+            guest_full_name=None,
+            guest_email=None,
+            total_amount=None,
+            currency=None,
+        )
+
+    def test_import_releases_room_when_modified_dates_overlap(self):
+        Reservation.objects.create(
+            external_id="A",
+            room_name="Test Room",
+            room=self.room,
+            check_in_date=date(2026, 6, 10),
+            check_out_date=date(2026, 6, 12),
+        )
+        Reservation.objects.create(
+            external_id="B",
+            room_name="Test Room",
+            room=self.room,
+            check_in_date=date(2026, 6, 12),
+            check_out_date=date(2026, 6, 14),
+        )
+        self._import("B", date(2026, 6, 11), date(2026, 6, 13))
+
+        moved = Reservation.objects.get(external_id="B")
+        self.assertIsNone(moved.room_id)
+        self.assertEqual(moved.check_in_date, date(2026, 6, 11))
+
+    def test_import_does_not_swallow_other_validation_errors(self):
+        Reservation.objects.create(
+            external_id="B",
+            room_name="Test Room",
+            room=self.room,
+            check_in_date=date(2026, 6, 12),
+            check_out_date=date(2026, 6, 14),
+        )
+        with mock.patch.object(Reservation, "save", autospec=True, side_effect=Reservation.save) as save:
+            with self.assertRaises(ValidationError) as ctx:
+                self._import("B", date(2026, 6, 14), date(2026, 6, 12))
+        self.assertEqual(list(ctx.exception.message_dict), ["check_out_date"])
+        self.assertEqual(save.call_count, 1)
+        self.assertEqual(Reservation.objects.get(external_id="B").room_id, self.room.id)
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_user("recepcija"))
+        self.rt = RoomType.objects.create(code="RTEST")
+        self.room = Room.objects.create(code="K1", room_type=self.rt)
+        for i in range(23):
+            reservation = Reservation.objects.create(
+                external_id=f"E{i:02d}",
+                room_name=["Deluxe", "Apartman"][i % 2],
+                room=self.room if i % 3 == 0 else None,
+                check_in_date=date(2026, 6, 1 + (i // 3) * 3),
+                check_out_date=date(2026, 6, 2 + (i // 3) * 3),
+            )
+            guest = Guest.objects.create(reservation=reservation, first_name="Ana", last_name=f"G{i}", is_primary=True)
+            OcrScanLog.objects.create(reservation=reservation, guest=guest, provider="microblink", status="ok")
+
+    def _walk(self, url, params):
+        ids, cursor = [], None
+        while True:
+            query = dict(params, page_size=4)
+            if cursor:
+                query["cursor"] = cursor
+            body = self.client.get(url, query).json()
+            self.assertLessEqual(len(body["results"]), 4)
+            ids += [row["id"] for row in body["results"]]
+            cursor = body["next_cursor"]
+            if not cursor:
+                return ids
+
+    def test_pages_cover_unpaginated_list_in_order(self):
+        for url, params in [
+            ("/api/reception/reservations/", {}),
+            ("/api/reception/reservations/", {"search": "G1"}),
+            ("/api/reception/ocr/logs/", {}),
+            (f"/api/rooms/rooms/{self.room.id}/calendar/", {}),
+        ]:
+            plain = self.client.get(url, params).json()
+            self.assertIsInstance(plain, list)
+            self.assertEqual(self._walk(url, params), [row["id"] for row in plain], url)
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.client.get("/api/reception/reservations/", {"cursor": "not-a-cursor"})
+        self.assertEqual(response.status_code, 404)
+
+
+class ReservationSearchTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_user("recepcija"))
+        self.first = Reservation.objects.create(
+            external_id="BK-1001", room_name="Deluxe", check_in_date=date(2026, 6, 1), check_out_date=date(2026, 6, 3)
+        )
+        self.second = Reservation.objects.create(
+            external_id="BK-1002", room_name="Apartman", check_in_date=date(2026, 6, 2), check_out_date=date(2026, 6, 4)
+        )
+        self.guest = Guest.objects.create(
+            reservation=self.first,
+            first_name="Ivana",
+            last_name="Đurić",
+            email="ivana.duric@example.com",
+            document_number="AB123456",
+            is_primary=True,
+        )
+
+    def _search(self, text):
+        response = self.client.get("/api/reception/reservations/", {"search": text})
+        self.assertEqual(response.status_code, 200)
+        return [row["id"] for row in response.json()]
+
+    def test_accent_folded_prefix_search_over_guest_fields(self):
+        for text in ["duric", "ĐURIĆ", "Đur", "ivana dur", "ivana.duric@example", "ab1234", "bk-1001", "delux"]:
+            self.assertEqual(self._search(text), [self.first.id], text)
+        self.assertEqual(self._search("apartman"), [self.second.id])
+        self.assertEqual(self._search("bk"), [self.first.id, self.second.id])
+        self.assertEqual(self._search("ivana apartman"), [])
+        self.assertEqual(self._search("--"), [])
+
+    def test_infix_search_for_booking_numbers_and_surnames(self):
+        for text in ["001", "uric", "3456", "ivana uric", "BK 001"]:
+            self.assertEqual(self._search(text), [self.first.id], text)
+        self.assertEqual(self._search("100"), [self.first.id, self.second.id])
+        # Two-letter fragments still only match word prefixes.
+        self.assertEqual(self._search("ur"), [])
+
+    def test_document_follows_guest_changes(self):
+        self.guest.reservation = self.second
+        self.guest.save()
+        self.assertEqual(self._search("duric"), [self.second.id])
+
+        Guest.objects.create(reservation=self.first, first_name="Šime", last_name="Kovač")
+        self.assertEqual(self._search("sime kovac"), [self.first.id])
+
+        self.guest.delete()
+        self.assertEqual(self._search("duric"), [])
+
+    def test_better_matches_rank_first(self):
+        Guest.objects.create(reservation=self.second, first_name="Marko", last_name="Deluxe", email="deluxe@example.com")
+        # The second reservation matches twice (surname and e-mail), the first only on its room name.
+        self.assertEqual(self._search("deluxe"), [self.second.id, self.first.id])
+
+
+class ReservationGuestSummaryTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_user("recepcija"))
+        self.reservation = Reservation.objects.create(
+            external_id="S1", room_name="Deluxe", check_in_date=date(2026, 6, 1), check_out_date=date(2026, 6, 3)
+        )
+        self.primary = Guest.objects.create(
+            reservation=self.reservation, first_name="Ana", last_name="Horvat", nationality="hr ", is_primary=True
+        )
+        self.other = Guest.objects.create(reservation=self.reservation, first_name="Ivo", last_name="Kos", nationality="de")
+
+    def _summary(self, reservation=None):
+        reservation = reservation or self.reservation
+        reservation.refresh_from_db()
+        return reservation.guests_count, reservation.primary_guest_name, reservation.primary_guest_nationality
+
+    def test_summary_follows_guest_changes(self):
+        self.assertEqual(self._summary(), (2, "Ana Horvat", "HR"))
+
+        response = self.client.patch(
+            f"/api/reception/reservations/{self.reservation.id}/guests/{self.other.id}/",
+            {"is_primary": True},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._summary(), (2, "Ivo Kos", "DE"))
+
+        moved_to = Reservation.objects.create(
+            external_id="S2", room_name="Deluxe", check_in_date=date(2026, 6, 5), check_out_date=date(2026, 6, 7)
+        )
+        self.other.refresh_from_db()
+        self.other.reservation = moved_to
+        self.other.save()
+        self.assertEqual(self._summary(), (1, "", ""))
+        self.assertEqual(self._summary(moved_to), (1, "Ivo Kos", "DE"))
+
+        self.primary.delete()
+        self.assertEqual(self._summary(), (0, "", ""))
+
+    def test_listing_without_guests_reads_only_reservations(self):
+        for i in range(5):
+            reservation = Reservation.objects.create(
+                external_id=f"L{i}", room_name="Deluxe", check_in_date=date(2026, 7, 1), check_out_date=date(2026, 7, 2)
+            )
+            Guest.objects.create(reservation=reservation, first_name="Gost", last_name=str(i), is_primary=True)
+
+        with self.assertNumQueries(1):
+            rows = self.client.get("/api/reception/reservations/", {"include_guests": "0"}).json()
+        self.assertEqual(len(rows), 6)
+        self.assertNotIn("guests", rows[0])
+        self.assertEqual(
+            (rows[0]["guests_count"], rows[0]["primary_guest_name"], rows[0]["primary_guest_nationality_iso2"]),
+            (2, "Ana Horvat", "HR"),
+        )
+
+        rows = self.client.get("/api/reception/reservations/").json()
+        self.assertEqual([guest["id"] for guest in rows[0]["guests"]], [self.primary.id, self.other.id])
+
+
+class ReceptionDashboardTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_user("recepcija"))
+        rt = RoomType.objects.create(code="R1")
+        self.k1 = Room.objects.create(code="K1", room_type=rt)
+        self.k2 = Room.objects.create(code="K2", room_type=rt)
+
+        def stay(external_id, room, check_in, check_out, status=ReservationStatus.EXPECTED):
+            reservation = Reservation.objects.create(
+                external_id=external_id,
+                room_name="Deluxe",
+                room=room,
+                check_in_date=check_in,
+                check_out_date=check_out,
+                status=status,
+            )
+            Guest.objects.create(reservation=reservation, first_name="Gost", last_name=external_id, is_primary=True)
+            return reservation
+
+        self.leaving = stay("OUT", self.k1, date(2026, 6, 8), date(2026, 6, 10), ReservationStatus.CHECKED_IN)
+        self.arriving = stay("IN", self.k1, date(2026, 6, 10), date(2026, 6, 12))
+        self.staying = stay("STAY", self.k2, date(2026, 6, 9), date(2026, 6, 13), ReservationStatus.CHECKED_IN)
+        self.loose = stay("LOOSE", None, date(2026, 6, 10), date(2026, 6, 11))
+        stay("CANCELED", self.k2, date(2026, 6, 10), date(2026, 6, 11), ReservationStatus.CANCELED)
+        stay("LATER", self.k2, date(2026, 6, 14), date(2026, 6, 15))
+
+    def _ids(self, rows):
+        return [row["id"] for row in rows]
+
+    def test_single_day(self):
+        with self.assertNumQueries(3):
+            body = self.client.get("/api/reception/dashboard/", {"date": "2026-06-10"}).json()
+
+        self.assertEqual(self._ids(body["arrivals"]), [self.arriving.id, self.loose.id])
+        self.assertEqual(self._ids(body["departures"]), [self.leaving.id])
+        self.assertEqual(self._ids(body["stay_overs"]), [self.staying.id])
+        counts = body["counts"]
+        self.assertEqual(
+            (counts["arrivals"], counts["departures"], counts["in_house"], counts["stay_overs"], counts["unassigned"]),
+            (2, 1, 3, 1, 1),
+        )
+        self.assertEqual(counts["by_status"]["canceled"], 1)
+        self.assertEqual(counts["by_status"]["checked_in"], 2)
+        rooms = {row["room_code"]: row for row in body["rooms"]}
+        self.assertEqual((rooms["K1"]["arrivals"], rooms["K1"]["departures"], rooms["K1"]["in_house"]), (1, 1, 1))
+        self.assertEqual((rooms["K2"]["arrivals"], rooms["K2"]["in_house"]), (0, 1))
+        self.assertEqual(body["arrivals"][0]["guests"][0]["last_name"], "IN")
+
+    def test_range_and_validation(self):
+        body = self.client.get("/api/reception/dashboard/", {"date_from": "2026-06-10", "date_to": "2026-06-14"}).json()
+        later = Reservation.objects.get(external_id="LATER")
+        self.assertEqual(self._ids(body["arrivals"]), [self.arriving.id, self.loose.id, later.id])
+        self.assertEqual(self._ids(body["departures"]), [self.leaving.id, self.staying.id, self.arriving.id, self.loose.id])
+        self.assertEqual(body["stay_overs"], [])
+
+        for params in [
+            {"date": "2026-02-30"},
+            {"date_from": "2026-06-10", "date_to": "2026-06-01"},
+            {"date_from": "2026-06-01", "date_to": "2026-06-30"},
+        ]:
+            self.assertEqual(self.client.get("/api/reception/dashboard/", params).status_code, 400, params)
+
+
+class ReceptionChangesFeedTests(TransactionTestCase):
+    # Feed entries only show up once their transaction committed, so no TestCase wrapping here.
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_user("recepcija"))
+
+    def _feed(self, cursor=None, **params):
+        if cursor:
+            params["cursor"] = cursor
+        response = self.client.get("/api/reception/changes/", params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def _reservation(self, external_id):
+        return Reservation.objects.create(
+            external_id=external_id, room_name="Deluxe", check_in_date=date(2026, 6, 1), check_out_date=date(2026, 6, 3)
+        )
+
+    def test_deltas_and_tombstones(self):
+        reservation = self._reservation("F1")
+        ana = Guest.objects.create(reservation=reservation, first_name="Ana", last_name="Horvat", is_primary=True)
+        ivo = Guest.objects.create(reservation=reservation, first_name="Ivo", last_name="Kos")
+
+        body = self._feed()
+        self.assertEqual([row["id"] for row in body["reservations"]], [reservation.id])
+        self.assertEqual(body["reservations"][0]["guests_count"], 2)
+        self.assertNotIn("guests", body["reservations"][0])
+        self.assertEqual([row["id"] for row in body["guests"]], [ana.id, ivo.id])
+        self.assertEqual(body["deleted"], {"reservations": [], "guests": []})
+        cursor = body["cursor"]
+
+        idle = self._feed(cursor)
+        self.assertEqual((idle["cursor"], idle["reservations"], idle["guests"]), (cursor, [], []))
+
+        response = self.client.patch(
+            f"/api/reception/reservations/{reservation.id}/guests/{ivo.id}/", {"is_primary": True}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        body = self._feed(cursor)
+        self.assertEqual(sorted(row["id"] for row in body["guests"]), [ana.id, ivo.id])
+        self.assertEqual(body["reservations"][0]["primary_guest_name"], "Ivo Kos")
+        cursor = body["cursor"]
+
+        ana_id, reservation_id = ana.id, reservation.id
+        ana.delete()
+        reservation.status = ReservationStatus.CANCELED
+        reservation.save()
+        body = self._feed(cursor)
+        self.assertEqual(body["deleted"], {"reservations": [], "guests": [ana_id]})
+        self.assertEqual(body["reservations"][0]["status"], "canceled")
+
+        reservation.delete()
+        body = self._feed(body["cursor"])
+        self.assertEqual(body["deleted"], {"reservations": [reservation_id], "guests": [ivo.id]})
+        self.assertEqual((body["reservations"], body["guests"]), ([], []))
+
+    def test_pages_and_invalid_cursor(self):
+        for i in range(5):
+            self._reservation(f"P{i}")
+        first = self._feed(limit=3)
+        self.assertTrue(first["has_more"])
+        second = self._feed(first["cursor"], limit=3)
+        self.assertFalse(second["has_more"])
+        self.assertEqual(len(first["reservations"]) + len(second["reservations"]), 5)
+        self.assertEqual(self.client.get("/api/reception/changes/", {"cursor": "abc"}).status_code, 400)
+
+    def test_pruned_cursor_requires_resync(self):
+        first = self._reservation("R0")
+        stale = self._feed()["cursor"]
+        second = self._reservation("R1")
+        self._reservation("R2")
+        fresh = self._feed(stale)["cursor"]
+
+        # Retention pruned R1's entry, which the stale client never saw.
+        ChangeLog.objects.filter(entity_id__in=[first.id, second.id]).delete()
+        response = self.client.get("/api/reception/changes/", {"cursor": stale})
+        self.assertEqual(response.status_code, 410)
+        self.assertTrue(response.json()["resync"])
+        self.assertEqual(self._feed(fresh)["reservations"], [])
+
+        ChangeLog.objects.all().delete()
+        self.assertEqual(self.client.get("/api/reception/changes/", {"cursor": fresh}).status_code, 410)
+        self.assertIsNone(self._feed()["cursor"])
+
+    def test_cursor_waits_for_slow_transactions(self):
+        early = self._reservation("SLOW")
+        cursor = self._feed()["cursor"]
+        written, release = threading.Event(), threading.Event()
+
+        def slow_writer():
+            try:
+                with transaction.atomic():
+                    # Older transaction whose entry commits after a newer one.
+                    record_changes(ChangeEntity.RESERVATION, [early.id])
+                    written.set()
+                    release.wait(5)
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=slow_writer)
+        thread.start()
+        self.assertTrue(written.wait(5))
+        fast = self._reservation("FAST")
+
+        held = self._feed(cursor)
+        self.assertEqual((held["cursor"], held["reservations"]), (cursor, []))
+
+        release.set()
+        thread.join()
+        body = self._feed(cursor)
+        self.assertEqual(sorted(row["id"] for row in body["reservations"]), [early.id, fast.id])
+
+
+@override_settings(RECEPTION_EVENTS_POLL_SECONDS=0.05, RECEPTION_EVENTS_HEARTBEAT_SECONDS=0.2)
+class ReceptionEventStreamTests(TransactionTestCase):
+    def _create_booking(self, external_id):
+        reservation = Reservation.objects.create(
+            external_id=external_id, room_name="Deluxe", check_in_date=date(2026, 6, 1), check_out_date=date(2026, 6, 3)
+        )
+        Guest.objects.create(reservation=reservation, first_name="Ana", last_name="Horvat", is_primary=True)
+        return reservation
+
+    async def _next_event(self, chunks):
+        while True:
+            chunk = (await asyncio.wait_for(anext(chunks), 5)).decode()
+            if not chunk.startswith((":", "retry:")):
+                lines = dict(line.split(": ", 1) for line in chunk.strip().split("\n"))
+                return lines["event"], json.loads(lines["data"]), lines["id"]
+
+    async def test_requires_login(self):
+        response = await self.async_client.get("/api/reception/events/")
+        self.assertEqual(response.status_code, 403)
+
+    async def test_streams_live_events_and_resumes(self):
+        user = await sync_to_async(get_user_model().objects.create_user)("recepcija")
+        await self.async_client.aforce_login(user)
+        response = await self.async_client.get("/api/reception/events/")
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        chunks = aiter(response.streaming_content)
+        self.assertEqual(await asyncio.wait_for(anext(chunks), 5), b"retry: 5000\n\n")
+        # Idle streams get keepalive comments.
+        self.assertEqual(await asyncio.wait_for(anext(chunks), 5), b": keepalive\n\n")
+
+        reservation = await sync_to_async(self._create_booking)("EV1")
+        name, data, first_id = await self._next_event(chunks)
+        self.assertEqual((name, data["id"], data["primary_guest_name"]), ("reservation.created", reservation.id, "Ana Horvat"))
+
+        reservation.status = ReservationStatus.CANCELED
+        await sync_to_async(reservation.save)()
+        await sync_to_async(OcrScanLog.objects.create)(
+            reservation=reservation, guest=await sync_to_async(reservation.guests.get)(), provider="microblink", status="ok"
+        )
+        self.assertEqual((await self._next_event(chunks))[0], "reservation.canceled")
+        name, data, _ = await self._next_event(chunks)
+        self.assertEqual((name, data["reservation"], data["status"]), ("ocr.completed", reservation.id, "ok"))
+        await chunks.aclose()
+
+        # A reconnect with Last-Event-ID replays what came after it.
+        response = await self.async_client.get("/api/reception/events/", headers={"Last-Event-ID": first_id})
+        chunks = aiter(response.streaming_content)
+        replay = [await self._next_event(chunks), await self._next_event(chunks)]
+        self.assertEqual([event[0] for event in replay], ["reservation.canceled", "ocr.completed"])
+        await chunks.aclose()
+
+    async def test_poll_survives_database_errors(self):
+        event = ReceptionEvent((5, 1), "reservation.deleted", {"id": 1})
+        polls = [OperationalError("server closed the connection"), ([event], (5, 1))]
+
+        def poll(cursor):
+            return polls.pop(0) if polls else ([], cursor)
+
+        broadcaster = ReceptionEventBroadcaster()
+        with (
+            mock.patch("reception.events.latest_cursor", return_value=(4, 9)),
+            mock.patch("reception.events.events_since", side_effect=poll),
+            mock.patch("reception.events.close_old_connections") as close_old,
+            self.assertLogs("reception.events", "ERROR"),
+        ):
+            queue = await broadcaster.subscribe()
+            self.assertEqual(await asyncio.wait_for(queue.get(), 5), event)
+            broadcaster.unsubscribe(queue)
+            await broadcaster.task
+        self.assertEqual(broadcaster.cursor, (5, 1))
+        self.assertGreaterEqual(close_old.call_count, 2)
+
+
+class OcrScanStatsTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_user("recepcija"))
+        reservation = Reservation.objects.create(
+            external_id="O1", room_name="Deluxe", check_in_date=date(2026, 6, 1), check_out_date=date(2026, 6, 3)
+        )
+        guest = Guest.objects.create(reservation=reservation, first_name="Ana", last_name="Horvat", is_primary=True)
+        tz = timezone.get_current_timezone()
+        scans = [
+            # (local time, status, duration)
+            (datetime(2026, 6, 1, 0, 30), "ok", 100),
+            (datetime(2026, 6, 1, 9, 0), "ok", 200),
+            (datetime(2026, 6, 1, 23, 30), "failed", 900),
+            (datetime(2026, 6, 2, 10, 0), "ok", None),
+            (datetime(2026, 7, 1, 10, 0), "ok", 400),
+        ]
+        for created_at, status, duration in scans:
+            log = OcrScanLog.objects.create(
+                reservation=reservation, guest=guest, provider="microblink", status=status, duration_ms=duration
+            )
+            OcrScanLog.objects.filter(pk=log.pk).update(created_at=created_at.replace(tzinfo=tz))
+
+    def test_totals_in_one_query(self):
+        with self.assertNumQueries(1):
+            body = self.client.get("/api/reception/ocr/stats/", {"date_from": "2026-06-01", "date_to": "2026-06-30"}).json()
+        self.assertEqual(body["total_scans"], 4)
+        self.assertEqual(
+            body["by_provider"]["microblink"],
+            {
+                "total": 4,
+                "success": 3,
+                "failed": 1,
+                "success_rate": 75.0,
+                "avg_duration_ms": 400,
+                "p50_duration_ms": 200,
+                "p95_duration_ms": 830,
+            },
+        )
+
+    def test_local_day_buckets(self):
+        with self.assertNumQueries(1):
+            body = self.client.get("/api/reception/ocr/stats/", {"bucket": "day"}).json()
+        stats = body["by_provider"]["microblink"]
+        self.assertEqual((stats["total"], stats["avg_duration_ms"]), (5, 400))
+        self.assertEqual(
+            [(row["start"][:10], row["total"], row["failed"], row["p50_duration_ms"]) for row in stats["buckets"]],
+            [("2026-06-01", 3, 1, 200), ("2026-06-02", 1, 0, None), ("2026-07-01", 1, 0, 400)],
+        )
+        self.assertEqual(self.client.get("/api/reception/ocr/stats/", {"bucket": "year"}).status_code, 400)
+
+    def test_average_duration_is_truncated(self):
+        log = OcrScanLog.objects.get(duration_ms=400)
+        OcrScanLog.objects.create(reservation=log.reservation, guest=log.guest, provider="microblink", status="ok", duration_ms=403)
+        body = self.client.get("/api/reception/ocr/stats/", {"date_from": "2026-07-01"}).json()
+        # 401.5 ms: truncated like the original int(Avg(...)); percentiles are rounded.
+        stats = body["by_provider"]["microblink"]
+        self.assertEqual((stats["avg_duration_ms"], stats["p50_duration_ms"]), (401, 402))
+
+
+def _reference_deep_find(node, keys, depth=7):
+    # Per-field search the OCR view used before OcrPayloadIndex.
+    if depth < 0 or node is None:
+        return None
+    if isinstance(node, list):
+        for item in node:
+            value = _reference_deep_find(item, keys, depth - 1)
+            if value not in (None, "", {}):
+                return value
+        return None
+    if isinstance(node, dict):
+        for key in keys:
+            if key in node and node[key] not in (None, "", {}):
+                return node[key]
+        for nested in node.values():
+            value = _reference_deep_find(nested, keys, depth - 1)
+            if value not in (None, "", {}):
+                return value
+    return None
+
+
+# Every lookup ReservationGuestOcrView makes, in its order.
+OCR_LOOKUPS = [
+    ["firstName", "secondaryId"],
+    ["lastName", "primaryId"],
+    ["documentNumber", "idNumber"],
+    ["isoAlpha2CountryCode", "nationality", "citizenship"],
+    ["dateOfBirth", "birthDate"],
+    ["sex"],
+    ["address"],
+    ["dateOfIssue"],
+    ["dateOfExpiry"],
+    ["issuingAuthority"],
+    ["personalIdNumber", "oib"],
+    ["documentAdditionalNumber"],
+    ["additionalPersonalIdNumber"],
+    ["documentCode"],
+    ["documentType", "type"],
+    ["countryName", "country"],
+    ["isoAlpha2CountryCode"],
+    ["isoAlpha3CountryCode"],
+    ["isoNumericCountryCode"],
+    ["rawMrzString"],
+    ["verified"],
+]
+
+
+def _microblink_payload(sides=2, image_kb=0):
+    image = "A" * (image_kb * 1024)
+
+    def side(n):
+        return {
+            "image": {"rawImage": image, "encoding": "base64"},
+            "viz": {
+                "firstName": {"latin": {"value": f"Ana{n}"}},
+                "lastName": {"value": "Đurić"},
+                "dateOfBirth": {"day": 2, "month": 3, "year": 1990},
+                "address": {"value": ""},
+                "documentNumber": {"value": f"11223344{n}"},
+                "sex": {"value": "F"},
+            },
+            "mrz": {
+                "primaryId": "DURIC",
+                "secondaryId": "ANA",
+                "rawMrzString": f"IOHRV{n}<<<",
+                "verified": n == 0,
+                "nationality": {"value": "HRV"},
+                "documentType": {"value": "ID"},
+            },
+            "barcode": {"fields": [{"type": "PDF417"}, {"country": {"value": "Hrvatska"}}]},
+            "dataMatchResult": {"states": [{"field": "dateOfBirth", "state": "Success"}]},
+        }
+    return {
+        "raw_payload": {
+            "result": {
+                "documentClassInfo": {"countryName": "Croatia", "isoAlpha2CountryCode": "", "type": "Identity"},
+                "subResults": [side(n) for n in range(sides)],
+                "dateOfExpiry": {"day": 1, "month": 1, "year": 2031},
+            }
+        }
+    }
+
+
+class OcrPayloadIndexTests(TestCase):
+    def test_matches_per_field_search(self):
+        rng = random.Random(7)
+        keys = sorted({key for lookup in OCR_LOOKUPS for key in lookup})
+
+        def random_node(depth):
+            if depth > 9 or rng.random() < 0.25:
+                return rng.choice([None, "", {}, [], 0, False, "x", {"value": "v"}, 3])
+            if rng.random() < 0.3:
+                return [random_node(depth + 1) for _ in range(rng.randint(0, 3))]
+            return {rng.choice(keys + ["other", "value"]): random_node(depth + 1) for _ in range(rng.randint(0, 4))}
+
+        payloads = [random_node(0) for _ in range(300)] + [_microblink_payload(3)["raw_payload"]]
+        for payload in payloads:
+            index = OcrPayloadIndex(payload)
+            for lookup in OCR_LOOKUPS:
+                self.assertEqual(index.find(*lookup), _reference_deep_find(payload, lookup), (payload, lookup))
+
+    def test_ocr_view_fills_guest_from_payload(self):
+        client = APIClient()
+        client.force_authenticate(get_user_model().objects.create_user("recepcija"))
+        reservation = Reservation.objects.create(
+            external_id="OCR1", room_name="Deluxe", check_in_date=date(2026, 6, 1), check_out_date=date(2026, 6, 3)
+        )
+        guest = Guest.objects.create(reservation=reservation, first_name="?", last_name="?", is_primary=True)
+        response = client.post(
+            f"/api/reception/reservations/{reservation.id}/guests/{guest.id}/ocr/",
+            {"provider": "microblink", "raw_payload": _microblink_payload(2)},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        guest.refresh_from_db()
+        self.assertEqual((guest.first_name, guest.last_name, guest.nationality), ("Ana0", "Đurić", "HR"))
+        self.assertEqual((guest.date_of_birth, guest.date_of_expiry), (date(1990, 3, 2), date(2031, 1, 1)))
+        self.assertEqual((guest.document_country, guest.mrz_raw_text, guest.mrz_verified), ("Croatia", "IOHRV0<<<", True))
+
+
+@tag("bench")
+class OcrPayloadIndexBench(TestCase):
+    """
+    Per-field searches vs one index walk on a large multi-side payload with image crops.
+    Excluded from the default run; use `manage.py test --tag bench`.
+    """
+
+    def test_payload_lookup_speed(self):
+        payload = _microblink_payload(sides=4, image_kb=256)["raw_payload"]
+        for _ in range(200):
+            payload["result"].setdefault("extra", []).append({"confidence": {"value": 0.9, "kind": "x"}})
+        rounds = 50
+
+        started = time.perf_counter()
+        for _ in range(rounds):
+            reference = [_reference_deep_find(payload, lookup) for lookup in OCR_LOOKUPS]
+        per_field = (time.perf_counter() - started) / rounds
+
+        started = time.perf_counter()
+        for _ in range(rounds):
+            index = OcrPayloadIndex(payload)
+            indexed = [index.find(*lookup) for lookup in OCR_LOOKUPS]
+        single_pass = (time.perf_counter() - started) / rounds
+
+        self.assertEqual(indexed, reference)
+        self.assertLess(single_pass, per_field)
+
+
+class OcrScanPayloadStorageTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_user("recepcija"))
+        self.reservation = Reservation.objects.create(
+            external_id="OCR2", room_name="Deluxe", check_in_date=date(2026, 6, 1), check_out_date=date(2026, 6, 3)
+        )
+        self.guest = Guest.objects.create(reservation=self.reservation, first_name="?", last_name="?", is_primary=True)
+
+    def _detail(self, scan_id):
+        response = self.client.get(f"/api/reception/ocr/logs/{scan_id}/")
+        self.assertEqual(response.status_code, 200)
+        return response.json()["raw_payload"]
+
+    def test_new_scans_store_compressed_payload_without_images(self):
+        payload = _microblink_payload(sides=2, image_kb=64)
+        response = self.client.post(
+            f"/api/reception/reservations/{self.reservation.id}/guests/{self.guest.id}/ocr/",
+            {"provider": "microblink", "raw_payload": payload},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        scan = OcrScanLog.objects.get(pk=response.json()["ocr_log_id"])
+        self.assertEqual(scan.raw_payload, {})
+        self.assertEqual(scan.payload.images_stripped, 2)
+        self.assertLess(scan.payload.stored_size * 50, scan.payload.raw_size)
+
+        stored = self._detail(scan.id)
+        side = stored["raw_payload"]["result"]["subResults"][0]
+        self.assertEqual(side["image"]["rawImage"]["omitted"], "image")
+        self.assertEqual(side["image"]["rawImage"]["length"], 64 * 1024)
+        self.assertEqual(side["image"]["encoding"], "base64")
+        self.assertEqual(side["mrz"], payload["raw_payload"]["result"]["subResults"][0]["mrz"])
+
+        listing = self.client.get("/api/reception/ocr/logs/").json()
+        self.assertNotIn("raw_payload", listing[0])
+
+    def test_backfill_moves_inline_payloads(self):
+        payload = {"result": {"faceImage": "data:image/png;base64,AAAA", "firstName": "Ana"}}
+        legacy = OcrScanLog.objects.create(
+            reservation=self.reservation, guest=self.guest, provider="microblink", status="ok", raw_payload=payload
+        )
+        self.assertEqual(self._detail(legacy.id), payload)
+
+        out = StringIO()
+        call_command("migrate_ocr_payloads", "--batch-size", "1", stdout=out)
+        self.assertIn("moved=1", out.getvalue())
+        legacy.refresh_from_db()
+        self.assertEqual(legacy.raw_payload, {})
+        stored = self._detail(legacy.id)
+        self.assertEqual((stored["result"]["firstName"], stored["result"]["faceImage"]["omitted"]), ("Ana", "image"))
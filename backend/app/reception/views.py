@@ -2,16 +2,35 @@ from datetime import date as date_type
 import json
 import time
 
-from django.db.models import Avg, Count, Prefetch, Q
+from django.contrib.postgres.search import SearchRank
+from django.db import transaction
+from django.db.models import F, IntegerField, Prefetch
+from django.db.models.functions import Cast
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils import timezone
 from django.utils.dateparse import parse_date
+from django.views import View
 from rest_framework import generics
 from rest_framework.parsers import JSONParser
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from .models import Guest, OcrProvider, OcrScanLog, OcrScanStatus, Reservation
-from .serializers import GuestDetailSerializer, OcrScanLogSerializer, ReservationTimelineSerializer
+from .changes import changes_since, cursor_expired, decode_cursor, encode_cursor
+from .dashboard import front_desk_dashboard
+from .events import event_stream
+from .models import ChangeEntity, Guest, OcrProvider, OcrScanLog, OcrScanStatus, Reservation
+from .ocr_payload import OcrPayloadIndex, store_scan_payload
+from .ocr_stats import BUCKETS, ocr_scan_stats
+from .pagination import KeysetPagination
+from .search import reservation_search_filter, reservation_search_query
+from .serializers import (
+    GuestChangeSerializer,
+    GuestDetailSerializer,
+    OcrScanLogDetailSerializer,
+    OcrScanLogSerializer,
+    ReservationTimelineSerializer,
+)
 
 
 class ReceptionHealthView(APIView):
@@ -25,14 +44,14 @@ class ReceptionHealthView(APIView):
 class ReservationTimelineListView(generics.ListAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = ReservationTimelineSerializer
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
-        queryset = (
-            Reservation.objects.all()
-            .annotate(guests_count=Count("guests", distinct=True))
-            .prefetch_related(Prefetch("guests", queryset=Guest.objects.order_by("-is_primary", "id")))
-            .order_by("check_in_date", "room_name", "id")
-        )
+        queryset = Reservation.objects.all().order_by("check_in_date", "room_name", "id")
+        if self._include_guests():
+            queryset = queryset.prefetch_related(
+                Prefetch("guests", queryset=Guest.objects.order_by("-is_primary", "id"))
+            )
 
         status = self.request.query_params.get("status")
         if status:
@@ -52,15 +71,28 @@ class ReservationTimelineListView(generics.ListAPIView):
 
         search = self.request.query_params.get("search", "").strip()
         if search:
-            queryset = queryset.filter(
-                Q(external_id__icontains=search)
-                | Q(room_name__icontains=search)
-                | Q(guests__first_name__icontains=search)
-                | Q(guests__last_name__icontains=search)
-            ).distinct()
+            condition = reservation_search_filter(search)
+            if condition is None:
+                return queryset.none()
+            query = reservation_search_query(search)
+            # Integer rank keeps ordering (and keyset cursors) exact; whole-prefix matches first.
+            queryset = (
+                queryset.filter(condition)
+                .annotate(search_rank=Cast(SearchRank(F("search_vector"), query) * 1000000, IntegerField()))
+                .order_by("-search_rank", "check_in_date", "room_name", "id")
+            )
 
         return queryset
 
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context["include_guests"] = self._include_guests()
+        return context
+
+    def _include_guests(self) -> bool:
+        # Listings that only need the summary columns pass include_guests=0 and skip the guest prefetch.
+        return self.request.query_params.get("include_guests", "1").strip().lower() not in ("0", "false", "no")
+
     def _parse_date(self, key: str) -> date_type | None:
         raw_value = self.request.query_params.get(key)
         if not raw_value:
@@ -68,14 +100,121 @@ class ReservationTimelineListView(generics.ListAPIView):
         return parse_date(raw_value)
 
 
+class ReceptionEventsView(View):
+    """
+    Server-Sent Events stream of reservation and OCR changes for logged-in staff.
+
+    Plain async Django view (DRF views are sync), served under ASGI (daphne / `config.asgi`).
+    Event ids are change feed cursors; a reconnecting EventSource sends the last one as
+    Last-Event-ID and gets the events it missed first.
+    """
+
+    async def get(self, request):
+        user = await request.auser()
+        if not user.is_authenticated:
+            return JsonResponse({"detail": "Authentication credentials were not provided."}, status=403)
+        raw_cursor = (request.headers.get("Last-Event-ID") or "").strip()
+        try:
+            cursor = decode_cursor(raw_cursor) if raw_cursor else None
+        except ValueError:
+            cursor = None
+        response = StreamingHttpResponse(event_stream(cursor), content_type="text/event-stream")
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+
+class ReceptionDashboardView(APIView):
+    permission_classes = [IsAuthenticated]
+    max_days = 14
+
+    def get(self, request):
+        try:
+            day = self._parse_date("date")
+            date_from = self._parse_date("date_from") or day or timezone.localdate()
+            date_to = self._parse_date("date_to") or day or date_from
+        except ValueError:
+            return Response({"detail": "Neispravan datum (YYYY-MM-DD)."}, status=400)
+        if not 0 <= (date_to - date_from).days < self.max_days:
+            return Response({"detail": f"Raspon mora biti od 1 do {self.max_days} dana."}, status=400)
+
+        dashboard = front_desk_dashboard(date_from=date_from, date_to=date_to)
+        for key in ("arrivals", "departures", "stay_overs"):
+            dashboard[key] = ReservationTimelineSerializer(dashboard[key], many=True, context={"request": request}).data
+        return Response({"date_from": date_from.isoformat(), "date_to": date_to.isoformat(), **dashboard})
+
+    def _parse_date(self, key: str) -> date_type | None:
+        raw_value = (self.request.query_params.get(key) or "").strip()
+        if not raw_value:
+            return None
+        parsed = parse_date(raw_value)
+        if parsed is None:
+            raise ValueError(raw_value)
+        return parsed
+
+
+class ReceptionChangesView(APIView):
+    """
+    Incremental feed of reservation/guest changes after `cursor` (see reception.changes).
+
+    Old entries are pruned after RETENTION_CHANGE_LOG_DAYS. A cursor older than the oldest
+    retained entry gets 410 with `"resync": true`: reload the data and continue with the
+    cursor of a request without one.
+    """
+
+    permission_classes = [IsAuthenticated]
+    default_limit = 200
+    max_limit = 1000
+
+    def get(self, request):
+        raw_cursor = (request.query_params.get("cursor") or "").strip()
+        try:
+            cursor = decode_cursor(raw_cursor) if raw_cursor else None
+            limit = int(request.query_params.get("limit") or self.default_limit)
+        except ValueError:
+            return Response({"detail": "Neispravan cursor ili limit."}, status=400)
+        limit = max(1, min(self.max_limit, limit))
+        if cursor is not None and cursor_expired(cursor):
+            return Response({"detail": "Cursor je istekao, potrebna je ponovna sinkronizacija.", "resync": True}, status=410)
+
+        changes, next_cursor, has_more = changes_since(cursor, limit=limit)
+        upserted = {ChangeEntity.RESERVATION: [], ChangeEntity.GUEST: []}
+        deleted = {ChangeEntity.RESERVATION: [], ChangeEntity.GUEST: []}
+        for (entity, entity_id), is_deleted in changes.items():
+            if entity in upserted:  # OCR scans are only streamed as events
+                (deleted if is_deleted else upserted)[entity].append(entity_id)
+
+        reservations = list(Reservation.objects.filter(id__in=upserted[ChangeEntity.RESERVATION]).order_by("id"))
+        guests = list(Guest.objects.filter(id__in=upserted[ChangeEntity.GUEST]).order_by("id"))
+        # Rows removed after their entry was written: report them as deleted, a tombstone follows anyway.
+        found = {ChangeEntity.RESERVATION: {r.id for r in reservations}, ChangeEntity.GUEST: {g.id for g in guests}}
+        for entity, ids in upserted.items():
+            deleted[entity] += [entity_id for entity_id in ids if entity_id not in found[entity]]
+
+        context = {"request": request, "include_guests": False}
+        return Response(
+            {
+                "cursor": encode_cursor(*next_cursor) if next_cursor else None,
+                "has_more": has_more,
+                "reservations": ReservationTimelineSerializer(reservations, many=True, context=context).data,
+                "guests": GuestChangeSerializer(guests, many=True).data,
+                "deleted": {
+                    "reservations": sorted(deleted[ChangeEntity.RESERVATION]),
+                    "guests": sorted(deleted[ChangeEntity.GUEST]),
+                },
+            }
+        )
+
+
 class ReservationDetailView(generics.RetrieveAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = ReservationTimelineSerializer
 
     def get_queryset(self):
         return (
-            Reservation.objects.annotate(guests_count=Count("guests", distinct=True))
-            .prefetch_related(Prefetch("guests", queryset=Guest.objects.order_by("-is_primary", "id")))
+            Reservation.objects.prefetch_related(
+                Prefetch("guests", queryset=Guest.objects.order_by("-is_primary", "id"))
+            )
             .order_by("id")
         )
 
@@ -127,18 +266,19 @@ class ReservationGuestOcrView(APIView):
         elapsed_ms = int((time.perf_counter() - started) * 1000)
         duration_ms = self._parse_int(request.data.get("duration_ms")) or elapsed_ms
 
-        ocr_log = OcrScanLog.objects.create(
-            reservation_id=reservation_id,
-            guest=guest,
-            provider=provider,
-            status=status_value,
-            duration_ms=duration_ms,
-            raw_payload=raw_payload,
-            suggested_fields=suggested_fields,
-            corrected_fields=corrected_fields,
-            error_message=error_message,
-            created_by=request.user if request.user.is_authenticated else None,
-        )
+        with transaction.atomic():
+            ocr_log = OcrScanLog.objects.create(
+                reservation_id=reservation_id,
+                guest=guest,
+                provider=provider,
+                status=status_value,
+                duration_ms=duration_ms,
+                suggested_fields=suggested_fields,
+                corrected_fields=corrected_fields,
+                error_message=error_message,
+                created_by=request.user if request.user.is_authenticated else None,
+            )
+            store_scan_payload(ocr_log, raw_payload)
 
         if status_value == OcrScanStatus.OK and guest_updates:
             for field, value in guest_updates.items():
@@ -165,24 +305,8 @@ class ReservationGuestOcrView(APIView):
         if isinstance(raw_payload.get("raw_payload"), dict):
             root = raw_payload["raw_payload"]
 
-        def deep_find(node, keys, depth=7):
-            if depth < 0 or node is None:
-                return None
-            if isinstance(node, list):
-                for item in node:
-                    value = deep_find(item, keys, depth - 1)
-                    if value not in (None, "", {}):
-                        return value
-                return None
-            if isinstance(node, dict):
-                for key in keys:
-                    if key in node and node[key] not in (None, "", {}):
-                        return node[key]
-                for nested in node.values():
-                    value = deep_find(nested, keys, depth - 1)
-                    if value not in (None, "", {}):
-                        return value
-            return None
+        # One walk over the payload; every field below is a lookup (same precedence as a per-field search).
+        index = OcrPayloadIndex(root)
 
         def text_value(value):
             if value is None:
@@ -239,42 +363,42 @@ class ReservationGuestOcrView(APIView):
 
         merged["first_name"] = prefer_value(
             merged.get("first_name"),
-            text_value(deep_find(root, ["firstName", "secondaryId"])),
+            text_value(index.find("firstName", "secondaryId")),
         )
         merged["last_name"] = prefer_value(
             merged.get("last_name"),
-            text_value(deep_find(root, ["lastName", "primaryId"])),
+            text_value(index.find("lastName", "primaryId")),
         )
         merged["document_number"] = prefer_value(
             merged.get("document_number"),
-            text_value(deep_find(root, ["documentNumber", "idNumber"])),
+            text_value(index.find("documentNumber", "idNumber")),
         )
         merged["nationality"] = prefer_value(
             merged.get("nationality"),
-            text_value(deep_find(root, ["isoAlpha2CountryCode", "nationality", "citizenship"])),
+            text_value(index.find("isoAlpha2CountryCode", "nationality", "citizenship")),
         )
         merged["date_of_birth"] = prefer_value(
             merged.get("date_of_birth"),
-            date_to_iso(deep_find(root, ["dateOfBirth", "birthDate"])),
+            date_to_iso(index.find("dateOfBirth", "birthDate")),
         )
 
-        merged["sex"] = text_value(deep_find(root, ["sex"]))
-        merged["address"] = text_value(deep_find(root, ["address"]))
-        merged["date_of_issue"] = date_to_iso(deep_find(root, ["dateOfIssue"]))
-        merged["date_of_expiry"] = date_to_iso(deep_find(root, ["dateOfExpiry"]))
-        merged["issuing_authority"] = text_value(deep_find(root, ["issuingAuthority"]))
-        merged["personal_id_number"] = text_value(deep_find(root, ["personalIdNumber", "oib"]))
-        merged["document_additional_number"] = text_value(deep_find(root, ["documentAdditionalNumber"]))
-        merged["additional_personal_id_number"] = text_value(deep_find(root, ["additionalPersonalIdNumber"]))
-        merged["document_code"] = text_value(deep_find(root, ["documentCode"]))
-        merged["document_type"] = text_value(deep_find(root, ["documentType", "type"]))
-        merged["document_country"] = text_value(deep_find(root, ["countryName", "country"]))
-        merged["document_country_iso2"] = text_value(deep_find(root, ["isoAlpha2CountryCode"]))
-        merged["document_country_iso3"] = text_value(deep_find(root, ["isoAlpha3CountryCode"]))
-        merged["document_country_numeric"] = text_value(deep_find(root, ["isoNumericCountryCode"]))
-        merged["mrz_raw_text"] = text_value(deep_find(root, ["rawMrzString"]))
-
-        mrz_verified_raw = deep_find(root, ["verified"])
+        merged["sex"] = text_value(index.find("sex"))
+        merged["address"] = text_value(index.find("address"))
+        merged["date_of_issue"] = date_to_iso(index.find("dateOfIssue"))
+        merged["date_of_expiry"] = date_to_iso(index.find("dateOfExpiry"))
+        merged["issuing_authority"] = text_value(index.find("issuingAuthority"))
+        merged["personal_id_number"] = text_value(index.find("personalIdNumber", "oib"))
+        merged["document_additional_number"] = text_value(index.find("documentAdditionalNumber"))
+        merged["additional_personal_id_number"] = text_value(index.find("additionalPersonalIdNumber"))
+        merged["document_code"] = text_value(index.find("documentCode"))
+        merged["document_type"] = text_value(index.find("documentType", "type"))
+        merged["document_country"] = text_value(index.find("countryName", "country"))
+        merged["document_country_iso2"] = text_value(index.find("isoAlpha2CountryCode"))
+        merged["document_country_iso3"] = text_value(index.find("isoAlpha3CountryCode"))
+        merged["document_country_numeric"] = text_value(index.find("isoNumericCountryCode"))
+        merged["mrz_raw_text"] = text_value(index.find("rawMrzString"))
+
+        mrz_verified_raw = index.find("verified")
         merged["mrz_verified"] = bool(mrz_verified_raw) if mrz_verified_raw is not None else None
 
         # Normalize common OCR artifacts.
@@ -367,9 +491,14 @@ class ReservationGuestOcrView(APIView):
 class OcrScanLogListView(generics.ListAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = OcrScanLogSerializer
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
-        queryset = OcrScanLog.objects.select_related("reservation", "guest").order_by("-created_at")
+        queryset = (
+            OcrScanLog.objects.select_related("reservation", "guest")
+            .defer("raw_payload")
+            .order_by("-created_at", "-id")
+        )
 
         provider = self.request.query_params.get("provider")
         if provider:
@@ -388,7 +517,8 @@ class OcrScanLogListView(generics.ListAPIView):
             queryset = queryset.filter(guest_id=guest_id)
 
         limit = self.request.query_params.get("limit")
-        if limit:
+        paginated = "cursor" in self.request.query_params or "page_size" in self.request.query_params
+        if limit and not paginated:
             try:
                 queryset = queryset[: max(1, min(500, int(limit)))]
             except ValueError:
@@ -397,42 +527,24 @@ class OcrScanLogListView(generics.ListAPIView):
         return queryset
 
 
+class OcrScanLogDetailView(generics.RetrieveAPIView):
+    permission_classes = [IsAuthenticated]
+    serializer_class = OcrScanLogDetailSerializer
+
+    def get_queryset(self):
+        return OcrScanLog.objects.select_related("reservation", "guest", "payload")
+
+
 class OcrScanStatsView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        queryset = OcrScanLog.objects.all()
-
-        date_from = parse_date(request.query_params.get("date_from", ""))
-        if date_from:
-            queryset = queryset.filter(created_at__date__gte=date_from)
-
-        date_to = parse_date(request.query_params.get("date_to", ""))
-        if date_to:
-            queryset = queryset.filter(created_at__date__lte=date_to)
-
-        providers = [OcrProvider.MICROBLINK]
-        by_provider = {}
-        total_count = queryset.count()
-
-        for provider in providers:
-            provider_qs = queryset.filter(provider=provider)
-            total = provider_qs.count()
-            success = provider_qs.filter(status=OcrScanStatus.OK).count()
-            failed = provider_qs.filter(status=OcrScanStatus.FAILED).count()
-            avg_duration = provider_qs.aggregate(value=Avg("duration_ms"))["value"]
-
-            by_provider[provider] = {
-                "total": total,
-                "success": success,
-                "failed": failed,
-                "success_rate": round((success / total) * 100, 2) if total else 0.0,
-                "avg_duration_ms": int(avg_duration) if avg_duration is not None else None,
-            }
-
-        return Response(
-            {
-                "total_scans": total_count,
-                "by_provider": by_provider,
-            }
-        )
+        bucket = (request.query_params.get("bucket") or "").strip() or None
+        if bucket and bucket not in BUCKETS:
+            return Response({"detail": f"Nepodrzani bucket (dozvoljeno: {', '.join(BUCKETS)})."}, status=400)
+        try:
+            date_from = parse_date(request.query_params.get("date_from", ""))
+            date_to = parse_date(request.query_params.get("date_to", ""))
+        except ValueError:
+            return Response({"detail": "Neispravan datum (YYYY-MM-DD)."}, status=400)
+        return Response(ocr_scan_stats(date_from=date_from, date_to=date_to, bucket=bucket))
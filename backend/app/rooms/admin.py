@@ -6,6 +6,7 @@ from .models import (
     Room,
     RoomType,
     RoomTypePhoto,
+    RoomRateDay,
     RoomTypePricingPlan,
     RoomTypePricingRule,
 )
@@ -130,6 +131,14 @@ class RoomTypePricingRuleAdmin(admin.ModelAdmin):
     readonly_fields = ("created_at", "updated_at")
 
 
+@admin.register(RoomRateDay)
+class RoomRateDayAdmin(admin.ModelAdmin):
+    list_display = ("id", "room", "date", "adults", "children", "price_per_night", "currency", "updated_at")
+    list_filter = ("room", "adults", "children")
+    date_hierarchy = "date"
+    readonly_fields = ("room", "date", "adults", "children", "price_per_night", "currency", "updated_at")
+
+
 @admin.register(PropertyInfo)
 class PropertyInfoAdmin(admin.ModelAdmin):
     list_display = ("id", "code", "is_active", "updated_at")
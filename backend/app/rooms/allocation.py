@@ -1,16 +1,107 @@
 from __future__ import annotations
 
+from typing import Iterable
+
+from django.core.exceptions import ValidationError
 from django.db import transaction
+from django.db.models import Case, Exists, IntegerField, OuterRef, Q, Value, When
 
 from reception.models import Reservation, ReservationStatus
+from rooms.locks import lock_room_types
 from rooms.models import Room
 
 
+# Candidate ranks, in the order the allocation rules try them.
+RANK_PREFERRED = 0
+RANK_PREFERRED_TYPE = 1
+RANK_CURRENT = 2
+RANK_RESERVATION_TYPE = 3
+
+ALLOCATION_ATTEMPTS = 3
+
+
 def _overlaps(*, a_start, a_end, b_start, b_end) -> bool:
     # half-open intervals: [start, end)
     return a_start < b_end and a_end > b_start
 
 
+def _conflicting_reservations(reservation: Reservation):
+    return (
+        Reservation.objects.exclude(id=reservation.id)
+        .exclude(status=ReservationStatus.CANCELED)
+        .filter(check_in_date__lt=reservation.check_out_date, check_out_date__gt=reservation.check_in_date)
+    )
+
+
+def _first_free_candidate(
+    reservation: Reservation,
+    preferred_code: str | None,
+    preferred_type_id: int | None,
+) -> tuple[Room, int] | None:
+    """
+    First free room by allocation rank, in a single anti-join query.
+
+    Ranks: the preferred room, other units of the preferred room's type (by code),
+    the current room, then units of the reservation's room type (by code).
+    """
+    whens = []
+    scope = Q()
+    if preferred_type_id:
+        whens += [
+            When(code=preferred_code, then=Value(RANK_PREFERRED)),
+            When(room_type_id=preferred_type_id, then=Value(RANK_PREFERRED_TYPE)),
+        ]
+        scope |= Q(code=preferred_code) | Q(room_type_id=preferred_type_id)
+    if reservation.room_id:
+        whens.append(When(id=reservation.room_id, then=Value(RANK_CURRENT)))
+        scope |= Q(id=reservation.room_id)
+    if reservation.room_type_id:
+        whens.append(When(room_type_id=reservation.room_type_id, then=Value(RANK_RESERVATION_TYPE)))
+        scope |= Q(room_type_id=reservation.room_type_id)
+    if not whens:
+        return None
+
+    room = (
+        Room.objects.filter(scope, is_active=True)
+        .annotate(
+            allocation_rank=Case(*whens, output_field=IntegerField()),
+            busy=Exists(_conflicting_reservations(reservation).filter(room_id=OuterRef("pk"))),
+        )
+        .filter(busy=False)
+        .select_related("room_type")
+        .order_by("allocation_rank", "code")
+        .first()
+    )
+    if room is None:
+        return None
+    return (room, room.allocation_rank)
+
+
+def lock_allocation_room_types(allocations: Iterable[tuple[int | None, str | None]]) -> None:
+    """
+    Lock, in one sorted pass, every room type the given (room_type_id, preferred_room_code)
+    allocations may take.
+
+    assign_room_for_reservation only orders the locks of its own call, so a transaction that
+    assigns several reservations (a multi-room booking) must take them all up front;
+    otherwise two such transactions can lock types A->B and B->A and deadlock.
+    """
+    room_type_ids = []
+    for room_type_id, preferred_room_code in allocations:
+        room_type_ids += [room_type_id, _preferred_room_type_id(_normalize_room_code(preferred_room_code))]
+    lock_room_types(room_type_ids)
+
+
+def _normalize_room_code(code: str | None) -> str | None:
+    return str(code).strip().upper() if code else None
+
+
+def _preferred_room_type_id(preferred_code: str | None) -> int | None:
+    if not preferred_code:
+        return None
+    return Room.objects.filter(code=preferred_code, is_active=True).values_list("room_type_id", flat=True).first()
+
+
 @transaction.atomic
 def assign_room_for_reservation(*, reservation_id: int, preferred_room_code: str | None = None) -> Room | None:
     reservation = Reservation.objects.select_for_update().get(id=reservation_id)
@@ -21,81 +112,39 @@ def assign_room_for_reservation(*, reservation_id: int, preferred_room_code: str
     if reservation.check_in_date >= reservation.check_out_date:
         return None
 
-    if preferred_room_code:
-        preferred = (
-            Room.objects.select_for_update()
-            .filter(code=str(preferred_room_code).strip().upper(), is_active=True)
-            .first()
-        )
-        if preferred:
-            conflicts = (
-                Reservation.objects.filter(room=preferred)
-                .exclude(id=reservation.id)
-                .exclude(status=ReservationStatus.CANCELED)
-                .filter(check_in_date__lt=reservation.check_out_date, check_out_date__gt=reservation.check_in_date)
-                .exists()
-            )
-            if not conflicts:
-                reservation.room = preferred
-                # Keep room_type consistent with the physical room.
-                reservation.room_type = preferred.room_type
-                reservation.save(update_fields=["room", "room_type", "updated_at"])
-                return preferred
-            # Preferred room is not available; try other units of the same room_type (e.g. K1 -> K2).
-            for alt in (
-                Room.objects.select_for_update()
-                .filter(room_type=preferred.room_type, is_active=True)
-                .exclude(id=preferred.id)
-                .order_by("code")
-            ):
-                alt_conflicts = (
-                    Reservation.objects.filter(room=alt)
-                    .exclude(id=reservation.id)
-                    .exclude(status=ReservationStatus.CANCELED)
-                    .filter(
-                        check_in_date__lt=reservation.check_out_date,
-                        check_out_date__gt=reservation.check_in_date,
-                    )
-                    .exists()
-                )
-                if alt_conflicts:
-                    continue
-                reservation.room = alt
-                reservation.room_type = alt.room_type
-                reservation.save(update_fields=["room", "room_type", "updated_at"])
-                return alt
-
-    if reservation.room and reservation.room.is_active:
-        # Keep existing assignment if it doesn't conflict.
-        conflicts = (
-            Reservation.objects.filter(room=reservation.room)
-            .exclude(id=reservation.id)
-            .exclude(status=ReservationStatus.CANCELED)
-            .filter(check_in_date__lt=reservation.check_out_date, check_out_date__gt=reservation.check_in_date)
-            .exists()
-        )
-        if not conflicts:
-            return reservation.room
+    preferred_code = _normalize_room_code(preferred_room_code)
+    preferred_type_id = _preferred_room_type_id(preferred_code)
 
-    if not reservation.room_type:
-        return None
+    # Allocators competing for the same units serialize here (fixed order, no row locks);
+    # stays they commit before we get the lock are visible to the candidate query.
+    # Callers assigning several reservations in one transaction lock all types first
+    # (lock_allocation_room_types); re-taking a held advisory lock is a no-op.
+    lock_room_types([preferred_type_id, reservation.room_type_id])
 
-    rooms = list(Room.objects.select_for_update().filter(room_type=reservation.room_type, is_active=True).order_by("code"))
-    if not rooms:
-        return None
+    for _ in range(ALLOCATION_ATTEMPTS):
+        candidate = _first_free_candidate(reservation, preferred_code, preferred_type_id)
+        if candidate is None:
+            return None
+        room, rank = candidate
 
-    # Find a free room.
-    for room in rooms:
-        conflicts = (
-            Reservation.objects.filter(room=room)
-            .exclude(id=reservation.id)
-            .exclude(status=ReservationStatus.CANCELED)
-            .filter(check_in_date__lt=reservation.check_out_date, check_out_date__gt=reservation.check_in_date)
-            .exists()
-        )
-        if not conflicts:
-            reservation.room = room
-            reservation.save(update_fields=["room", "updated_at"])
+        if rank == RANK_CURRENT:
+            # Keep existing assignment if it doesn't conflict.
             return room
 
+        previous = (reservation.room, reservation.room_type)
+        reservation.room = room
+        update_fields = ["room", "updated_at"]
+        if rank in (RANK_PREFERRED, RANK_PREFERRED_TYPE):
+            # Keep room_type consistent with the physical room.
+            reservation.room_type = room.room_type
+            update_fields.insert(1, "room_type")
+        try:
+            reservation.save(update_fields=update_fields)
+        except ValidationError:
+            # A writer that does not take room-type locks (e.g. admin) got there first; the exclusion
+            # constraint rejected ours, so pick again.
+            reservation.room, reservation.room_type = previous
+            continue
+        return room
+
     return None
@@ -5,3 +5,6 @@ class RoomsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "rooms"
 
+    def ready(self):
+        from rooms import signals  # noqa: F401
+
@@ -0,0 +1,194 @@
+from __future__ import annotations
+
+import bisect
+from decimal import Decimal
+from typing import Callable, Sequence
+
+from rooms.models import Room
+from rooms.services import room_capacity
+
+
+RoomTotalFn = Callable[[Room, int, int], "Decimal | None"]
+
+
+def allocate_party(*, capacities: list[int], adults: int, children: int) -> list[tuple[int, int]] | None:
+    remaining_adults = adults
+    remaining_children = children
+    allocation: list[tuple[int, int]] = []
+
+    for cap in capacities:
+        adults_here = min(remaining_adults, cap)
+        remaining_adults -= adults_here
+        free_after_adults = cap - adults_here
+        children_here = min(remaining_children, free_after_adults)
+        remaining_children -= children_here
+        allocation.append((adults_here, children_here))
+
+    if remaining_adults > 0 or remaining_children > 0:
+        return None
+    return allocation
+
+
+class ComboSearch:
+    """
+    Top-k room combinations for a party, ranked by (rooms count, total, room ids).
+
+    Every (room, adults, children) allocation is priced at most once. Subsets are
+    enumerated in the same order as itertools.combinations over `rooms`, pruned when
+    the remaining rooms cannot fit the party or when a lower bound on the subset's
+    price is already worse than the k-th best combo of the same size. Sizes are tried
+    in ascending order and the search stops once k combos are found, since any larger
+    combo ranks after them.
+    """
+
+    def __init__(
+        self,
+        *,
+        rooms: Sequence[Room],
+        adults: int,
+        children: int,
+        room_total: RoomTotalFn,
+        capacity: Callable[[Room], int] = room_capacity,
+    ):
+        self.rooms = list(rooms)
+        self.adults = adults
+        self.children = children
+        self.guests = adults + children
+        self._room_total = room_total
+        self.caps = [capacity(room) for room in self.rooms]
+        self._prices: dict[tuple[int, int, int], Decimal | None] = {}
+        self._lower_bounds: list[Decimal | None] | None = None
+
+    def price(self, index: int, adults: int, children: int) -> Decimal | None:
+        key = (index, adults, children)
+        if key not in self._prices:
+            self._prices[key] = self._room_total(self.rooms[index], adults, children)
+        return self._prices[key]
+
+    def lower_bounds(self) -> list[Decimal | None]:
+        # Cheapest price each room can get under any allocation the greedy split may give it;
+        # None when the room cannot be priced at all (it can never be part of a valid combo).
+        if self._lower_bounds is None:
+            bounds: list[Decimal | None] = []
+            for index, cap in enumerate(self.caps):
+                prices = [
+                    self.price(index, ad, ch)
+                    for ad in range(0, min(cap, self.adults) + 1)
+                    for ch in range(0, min(cap - ad, self.children) + 1)
+                ]
+                prices = [p for p in prices if p is not None]
+                bounds.append(min(prices) if prices else None)
+            self._lower_bounds = bounds
+        return self._lower_bounds
+
+    def evaluate(self, subset: tuple[int, ...]) -> dict | None:
+        subset_caps = [self.caps[i] for i in subset]
+        if sum(subset_caps) < self.guests:
+            return None
+
+        order = sorted(range(len(subset)), key=lambda i: subset_caps[i], reverse=True)
+        sorted_caps = [subset_caps[i] for i in order]
+        alloc_sorted = allocate_party(capacities=sorted_caps, adults=self.adults, children=self.children)
+        if not alloc_sorted:
+            return None
+
+        allocation: list[dict] = []
+        combo_total = Decimal("0.00")
+        for alloc_idx, subset_idx in enumerate(order):
+            room_index = subset[subset_idx]
+            room = self.rooms[room_index]
+            ad, ch = alloc_sorted[alloc_idx]
+            room_total = self.price(room_index, ad, ch)
+            if room_total is None:
+                return None
+            combo_total += room_total
+            allocation.append(
+                {
+                    "room_id": room.id,
+                    "room_code": room.code,
+                    "adults": ad,
+                    "children": ch,
+                }
+            )
+
+        allocation.sort(key=lambda x: x["room_code"])
+        return {
+            "rooms_count": len(subset),
+            "allocation": allocation,
+            "pricing": {
+                "currency": "EUR",
+                "accommodation_total": str(combo_total),
+            },
+            "_total": combo_total,
+        }
+
+    def best_of_size(self, size: int, wanted: int) -> list[dict]:
+        n = len(self.rooms)
+        if size > n or wanted <= 0:
+            return []
+
+        # suffix_caps[i][k]: sum of the k largest capacities among rooms[i:].
+        suffix_caps: list[list[int]] = []
+        for i in range(n + 1):
+            top = sorted(self.caps[i:], reverse=True)[:size]
+            suffix_caps.append([sum(top[:k]) for k in range(size + 1)])
+
+        ranked: list[tuple[tuple[Decimal, str], dict]] = []
+
+        def bound() -> Decimal | None:
+            return ranked[-1][0][0] if len(ranked) >= wanted else None
+
+        def search(start: int, chosen: tuple[int, ...], cap_sum: int, lb_sum: Decimal) -> None:
+            slots = size - len(chosen)
+            if slots == 0:
+                combo = self.evaluate(chosen)
+                if combo is None:
+                    return
+                key = (combo["_total"], ",".join(str(a["room_id"]) for a in combo["allocation"]))
+                bisect.insort(ranked, (key, combo), key=lambda item: item[0])
+                del ranked[wanted:]
+                return
+
+            for i in range(start, n - slots + 1):
+                if cap_sum + self.caps[i] + suffix_caps[i + 1][slots - 1] < self.guests:
+                    if cap_sum + suffix_caps[i][slots] < self.guests:
+                        break
+                    continue
+
+                next_lb = lb_sum
+                limit = bound()
+                if limit is not None:
+                    bounds = self.lower_bounds()
+                    if bounds[i] is None:
+                        continue
+                    next_lb = lb_sum + bounds[i]
+                    rest = sorted(b for b in bounds[i + 1 :] if b is not None)[: slots - 1]
+                    if len(rest) < slots - 1 or next_lb + sum(rest, Decimal("0.00")) > limit:
+                        continue
+                search(i + 1, chosen + (i,), cap_sum + self.caps[i], next_lb)
+
+        search(0, (), 0, Decimal("0.00"))
+        return [combo for _, combo in ranked]
+
+    def top(self, *, limit: int, max_rooms: int) -> list[dict]:
+        combos: list[dict] = []
+        for size in range(1, max_rooms + 1):
+            if len(combos) >= limit:
+                break
+            combos.extend(self.best_of_size(size, limit - len(combos)))
+        for combo in combos:
+            combo.pop("_total", None)
+        return combos[:limit]
+
+
+def find_best_combos(
+    *,
+    rooms: Sequence[Room],
+    adults: int,
+    children: int,
+    room_total: RoomTotalFn,
+    max_rooms: int = 3,
+    limit: int = 3,
+) -> list[dict]:
+    search = ComboSearch(rooms=rooms, adults=adults, children=children, room_total=room_total)
+    return search.top(limit=limit, max_rooms=max_rooms)
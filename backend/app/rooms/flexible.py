@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+from datetime import date, timedelta
+from typing import Sequence
+
+from django.conf import settings
+
+from rooms.combos import find_best_combos
+from rooms.models import Room
+from rooms.occupancy import occupied_masks
+from rooms.pricing import RateEngine, StayTotals
+
+
+def flexible_date_cells(
+    *,
+    rooms: Sequence[Room],
+    checkin_from: date,
+    checkin_to: date,
+    min_nights: int,
+    max_nights: int,
+    adults: int,
+    children: int,
+) -> list[dict]:
+    """
+    Cheapest combo for every (checkin, nights) cell of a flexible-date search.
+
+    Occupancy comes from one reservation query over the whole window and prices from
+    one RateEngine load; each (room, adults, children) gets a prefix-sum table so every
+    stay total inside the window is O(1).
+    """
+    window_start = checkin_from
+    window_end = checkin_to + timedelta(days=max_nights)
+    masks = occupied_masks(rooms, window_start, window_end)
+    rates = RateEngine.for_rooms(rooms)
+    stay_totals: dict[tuple[int, int, int], StayTotals] = {}
+
+    def totals_for(room: Room, ad: int, ch: int) -> StayTotals:
+        key = (room.id, ad, ch)
+        if key not in stay_totals:
+            stay_totals[key] = rates.stay_totals(room, window_start, window_end, adults=ad, children=ch)
+        return stay_totals[key]
+
+    cells: list[dict] = []
+    checkin = checkin_from
+    while checkin <= checkin_to:
+        offset = (checkin - window_start).days
+        for nights in range(min_nights, max_nights + 1):
+            checkout = checkin + timedelta(days=nights)
+            stay_mask = ((1 << nights) - 1) << offset
+            free_rooms = [room for room in rooms if not masks[room.id] & stay_mask]
+            combos = find_best_combos(
+                rooms=free_rooms,
+                adults=adults,
+                children=children,
+                room_total=lambda room, ad, ch, ci=checkin, co=checkout: totals_for(room, ad, ch).total(ci, co),
+                max_rooms=settings.BOOKING_COMBO_MAX_ROOMS,
+                limit=1,
+            )
+            cells.append(
+                {
+                    "checkin": checkin.isoformat(),
+                    "checkout": checkout.isoformat(),
+                    "nights": nights,
+                    "available_rooms": len(free_rooms),
+                    "combo": combos[0] if combos else None,
+                }
+            )
+        checkin += timedelta(days=1)
+    return cells
@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+from datetime import date
+from typing import Sequence
+
+from rooms.models import Room
+from rooms.occupancy import occupied_masks
+from rooms.pricing import RateEngine
+from rooms.rate_table import occupancy_keys
+from rooms.services import room_capacity
+
+
+def property_grid(
+    *,
+    rooms: Sequence[Room],
+    start: date,
+    end: date,
+    occupancy: tuple[int, int] | None = None,
+) -> list[dict]:
+    """
+    Columnar availability and nightly prices for every room over [start, end).
+
+    Per room, `available` is a string with one "1"/"0" per night and every entry in
+    `prices` is a list aligned with it (nightly price or None), one per occupancy the
+    room can host, or only `occupancy` when given. One reservation query and one
+    RateEngine load, independent of the range length.
+    """
+    days = (end - start).days
+    masks = occupied_masks(rooms, start, end)
+    rates = RateEngine.for_rooms(rooms)
+
+    grid: list[dict] = []
+    for room in rooms:
+        occupied = masks[room.id]
+        keys = occupancy_keys(room)
+        if occupancy is not None:
+            keys = [occupancy] if occupancy in keys else []
+        prices = []
+        for adults, children in keys:
+            nightly = rates.nightly_prices(room, start, end, adults=adults, children=children)
+            prices.append(
+                {
+                    "adults": adults,
+                    "children": children,
+                    "nightly": [str(price) if price is not None else None for price in nightly],
+                }
+            )
+        grid.append(
+            {
+                "room_id": room.id,
+                "room_code": room.code,
+                "room_type_code": room.room_type.code,
+                "capacity": room_capacity(room),
+                "available": "".join("0" if (occupied >> i) & 1 else "1" for i in range(days)),
+                "prices": prices,
+            }
+        )
+    return grid
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+from datetime import date, timedelta
+from typing import Sequence
+
+from reception.models import Reservation, ReservationStatus
+from rooms.models import Room
+
+
+def house_view(*, rooms: Sequence[Room], start: date, days: int) -> dict:
+    """
+    Front-desk grid of rooms x days over [start, start + days).
+
+    Each stay is one span `{"reservation", "offset", "length"}` clipped to the window (offset
+    in days from `start`), listed under its room or under `unassigned`; reservation details
+    are listed once in `reservations`. One reservation query, so the payload grows with the
+    number of stays, not with rooms x days.
+    """
+    end = start + timedelta(days=days)
+    rows = list(
+        Reservation.objects.filter(check_in_date__lt=end, check_out_date__gt=start)
+        .exclude(status=ReservationStatus.CANCELED)
+        .order_by("check_in_date", "id")
+        .values(
+            "id",
+            "external_id",
+            "room_id",
+            "room_name",
+            "check_in_date",
+            "check_out_date",
+            "status",
+            "guests_count",
+            "primary_guest_name",
+            "primary_guest_nationality",
+        )
+    )
+
+    spans_by_room: dict[int, list[dict]] = {room.id: [] for room in rooms}
+    unassigned: list[dict] = []
+    reservations: list[dict] = []
+    for row in rows:
+        offset = max((row["check_in_date"] - start).days, 0)
+        length = min((row["check_out_date"] - start).days, days) - offset
+        span = {"reservation": row["id"], "offset": offset, "length": length}
+        spans = spans_by_room.get(row["room_id"]) if row["room_id"] else unassigned
+        if spans is None:
+            # Stay on a room outside the grid (e.g. deactivated); nothing to place it on.
+            continue
+        spans.append(span)
+        reservations.append(
+            {
+                "id": row["id"],
+                "external_id": row["external_id"],
+                "room_name": row["room_name"],
+                "check_in_date": row["check_in_date"].isoformat(),
+                "check_out_date": row["check_out_date"].isoformat(),
+                "status": row["status"],
+                "guests_count": row["guests_count"],
+                "primary_guest_name": row["primary_guest_name"],
+                "primary_guest_nationality_iso2": row["primary_guest_nationality"],
+            }
+        )
+
+    return {
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "days": days,
+        "rooms": [
+            {
+                "room_id": room.id,
+                "room_code": room.code,
+                "room_type_code": room.room_type.code,
+                "spans": spans_by_room[room.id],
+            }
+            for room in rooms
+        ],
+        "unassigned": unassigned,
+        "reservations": reservations,
+    }
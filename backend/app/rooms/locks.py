@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+from typing import Iterable
+
+from django.db import connection
+
+
+# High 32 bits of the advisory lock key, so allocation locks don't collide with other advisory users.
+ROOM_TYPE_LOCK_NAMESPACE = 0x5254
+# Serializes rolling the RoomRateDay horizon forward (rooms.rate_table.extend_rate_horizon).
+RATE_TABLE_LOCK_NAMESPACE = 0x5244
+
+
+def advisory_lock_key(namespace: int, object_id: int) -> int:
+    return (namespace << 32) | object_id
+
+
+def lock_room_types(room_type_ids: Iterable[int | None]) -> None:
+    """
+    Take transaction-scoped advisory locks for the given room types, in ascending id order.
+
+    Allocators for the same room type serialize on these; room and reservation rows stay
+    unlocked for readers and unrelated writers. No-op outside PostgreSQL.
+    """
+    room_type_ids = sorted({room_type_id for room_type_id in room_type_ids if room_type_id})
+    if not room_type_ids or connection.vendor != "postgresql":
+        return
+    with connection.cursor() as cursor:
+        for room_type_id in room_type_ids:
+            cursor.execute(
+                "SELECT pg_advisory_xact_lock(%s)",
+                [advisory_lock_key(ROOM_TYPE_LOCK_NAMESPACE, room_type_id)],
+            )
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from rooms.models import Room
+from rooms.occupancy import OCCUPANCY_EPOCH, expected_bitmaps, refresh_room_occupancy, unpack_bitmap
+
+
+class Command(BaseCommand):
+    help = "Compare stored room occupancy bitmaps with reservations (optionally repair them)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--fix", action="store_true", default=False, help="Rewrite bitmaps that drifted.")
+
+    def handle(self, *args, **options):
+        rooms = list(Room.objects.order_by("code").only("id", "code", "occupied_nights"))
+        expected = expected_bitmaps([room.id for room in rooms])
+
+        drifted = []
+        for room in rooms:
+            stored = unpack_bitmap(room.occupied_nights)
+            diff = stored ^ expected[room.id]
+            if not diff:
+                continue
+            drifted.append(room)
+            first_night = (diff & -diff).bit_length() - 1
+            self.stdout.write(
+                self.style.WARNING(
+                    f"room={room.code} mismatched_nights={bin(diff).count('1')} "
+                    f"first_offset={first_night} (epoch {OCCUPANCY_EPOCH})"
+                )
+            )
+
+        if drifted and options["fix"]:
+            refresh_room_occupancy([room.id for room in drifted])
+            self.stdout.write(self.style.SUCCESS(f"occupancy repaired: rooms={len(drifted)}"))
+            return
+
+        self.stdout.write(self.style.SUCCESS(f"occupancy checked: rooms={len(rooms)} drifted={len(drifted)}"))
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from rooms.models import Room
+from rooms.reallocation import reallocate_rooms
+
+
+class Command(BaseCommand):
+    help = "Re-solve physical room assignments of upcoming stays to minimize unsellable gaps."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--start", default=None, help="First check-in date (YYYY-MM-DD, default today); started stays never move."
+        )
+        parser.add_argument("--days", type=int, default=None, help="Horizon length (default REALLOCATION_HORIZON_DAYS).")
+        parser.add_argument("--dry-run", action="store_true", default=False, help="Only report the proposed moves.")
+
+    def handle(self, *args, **options):
+        start = None
+        if options["start"]:
+            try:
+                start = parse_date(options["start"])
+            except ValueError:
+                pass
+            if start is None:
+                raise CommandError(f"Invalid --start date: {options['start']} (expected YYYY-MM-DD)")
+        result = reallocate_rooms(start=start, days=options["days"], dry_run=options["dry_run"])
+
+        codes = dict(Room.objects.values_list("id", "code"))
+        for reservation_id, (from_room, to_room) in sorted(result.moves.items()):
+            self.stdout.write(f"reservation={reservation_id} {codes.get(from_room)} -> {codes.get(to_room)}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"reallocation {'applied' if result.applied else 'planned'}: moves={len(result.moves)} "
+                f"unsellable_nights={result.gap_nights_before}->{result.gap_nights_after}"
+            )
+        )
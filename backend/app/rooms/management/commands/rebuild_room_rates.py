@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from rooms.models import Room
+from rooms.rate_table import extend_rate_horizon, rate_horizon, rebuild_room_rates
+
+
+class Command(BaseCommand):
+    help = "Rebuild materialized nightly rates (RoomRateDay) from pricing plans and rules."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--room",
+            action="append",
+            default=[],
+            help="Room code to rebuild (repeatable). Defaults to all rooms.",
+        )
+        parser.add_argument(
+            "--extend",
+            action="store_true",
+            help="Only materialize days the horizon gained since the last build (daily cron).",
+        )
+
+    def handle(self, *args, **options):
+        if options["extend"]:
+            if options["room"]:
+                raise CommandError("--extend always covers all rooms.")
+            written = extend_rate_horizon()
+            self.stdout.write(self.style.SUCCESS(f"room rates extended: rows={written} horizon_end={rate_horizon()[1]}"))
+            return
+
+        room_ids = None
+        codes = [str(c).strip().upper() for c in options["room"] if str(c).strip()]
+        if codes:
+            rooms = dict(Room.objects.filter(code__in=codes).values_list("code", "id"))
+            missing = sorted(set(codes) - set(rooms))
+            if missing:
+                raise CommandError(f"Unknown room code(s): {', '.join(missing)}")
+            room_ids = list(rooms.values())
+
+        start, end = rate_horizon()
+        written = rebuild_room_rates(room_ids=room_ids)
+        self.stdout.write(self.style.SUCCESS(f"room rates rebuilt: rows={written} range={start}..{end}"))
@@ -0,0 +1,33 @@
+# Generated by Django 6.0.2 on 2026-10-16 23:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rooms', '0015_roomtypepricingrule_children_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RoomRateDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('adults', models.PositiveSmallIntegerField()),
+                ('children', models.PositiveSmallIntegerField(default=0)),
+                ('price_per_night', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('currency', models.CharField(default='EUR', max_length=3)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('room', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rate_days', to='rooms.room')),
+            ],
+            options={
+                'verbose_name': 'Dnevna cijena sobe',
+                'verbose_name_plural': 'Dnevne cijene soba',
+                'ordering': ['room_id', 'date', 'adults', 'children'],
+                'constraints': [models.UniqueConstraint(fields=('room', 'adults', 'children', 'date'), name='unique_room_rate_day_per_occupancy')],
+            },
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 6.0.2 on 2026-10-16 23:04
+
+from datetime import date
+
+from django.db import migrations, models
+
+# Frozen copies of rooms.occupancy.OCCUPANCY_EPOCH and pack_bitmap as of this migration.
+OCCUPANCY_EPOCH = date(2026, 1, 1)
+
+
+def _pack_bitmap(bits):
+    return bits.to_bytes((bits.bit_length() + 7) // 8, "little")
+
+
+def _backfill_occupied_nights(apps, schema_editor):
+    Room = apps.get_model("rooms", "Room")
+    Reservation = apps.get_model("reception", "Reservation")
+
+    bitmaps: dict[int, int] = {}
+    rows = (
+        Reservation.objects.filter(room__isnull=False, check_out_date__gt=OCCUPANCY_EPOCH)
+        .exclude(status="canceled")
+        .values_list("room_id", "check_in_date", "check_out_date")
+    )
+    for room_id, check_in, check_out in rows:
+        start = max(check_in, OCCUPANCY_EPOCH)
+        nights = (check_out - start).days
+        if nights <= 0:
+            continue
+        bitmaps[room_id] = bitmaps.get(room_id, 0) | (((1 << nights) - 1) << (start - OCCUPANCY_EPOCH).days)
+
+    for room in Room.objects.filter(id__in=list(bitmaps)):
+        room.occupied_nights = _pack_bitmap(bitmaps[room.id])
+        room.save(update_fields=["occupied_nights"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reception', '0007_reservation_room_reservation_room_type'),
+        ('rooms', '0016_roomrateday'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='room',
+            name='occupied_nights',
+            field=models.BinaryField(blank=True, default=bytes),
+        ),
+        migrations.RunPython(_backfill_occupied_nights, migrations.RunPython.noop),
+    ]
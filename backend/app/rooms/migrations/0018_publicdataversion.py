@@ -0,0 +1,32 @@
+# Generated by Django 6.0.2 on 2026-10-16 23:44
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def _create_version_row(apps, schema_editor):
+    PublicDataVersion = apps.get_model("rooms", "PublicDataVersion")
+    PublicDataVersion.objects.get_or_create(pk=1, defaults={"changed_at": timezone.now()})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rooms', '0017_room_occupied_nights'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PublicDataVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('counter', models.PositiveBigIntegerField(default=0)),
+                ('changed_at', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Verzija javnih podataka',
+                'verbose_name_plural': 'Verzija javnih podataka',
+            },
+        ),
+        migrations.RunPython(_create_version_row, migrations.RunPython.noop),
+    ]
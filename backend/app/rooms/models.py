@@ -148,6 +148,8 @@ class Room(models.Model):
         related_name="rooms",
     )
     is_active = models.BooleanField(default=True)
+    # Packed occupied-nights bitmap maintained from reservations (see rooms.occupancy).
+    occupied_nights = models.BinaryField(default=bytes, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -352,6 +354,62 @@ class RoomTypePricingRule(models.Model):
         return True
 
 
+class RoomRateDay(models.Model):
+    """
+    Materialized nightly price per room, date and occupancy.
+
+    Derived from RoomTypePricingPlan/RoomTypePricingRule; rebuilt incrementally
+    (see rooms.rate_table) so stay totals become a single indexed range SUM.
+    A missing row means "not materialized" (outside horizon or no applicable plan).
+    """
+
+    room = models.ForeignKey(
+        Room,
+        on_delete=models.CASCADE,
+        related_name="rate_days",
+    )
+    date = models.DateField()
+    adults = models.PositiveSmallIntegerField()
+    children = models.PositiveSmallIntegerField(default=0)
+    price_per_night = models.DecimalField(max_digits=10, decimal_places=2)
+    currency = models.CharField(max_length=3, default="EUR")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["room_id", "date", "adults", "children"]
+        constraints = [
+            # Column order matches the range lookup: room + occupancy, then date range.
+            models.UniqueConstraint(
+                fields=["room", "adults", "children", "date"],
+                name="unique_room_rate_day_per_occupancy",
+            ),
+        ]
+        verbose_name = "Dnevna cijena sobe"
+        verbose_name_plural = "Dnevne cijene soba"
+
+    def __str__(self) -> str:
+        return f"{self.room_id} {self.date} {self.adults}+{self.children}: {self.price_per_night}"
+
+
+class PublicDataVersion(models.Model):
+    """
+    Single row versioning everything public availability/pricing responses depend on.
+
+    Bumped after each committed write to reservations, rooms or pricing (see rooms.public_cache);
+    both counter and changed_at only ever increase.
+    """
+
+    counter = models.PositiveBigIntegerField(default=0)
+    changed_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name = "Verzija javnih podataka"
+        verbose_name_plural = "Verzija javnih podataka"
+
+    def __str__(self) -> str:
+        return f"{self.counter} @ {self.changed_at.isoformat()}"
+
+
 class PropertyInfo(models.Model):
     """
     Singleton-ish model for global property data used by the public booking web.
@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import calendar
+from collections import defaultdict
+from datetime import date
+from typing import Iterable, Sequence
+
+from django.db import transaction
+from django.db.models import Q
+
+from reception.models import Reservation, ReservationStatus
+from rooms.models import Room
+
+
+# Bit i of Room.occupied_nights is the night starting OCCUPANCY_EPOCH + i days.
+# Nights before the epoch are not indexed; helpers return None so callers query instead.
+# Migration rooms.0017 keeps a frozen copy; the epoch must not change once data exists.
+OCCUPANCY_EPOCH = date(2026, 1, 1)
+
+
+def night_offset(day: date) -> int:
+    return (day - OCCUPANCY_EPOCH).days
+
+
+def pack_bitmap(bits: int) -> bytes:
+    return bits.to_bytes((bits.bit_length() + 7) // 8, "little")
+
+
+def unpack_bitmap(raw) -> int:
+    if not raw:
+        return 0
+    return int.from_bytes(bytes(raw), "little")
+
+
+def nights_mask(start: date, end: date) -> int:
+    """Bit mask of the nights in [start, end), relative to the epoch."""
+    nights = (end - start).days
+    if nights <= 0:
+        return 0
+    return ((1 << nights) - 1) << night_offset(start)
+
+
+def build_bitmap(intervals: Iterable[tuple[date, date]]) -> int:
+    bits = 0
+    for check_in, check_out in intervals:
+        start = max(check_in, OCCUPANCY_EPOCH)
+        if check_out > start:
+            bits |= nights_mask(start, check_out)
+    return bits
+
+
+def room_bitmap(room: Room) -> int:
+    return unpack_bitmap(room.occupied_nights)
+
+
+def is_room_free(room: Room, checkin: date, checkout: date) -> bool | None:
+    """Whether every night of [checkin, checkout) is free; None if the range predates the index."""
+    if checkin < OCCUPANCY_EPOCH:
+        return None
+    return room_bitmap(room) & nights_mask(checkin, checkout) == 0
+
+
+def free_night_mask(room: Room, year: int, month: int) -> int | None:
+    """Bit d-1 set when the night of day d of the month is free; None if the month predates the index."""
+    month_start = date(year, month, 1)
+    if month_start < OCCUPANCY_EPOCH:
+        return None
+    days = calendar.monthrange(year, month)[1]
+    occupied = (room_bitmap(room) >> night_offset(month_start)) & ((1 << days) - 1)
+    return ~occupied & ((1 << days) - 1)
+
+
+def expected_bitmaps(room_ids: Iterable[int]) -> dict[int, int]:
+    room_ids = list(room_ids)
+    bitmaps = {room_id: 0 for room_id in room_ids}
+    rows = (
+        Reservation.objects.filter(room_id__in=room_ids, check_out_date__gt=OCCUPANCY_EPOCH)
+        .exclude(status=ReservationStatus.CANCELED)
+        .values_list("room_id", "check_in_date", "check_out_date")
+    )
+    for room_id, check_in, check_out in rows:
+        bitmaps[room_id] |= build_bitmap([(check_in, check_out)])
+    return bitmaps
+
+
+def occupied_masks(rooms: Sequence[Room], start: date, end: date) -> dict[int, int]:
+    """Per-room bit mask of booked nights in [start, end); bit i is the night of start + i days."""
+    masks = {room.id: 0 for room in rooms}
+    rows = (
+        Reservation.objects.filter(room_id__in=list(masks))
+        .exclude(status=ReservationStatus.CANCELED)
+        .filter(check_in_date__lt=end, check_out_date__gt=start)
+        .values_list("room_id", "check_in_date", "check_out_date")
+    )
+    for room_id, check_in, check_out in rows:
+        lo = max(check_in, start)
+        hi = min(check_out, end)
+        masks[room_id] |= ((1 << (hi - lo).days) - 1) << (lo - start).days
+    return masks
+
+
+@transaction.atomic
+def refresh_room_occupancy(room_ids: Iterable[int | None]) -> None:
+    """
+    Recompute the occupied-nights bitmap of the given rooms from their reservations.
+
+    Rooms are locked (FOR NO KEY UPDATE, in id order) before reading reservations, so
+    concurrent writers for the same room serialize instead of overwriting each other's bits.
+    Reservation inserts only need KEY SHARE on the room and are not blocked.
+    """
+    room_ids = sorted({room_id for room_id in room_ids if room_id})
+    if not room_ids:
+        return
+    rooms = list(Room.objects.select_for_update(no_key=True).filter(id__in=room_ids).order_by("id").only("id"))
+    bitmaps = expected_bitmaps([room.id for room in rooms])
+    for room in rooms:
+        room.occupied_nights = pack_bitmap(bitmaps[room.id])
+    Room.objects.bulk_update(rooms, ["occupied_nights"])
+
+
+@transaction.atomic
+def refresh_room_nights(stays: Iterable[tuple[int | None, date, date]]) -> None:
+    """
+    Recompute only the nights of the given (room_id, check_in, check_out) ranges.
+
+    Used per reservation write with its old and new stay: reads just the reservations
+    overlapping those nights and splices them into the stored bitmap, so the cost does not
+    grow with the room's history. The room row is still locked (as in
+    refresh_room_occupancy) because the bitmap is read, modified and written back.
+    """
+    windows: dict[int, list[tuple[date, date]]] = defaultdict(list)
+    for room_id, check_in, check_out in stays:
+        start = max(check_in, OCCUPANCY_EPOCH)
+        if room_id and check_out > start:
+            windows[room_id].append((start, check_out))
+    if not windows:
+        return
+
+    rooms = list(
+        Room.objects.select_for_update(no_key=True)
+        .filter(id__in=list(windows))
+        .order_by("id")
+        .only("id", "occupied_nights")
+    )
+    overlapping = Q()
+    for room_id, ranges in windows.items():
+        for start, end in ranges:
+            overlapping |= Q(room_id=room_id, check_in_date__lt=end, check_out_date__gt=start)
+    booked: dict[int, list[tuple[date, date]]] = defaultdict(list)
+    rows = (
+        Reservation.objects.filter(overlapping)
+        .exclude(status=ReservationStatus.CANCELED)
+        .values_list("room_id", "check_in_date", "check_out_date")
+    )
+    for room_id, check_in, check_out in rows:
+        booked[room_id].append((check_in, check_out))
+
+    for room in rooms:
+        window = 0
+        for start, end in windows[room.id]:
+            window |= nights_mask(start, end)
+        bits = (room_bitmap(room) & ~window) | (build_bitmap(booked[room.id]) & window)
+        room.occupied_nights = pack_bitmap(bits)
+    Room.objects.bulk_update(rooms, ["occupied_nights"])
@@ -0,0 +1,243 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Iterable
+
+from django.db.models import Prefetch
+
+from rooms.models import Room, RoomTypePricingPlan, RoomTypePricingRule
+
+
+def _rule_sort_key(rule: RoomTypePricingRule) -> tuple[int, int, int, int]:
+    # Same precedence as the historical per-night resolver:
+    # rule type priority, then occupancy specificity, then sort_order, then lowest id.
+    specificity = (1 if rule.adults_count is not None else 0) + (1 if rule.children_count is not None else 0)
+    return (rule.priority, specificity, rule.sort_order, -rule.id)
+
+
+@dataclass
+class CompiledPlan:
+    """
+    Pricing plan with its active rules bucketed by the calendar attribute they match on.
+
+    Lookups for a night only touch the buckets for that date's month, ISO week,
+    weekday and exact date (plus season rules), instead of scanning every rule.
+    """
+
+    plan: RoomTypePricingPlan
+    valid_from: date | None
+    valid_to: date | None
+    base_price: Decimal
+    season: list[RoomTypePricingRule] = field(default_factory=list)
+    by_month: dict[int, list[RoomTypePricingRule]] = field(default_factory=lambda: defaultdict(list))
+    by_iso_week: dict[int, list[RoomTypePricingRule]] = field(default_factory=lambda: defaultdict(list))
+    by_weekday: dict[int, list[RoomTypePricingRule]] = field(default_factory=lambda: defaultdict(list))
+    by_date: dict[date, list[RoomTypePricingRule]] = field(default_factory=lambda: defaultdict(list))
+
+    @classmethod
+    def compile(cls, plan: RoomTypePricingPlan, rules: Iterable[RoomTypePricingRule]) -> "CompiledPlan":
+        compiled = cls(
+            plan=plan,
+            valid_from=plan.valid_from,
+            valid_to=plan.valid_to,
+            base_price=plan.base_price_per_night,
+        )
+        for rule in rules:
+            if not rule.is_active:
+                continue
+            if rule.rule_type == RoomTypePricingRule.TYPE_SEASON:
+                compiled.season.append(rule)
+            elif rule.rule_type == RoomTypePricingRule.TYPE_MONTH:
+                if rule.month is not None:
+                    compiled.by_month[rule.month].append(rule)
+            elif rule.rule_type == RoomTypePricingRule.TYPE_WEEK:
+                if rule.iso_week is not None:
+                    compiled.by_iso_week[rule.iso_week].append(rule)
+            elif rule.rule_type == RoomTypePricingRule.TYPE_DAY:
+                # A day rule matches on specific_date OR weekday; index it under both.
+                if rule.specific_date:
+                    compiled.by_date[rule.specific_date].append(rule)
+                if rule.weekday:
+                    compiled.by_weekday[rule.weekday].append(rule)
+        return compiled
+
+    def covers(self, target_date: date) -> bool:
+        if self.valid_from and target_date < self.valid_from:
+            return False
+        if self.valid_to and target_date > self.valid_to:
+            return False
+        return True
+
+    def candidate_rules(self, target_date: date) -> list[RoomTypePricingRule]:
+        candidates = list(self.season)
+        candidates.extend(self.by_month.get(target_date.month, ()))
+        candidates.extend(self.by_iso_week.get(target_date.isocalendar().week, ()))
+        day_rules = self.by_date.get(target_date, ())
+        candidates.extend(day_rules)
+        for rule in self.by_weekday.get(target_date.isoweekday(), ()):
+            # Rule with both specific_date and weekday may already be in via by_date.
+            if rule not in day_rules:
+                candidates.append(rule)
+        return candidates
+
+    def price(self, target_date: date, adults: int | None, children: int | None) -> Decimal:
+        best: RoomTypePricingRule | None = None
+        best_key: tuple[int, int, int, int] | None = None
+        for rule in self.candidate_rules(target_date):
+            if rule.valid_from and target_date < rule.valid_from:
+                continue
+            if rule.valid_to and target_date > rule.valid_to:
+                continue
+            if not rule.matches_occupancy_with_children(adults=adults, children=children):
+                continue
+            key = _rule_sort_key(rule)
+            if best_key is None or key > best_key:
+                best, best_key = rule, key
+        if best is not None:
+            return best.price_per_night
+        return self.base_price
+
+
+class StayTotals:
+    """
+    Prefix sums of nightly prices over [start, end) for one room and occupancy.
+
+    Any stay inside the window is totalled in O(1); stays touching a night without
+    an applicable plan are None, like RateEngine.total.
+    """
+
+    def __init__(self, start: date, prices: list[Decimal | None]):
+        self.start = start
+        self.end = start + timedelta(days=len(prices))
+        self._sums = [Decimal("0.00")]
+        self._gaps = [0]
+        for price in prices:
+            self._sums.append(self._sums[-1] + (price if price is not None else 0))
+            self._gaps.append(self._gaps[-1] + (1 if price is None else 0))
+
+    def total(self, checkin: date, checkout: date) -> Decimal | None:
+        if checkin < self.start or checkout > self.end:
+            raise ValueError(f"Stay {checkin}..{checkout} is outside {self.start}..{self.end}.")
+        if checkout <= checkin:
+            return Decimal("0.00")
+        i = (checkin - self.start).days
+        j = (checkout - self.start).days
+        if self._gaps[j] - self._gaps[i]:
+            return None
+        return self._sums[j] - self._sums[i]
+
+
+class RateEngine:
+    """
+    In-memory nightly rate resolver for a set of rooms.
+
+    Loads every active pricing plan (and its active rules) for the given rooms in
+    two queries, then answers price/total lookups without further DB access.
+    Results match `resolve_price_for_date` / `accommodation_total_for_period`.
+    """
+
+    def __init__(self, plans_by_room: dict[int, list[CompiledPlan]]):
+        self._plans_by_room = plans_by_room
+        self._cache: dict[tuple[int, date, int | None, int | None], Decimal | None] = {}
+
+    @classmethod
+    def for_rooms(cls, rooms: Iterable[Room | int]) -> "RateEngine":
+        room_ids = sorted({r if isinstance(r, int) else r.id for r in rooms})
+        plans_by_room: dict[int, list[CompiledPlan]] = {room_id: [] for room_id in room_ids}
+        if not room_ids:
+            return cls(plans_by_room)
+
+        plans = (
+            RoomTypePricingPlan.objects.filter(room_id__in=room_ids, is_active=True)
+            .prefetch_related(
+                Prefetch(
+                    "rules",
+                    queryset=RoomTypePricingRule.objects.filter(is_active=True).order_by("sort_order", "id"),
+                )
+            )
+            .order_by("room_id", "-is_default", "code")
+        )
+        for plan in plans:
+            plans_by_room[plan.room_id].append(CompiledPlan.compile(plan, plan.rules.all()))
+        return cls(plans_by_room)
+
+    def _room_id(self, room: Room | int) -> int:
+        return room if isinstance(room, int) else room.id
+
+    def plan_for(self, room: Room | int, target_date: date) -> RoomTypePricingPlan | None:
+        compiled = self._compiled_plan_for(self._room_id(room), target_date)
+        return compiled.plan if compiled else None
+
+    def _compiled_plan_for(self, room_id: int, target_date: date) -> CompiledPlan | None:
+        plans = self._plans_by_room.get(room_id)
+        if plans is None:
+            raise KeyError(f"Room id={room_id} was not loaded into this RateEngine.")
+        for compiled in plans:
+            if compiled.covers(target_date):
+                return compiled
+        return None
+
+    def price(
+        self,
+        room: Room | int,
+        target_date: date,
+        adults: int | None = None,
+        children: int | None = None,
+    ) -> Decimal | None:
+        room_id = self._room_id(room)
+        key = (room_id, target_date, adults, children)
+        if key in self._cache:
+            return self._cache[key]
+        compiled = self._compiled_plan_for(room_id, target_date)
+        value = compiled.price(target_date, adults, children) if compiled else None
+        self._cache[key] = value
+        return value
+
+    def nightly_prices(
+        self,
+        room: Room | int,
+        start: date,
+        end: date,
+        adults: int | None = None,
+        children: int | None = None,
+    ) -> list[Decimal | None]:
+        """Nightly prices for [start, end); `None` for nights without an applicable plan."""
+        prices: list[Decimal | None] = []
+        day = start
+        while day < end:
+            prices.append(self.price(room, day, adults=adults, children=children))
+            day += timedelta(days=1)
+        return prices
+
+    def stay_totals(
+        self,
+        room: Room | int,
+        start: date,
+        end: date,
+        adults: int | None = None,
+        children: int | None = None,
+    ) -> StayTotals:
+        return StayTotals(start, self.nightly_prices(room, start, end, adults=adults, children=children))
+
+    def total(
+        self,
+        room: Room | int,
+        checkin: date,
+        checkout: date,
+        adults: int | None = None,
+        children: int | None = None,
+    ) -> Decimal | None:
+        if checkout <= checkin:
+            return Decimal("0.00")
+        total = Decimal("0.00")
+        day = checkin
+        while day < checkout:
+            daily_price = self.price(room, day, adults=adults, children=children)
+            if daily_price is None:
+                return None
+            total += daily_price
+            day += timedelta(days=1)
+        return total
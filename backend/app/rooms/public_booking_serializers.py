@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+from datetime import date
+
 from rest_framework import serializers
 
 
@@ -15,6 +17,26 @@ class PublicAvailabilityQuerySerializer(serializers.Serializer):
         return attrs
 
 
+class PublicFlexibleSearchQuerySerializer(serializers.Serializer):
+    checkin_from = serializers.DateField()
+    checkin_to = serializers.DateField()
+    min_nights = serializers.IntegerField(min_value=1, max_value=30, required=False, default=1)
+    max_nights = serializers.IntegerField(min_value=1, max_value=30, required=False, default=7)
+    adults = serializers.IntegerField(min_value=1)
+    children = serializers.IntegerField(min_value=0, required=False, default=0)
+
+    def validate(self, attrs):
+        if attrs["checkin_to"] < attrs["checkin_from"]:
+            raise serializers.ValidationError({"checkin_to": "checkin_to ne smije biti prije checkin_from."})
+        if (attrs["checkin_to"] - attrs["checkin_from"]).days > 30:
+            raise serializers.ValidationError({"checkin_to": "Raspon checkin datuma može biti najviše 31 dan."})
+        if attrs["max_nights"] < attrs["min_nights"]:
+            raise serializers.ValidationError({"max_nights": "max_nights mora biti >= min_nights."})
+        if (date.max - attrs["checkin_to"]).days < attrs["max_nights"]:
+            raise serializers.ValidationError({"max_nights": "Boravak ne smije završiti nakon najvećeg podržanog datuma."})
+        return attrs
+
+
 class PublicRoomCalendarQuerySerializer(serializers.Serializer):
     month = serializers.RegexField(
         regex=r"^\d{4}-\d{2}$",
@@ -24,6 +46,16 @@ class PublicRoomCalendarQuerySerializer(serializers.Serializer):
     children = serializers.IntegerField(min_value=0, required=False, default=0)
 
 
+class PublicGridQuerySerializer(serializers.Serializer):
+    start = serializers.RegexField(
+        regex=r"^\d{4}-\d{2}$",
+        help_text="First month, format: YYYY-MM",
+    )
+    months = serializers.IntegerField(min_value=1, max_value=12, required=False, default=3)
+    adults = serializers.IntegerField(min_value=1, required=False, allow_null=True, default=None)
+    children = serializers.IntegerField(min_value=0, required=False, default=0)
+
+
 class PublicPricingSerializer(serializers.Serializer):
     currency = serializers.CharField()
     accommodation_total = serializers.CharField(allow_null=True, required=False)
@@ -65,6 +97,30 @@ class PublicAvailabilityResponseSerializer(serializers.Serializer):
     combos = PublicAvailabilityComboSerializer(many=True)
 
 
+class PublicFlexibleComboSerializer(serializers.Serializer):
+    rooms_count = serializers.IntegerField()
+    allocation = PublicComboAllocationSerializer(many=True)
+    pricing = PublicPricingSerializer()
+
+
+class PublicFlexibleCellSerializer(serializers.Serializer):
+    checkin = serializers.DateField()
+    checkout = serializers.DateField()
+    nights = serializers.IntegerField()
+    available_rooms = serializers.IntegerField()
+    combo = PublicFlexibleComboSerializer(allow_null=True)
+
+
+class PublicFlexibleSearchResponseSerializer(serializers.Serializer):
+    checkin_from = serializers.DateField()
+    checkin_to = serializers.DateField()
+    min_nights = serializers.IntegerField()
+    max_nights = serializers.IntegerField()
+    adults = serializers.IntegerField()
+    children = serializers.IntegerField()
+    cells = PublicFlexibleCellSerializer(many=True)
+
+
 class PublicRoomCalendarDaySerializer(serializers.Serializer):
     date = serializers.DateField()
     available = serializers.BooleanField()
@@ -78,3 +134,26 @@ class PublicRoomCalendarResponseSerializer(serializers.Serializer):
     adults = serializers.IntegerField()
     children = serializers.IntegerField()
     days = PublicRoomCalendarDaySerializer(many=True)
+
+
+class PublicGridPriceSerializer(serializers.Serializer):
+    adults = serializers.IntegerField()
+    children = serializers.IntegerField()
+    nightly = serializers.ListField(child=serializers.CharField(allow_null=True))
+
+
+class PublicGridRoomSerializer(serializers.Serializer):
+    room_id = serializers.IntegerField()
+    room_code = serializers.CharField()
+    room_type_code = serializers.CharField()
+    capacity = serializers.IntegerField()
+    available = serializers.CharField(help_text="One character per night: 1 free, 0 booked.")
+    prices = PublicGridPriceSerializer(many=True)
+
+
+class PublicGridResponseSerializer(serializers.Serializer):
+    start = serializers.DateField()
+    end = serializers.DateField(help_text="Exclusive.")
+    days = serializers.IntegerField()
+    currency = serializers.CharField()
+    rooms = PublicGridRoomSerializer(many=True)
@@ -1,9 +1,16 @@
 from django.urls import path
 
-from rooms.public_booking_views import PublicAvailabilityView, PublicRoomCalendarView
+from rooms.public_booking_views import (
+    PublicAvailabilityView,
+    PublicFlexibleSearchView,
+    PublicGridView,
+    PublicRoomCalendarView,
+)
 
 
 urlpatterns = [
     path("availability/", PublicAvailabilityView.as_view(), name="public-availability"),
+    path("availability/flexible/", PublicFlexibleSearchView.as_view(), name="public-availability-flexible"),
+    path("grid/", PublicGridView.as_view(), name="public-grid"),
     path("rooms/<int:room_id>/calendar/", PublicRoomCalendarView.as_view(), name="public-room-calendar"),
 ]
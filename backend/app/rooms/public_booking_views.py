@@ -1,10 +1,9 @@
 from __future__ import annotations
 
 import calendar
-import itertools
 from datetime import date, datetime, timedelta
-from decimal import Decimal
 
+from django.conf import settings
 from drf_spectacular.utils import OpenApiExample, OpenApiParameter, OpenApiTypes, extend_schema
 from rest_framework import status
 from rest_framework.permissions import AllowAny
@@ -12,41 +11,25 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from reception.models import Reservation, ReservationStatus
+from rooms.combos import find_best_combos
+from rooms.flexible import flexible_date_cells
+from rooms.grid import property_grid
 from rooms.models import Room
+from rooms.occupancy import free_night_mask, is_room_free
 from rooms.public_booking_serializers import (
     PublicAvailabilityQuerySerializer,
     PublicAvailabilityResponseSerializer,
+    PublicFlexibleSearchQuerySerializer,
+    PublicFlexibleSearchResponseSerializer,
+    PublicGridQuerySerializer,
+    PublicGridResponseSerializer,
     PublicRoomCalendarQuerySerializer,
     PublicRoomCalendarResponseSerializer,
 )
-from rooms.services import accommodation_total_for_period, resolve_price_for_date
-
-
-def _room_capacity(room: Room) -> int:
-    # Temporary capacity map until we introduce explicit capacity fields on Room.
-    code = (room.code or "").upper()
-    rt_code = (room.room_type.code or "").upper()
-    if code.startswith("T") or rt_code in {"R3"}:
-        return 4
-    return 2
-
-
-def _allocate_party(*, capacities: list[int], adults: int, children: int) -> list[tuple[int, int]] | None:
-    remaining_adults = adults
-    remaining_children = children
-    allocation: list[tuple[int, int]] = []
-
-    for cap in capacities:
-        adults_here = min(remaining_adults, cap)
-        remaining_adults -= adults_here
-        free_after_adults = cap - adults_here
-        children_here = min(remaining_children, free_after_adults)
-        remaining_children -= children_here
-        allocation.append((adults_here, children_here))
-
-    if remaining_adults > 0 or remaining_children > 0:
-        return None
-    return allocation
+from rooms.pricing import RateEngine
+from rooms.public_cache import cached_public_response
+from rooms.rate_table import StayTotalsFromTable, ensure_rate_horizon
+from rooms.services import room_capacity
 
 
 class PublicAvailabilityView(APIView):
@@ -58,7 +41,7 @@ class PublicAvailabilityView(APIView):
         summary="Availability and combo recommendations (public)",
         description=(
             "Returns all active rooms with availability for date range, accommodation total (without tourist tax), "
-            "and 1-3 combo recommendations with allocation."
+            "and up to 3 combo recommendations (BOOKING_COMBO_MAX_ROOMS rooms each, default 3) with allocation."
         ),
         parameters=[
             OpenApiParameter("checkin", OpenApiTypes.DATE, OpenApiParameter.QUERY, required=True),
@@ -96,6 +79,7 @@ class PublicAvailabilityView(APIView):
             )
         ],
     )
+    @cached_public_response
     def get(self, request):
         qs = PublicAvailabilityQuerySerializer(data=request.query_params)
         qs.is_valid(raise_exception=True)
@@ -108,24 +92,33 @@ class PublicAvailabilityView(APIView):
         rooms = list(Room.objects.filter(is_active=True).select_related("room_type").order_by("code"))
         room_ids = [r.id for r in rooms]
 
-        overlaps = (
-            Reservation.objects.filter(room_id__in=room_ids)
-            .exclude(status=ReservationStatus.CANCELED)
-            .filter(check_in_date__lt=checkout, check_out_date__gt=checkin)
-            .values_list("room_id", flat=True)
-            .distinct()
-        )
-        unavailable_ids = set(overlaps)
+        free_by_room = {room.id: is_room_free(room, checkin, checkout) for room in rooms}
+        if None in free_by_room.values():
+            # Stay starts before the occupancy index; ask the reservations table directly.
+            overlaps = (
+                Reservation.objects.filter(room_id__in=room_ids)
+                .exclude(status=ReservationStatus.CANCELED)
+                .filter(check_in_date__lt=checkout, check_out_date__gt=checkin)
+                .values_list("room_id", flat=True)
+                .distinct()
+            )
+            unavailable_ids = set(overlaps)
+        else:
+            unavailable_ids = {room_id for room_id, free in free_by_room.items() if not free}
+
+        # Fully materialized stays are a single indexed SUM; anything else falls back to the engine.
+        ensure_rate_horizon()
+        totals = StayTotalsFromTable([r for r in rooms if r.id not in unavailable_ids], checkin, checkout)
 
         rooms_payload = []
         available_rooms = []
         for room in rooms:
             is_available = room.id not in unavailable_ids
-            capacity = _room_capacity(room)
+            capacity = room_capacity(room)
             can_host_party = capacity >= (adults + children)
             total = None
             if is_available and can_host_party:
-                total = accommodation_total_for_period(room, checkin, checkout, adults=adults, children=children)
+                total = totals.total(room, adults=adults, children=children)
 
             rooms_payload.append(
                 {
@@ -145,62 +138,14 @@ class PublicAvailabilityView(APIView):
             if is_available:
                 available_rooms.append(room)
 
-        combos: list[dict] = []
-        total_guests = adults + children
-        for size in (1, 2, 3):
-            for subset in itertools.combinations(available_rooms, size):
-                subset_caps = [_room_capacity(r) for r in subset]
-                if sum(subset_caps) < total_guests:
-                    continue
-
-                order = sorted(range(len(subset)), key=lambda i: subset_caps[i], reverse=True)
-                sorted_caps = [subset_caps[i] for i in order]
-                alloc_sorted = _allocate_party(capacities=sorted_caps, adults=adults, children=children)
-                if not alloc_sorted:
-                    continue
-
-                allocation: list[dict] = []
-                combo_total = Decimal("0.00")
-                valid_combo = True
-                for alloc_idx, room_idx in enumerate(order):
-                    room = subset[room_idx]
-                    ad, ch = alloc_sorted[alloc_idx]
-                    room_total = accommodation_total_for_period(room, checkin, checkout, adults=ad, children=ch)
-                    if room_total is None:
-                        valid_combo = False
-                        break
-                    combo_total += room_total
-                    allocation.append(
-                        {
-                            "room_id": room.id,
-                            "room_code": room.code,
-                            "adults": ad,
-                            "children": ch,
-                        }
-                    )
-                if not valid_combo:
-                    continue
-
-                allocation.sort(key=lambda x: x["room_code"])
-                combos.append(
-                    {
-                        "rooms_count": size,
-                        "allocation": allocation,
-                        "pricing": {
-                            "currency": "EUR",
-                            "accommodation_total": str(combo_total),
-                        },
-                    }
-                )
-
-        combos.sort(
-            key=lambda c: (
-                c["rooms_count"],
-                Decimal(c["pricing"]["accommodation_total"]),
-                ",".join(str(a["room_id"]) for a in c["allocation"]),
-            )
+        combos = find_best_combos(
+            rooms=available_rooms,
+            adults=adults,
+            children=children,
+            room_total=lambda room, ad, ch: totals.total(room, adults=ad, children=ch),
+            max_rooms=settings.BOOKING_COMBO_MAX_ROOMS,
+            limit=3,
         )
-        combos = combos[:3]
         for i, combo in enumerate(combos, start=1):
             combo["code"] = f"combo-{i}"
 
@@ -218,6 +163,109 @@ class PublicAvailabilityView(APIView):
         )
 
 
+class PublicFlexibleSearchView(APIView):
+    permission_classes = [AllowAny]
+
+    @extend_schema(
+        tags=["Public"],
+        operation_id="public_flexible_search",
+        summary="Flexible-date search (public)",
+        description=(
+            "For every check-in date in [checkin_from, checkin_to] (max 31 days) and every stay length in "
+            "[min_nights, max_nights], returns the best combo (fewest rooms, then lowest accommodation total) "
+            "or null when the party cannot be hosted."
+        ),
+        parameters=[
+            OpenApiParameter("checkin_from", OpenApiTypes.DATE, OpenApiParameter.QUERY, required=True),
+            OpenApiParameter("checkin_to", OpenApiTypes.DATE, OpenApiParameter.QUERY, required=True),
+            OpenApiParameter("min_nights", OpenApiTypes.INT, OpenApiParameter.QUERY, required=False),
+            OpenApiParameter("max_nights", OpenApiTypes.INT, OpenApiParameter.QUERY, required=False),
+            OpenApiParameter("adults", OpenApiTypes.INT, OpenApiParameter.QUERY, required=True),
+            OpenApiParameter("children", OpenApiTypes.INT, OpenApiParameter.QUERY, required=False),
+        ],
+        responses={200: PublicFlexibleSearchResponseSerializer},
+    )
+    @cached_public_response
+    def get(self, request):
+        qs = PublicFlexibleSearchQuerySerializer(data=request.query_params)
+        qs.is_valid(raise_exception=True)
+        data = qs.validated_data
+
+        rooms = list(Room.objects.filter(is_active=True).select_related("room_type").order_by("code"))
+        cells = flexible_date_cells(
+            rooms=rooms,
+            checkin_from=data["checkin_from"],
+            checkin_to=data["checkin_to"],
+            min_nights=data["min_nights"],
+            max_nights=data["max_nights"],
+            adults=data["adults"],
+            children=data["children"],
+        )
+        return Response(
+            {
+                "checkin_from": data["checkin_from"].isoformat(),
+                "checkin_to": data["checkin_to"].isoformat(),
+                "min_nights": data["min_nights"],
+                "max_nights": data["max_nights"],
+                "adults": data["adults"],
+                "children": data["children"],
+                "cells": cells,
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
+class PublicGridView(APIView):
+    permission_classes = [AllowAny]
+
+    @extend_schema(
+        tags=["Public"],
+        operation_id="public_grid",
+        summary="Property availability and price grid (public)",
+        description=(
+            "Columnar availability and nightly prices (accommodation only) for all active rooms over "
+            "1-12 months starting at `start`. Without `adults`, prices are returned for every occupancy "
+            "each room can host."
+        ),
+        parameters=[
+            OpenApiParameter("start", OpenApiTypes.STR, OpenApiParameter.QUERY, required=True, description="YYYY-MM"),
+            OpenApiParameter("months", OpenApiTypes.INT, OpenApiParameter.QUERY, required=False),
+            OpenApiParameter("adults", OpenApiTypes.INT, OpenApiParameter.QUERY, required=False),
+            OpenApiParameter("children", OpenApiTypes.INT, OpenApiParameter.QUERY, required=False),
+        ],
+        responses={200: PublicGridResponseSerializer},
+    )
+    @cached_public_response
+    def get(self, request):
+        qs = PublicGridQuerySerializer(data=request.query_params)
+        qs.is_valid(raise_exception=True)
+        data = qs.validated_data
+
+        try:
+            start = datetime.strptime(f"{data['start']}-01", "%Y-%m-%d").date()
+        except ValueError:
+            return Response({"start": "Invalid month format. Use YYYY-MM."}, status=status.HTTP_400_BAD_REQUEST)
+        month_index = start.year * 12 + start.month - 1 + data["months"]
+        if month_index // 12 > date.max.year:
+            return Response(
+                {"months": "Month range ends after the last supported date."}, status=status.HTTP_400_BAD_REQUEST
+            )
+        end = date(month_index // 12, month_index % 12 + 1, 1)
+
+        occupancy = (data["adults"], data["children"]) if data["adults"] else None
+        rooms = list(Room.objects.filter(is_active=True).select_related("room_type").order_by("code"))
+        return Response(
+            {
+                "start": start.isoformat(),
+                "end": end.isoformat(),
+                "days": (end - start).days,
+                "currency": "EUR",
+                "rooms": property_grid(rooms=rooms, start=start, end=end, occupancy=occupancy),
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
 class PublicRoomCalendarView(APIView):
     permission_classes = [AllowAny]
 
@@ -237,6 +285,7 @@ class PublicRoomCalendarView(APIView):
         ],
         responses={200: PublicRoomCalendarResponseSerializer},
     )
+    @cached_public_response
     def get(self, request, room_id: int):
         room = Room.objects.filter(id=room_id, is_active=True).select_related("room_type").first()
         if not room:
@@ -256,22 +305,38 @@ class PublicRoomCalendarView(APIView):
         _, last_day = calendar.monthrange(month_start.year, month_start.month)
         month_end = date(month_start.year, month_start.month, last_day) + timedelta(days=1)
 
-        reservations = list(
-            Reservation.objects.filter(room_id=room.id)
-            .exclude(status=ReservationStatus.CANCELED)
-            .filter(check_in_date__lt=month_end, check_out_date__gt=month_start)
-            .values("check_in_date", "check_out_date")
+        days_in_month = (month_end - month_start).days
+        free_mask = free_night_mask(room, month_start.year, month_start.month)
+        if free_mask is not None:
+            booked = [not (free_mask >> i) & 1 for i in range(days_in_month)]
+        else:
+            # Month predates the occupancy index: sweep reservation boundaries once instead of
+            # testing every reservation against every day.
+            delta = [0] * (days_in_month + 1)
+            intervals = (
+                Reservation.objects.filter(room_id=room.id)
+                .exclude(status=ReservationStatus.CANCELED)
+                .filter(check_in_date__lt=month_end, check_out_date__gt=month_start)
+                .values_list("check_in_date", "check_out_date")
+            )
+            for check_in, check_out in intervals:
+                delta[(max(check_in, month_start) - month_start).days] += 1
+                delta[(min(check_out, month_end) - month_start).days] -= 1
+            booked = []
+            active = 0
+            for i in range(days_in_month):
+                active += delta[i]
+                booked.append(active > 0)
+
+        nightly_prices = RateEngine.for_rooms([room]).nightly_prices(
+            room, month_start, month_end, adults=adults, children=children
         )
 
         days = []
-        d = month_start
-        while d < month_end:
-            day_end = d + timedelta(days=1)
-            is_booked = any(r["check_in_date"] < day_end and r["check_out_date"] > d for r in reservations)
-            nightly = resolve_price_for_date(room, d, adults=adults, children=children)
+        for i, (is_booked, nightly) in enumerate(zip(booked, nightly_prices)):
             days.append(
                 {
-                    "date": d.isoformat(),
+                    "date": (month_start + timedelta(days=i)).isoformat(),
                     "available": not is_booked,
                     "pricing": {
                         "currency": "EUR",
@@ -279,7 +344,6 @@ class PublicRoomCalendarView(APIView):
                     },
                 }
             )
-            d = day_end
 
         return Response(
             {
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import functools
+import hashlib
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest, Now, TruncSecond
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.response import Response
+
+from rooms.models import PublicDataVersion
+
+VERSION_ROW_ID = 1
+
+
+def public_data_version() -> tuple[str, datetime]:
+    """
+    Global version of everything public availability/pricing responses depend on.
+
+    One primary-key read of the PublicDataVersion row. It lives in the database rather than
+    the cache so bumps from the booking worker process reach every web process.
+    """
+    row = PublicDataVersion.objects.filter(pk=VERSION_ROW_ID).values_list("counter", "changed_at").first()
+    if row is None:
+        version, _ = PublicDataVersion.objects.get_or_create(pk=VERSION_ROW_ID, defaults={"changed_at": timezone.now()})
+        row = (version.counter, version.changed_at)
+    counter, changed_at = row
+    return (f"{counter}:{changed_at.isoformat()}", changed_at)
+
+
+def bump_public_data_version() -> None:
+    """
+    Bump the version once the current transaction commits (once per transaction).
+
+    Call after writes that skip model signals (queryset update/bulk_update).
+    """
+    connection = transaction.get_connection()
+    if any(isinstance(func, _VersionBump) and not func.done for _, func, _ in connection.run_on_commit):
+        return
+    transaction.on_commit(_VersionBump())
+
+
+class _VersionBump:
+    done = False
+
+    def __call__(self):
+        self.done = True
+        # Whole seconds, at least one ahead of the previous value: Last-Modified has one-second
+        # resolution, so a second change within the same second must still move it forward.
+        updated = PublicDataVersion.objects.filter(pk=VERSION_ROW_ID).update(
+            counter=F("counter") + 1,
+            changed_at=Greatest(TruncSecond(Now()), F("changed_at") + timedelta(seconds=1)),
+        )
+        if not updated:
+            PublicDataVersion.objects.get_or_create(pk=VERSION_ROW_ID, defaults={"changed_at": timezone.now()})
+
+
+def _request_fingerprint(request, version: str) -> str:
+    params = sorted((key, value) for key in request.query_params for value in request.query_params.getlist(key))
+    raw = f"{version}|{request.path}|{params!r}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def cached_public_response(view_method):
+    """
+    Conditional GET + response cache for public, read-only APIView handlers.
+
+    ETag/Last-Modified derive from public_data_version(), so any committed write to
+    reservations, rooms or pricing changes them; If-None-Match/If-Modified-Since get a 304. Full 200
+    responses are cached under a key that includes the version, which makes entries
+    written before a change unreachable without explicit invalidation.
+    """
+
+    @functools.wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        version, last_modified = public_data_version()
+        fingerprint = _request_fingerprint(request, version)
+        etag = f'"{fingerprint}"'
+        timestamp = last_modified.timestamp()
+
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is None:
+            cache_key = f"public-response:{fingerprint}"
+            data = cache.get(cache_key)
+            if data is not None:
+                response = Response(data, status=status.HTTP_200_OK)
+            else:
+                response = view_method(self, request, *args, **kwargs)
+                if response.status_code != status.HTTP_200_OK:
+                    return response
+                cache.set(cache_key, response.data, settings.PUBLIC_RESPONSE_CACHE_SECONDS)
+
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(timestamp)
+        patch_cache_control(response, public=True, max_age=settings.PUBLIC_CACHE_MAX_AGE)
+        return response
+
+    return wrapper
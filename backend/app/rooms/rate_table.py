@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Iterable
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, Max, Sum
+from django.utils import timezone
+
+from rooms.locks import RATE_TABLE_LOCK_NAMESPACE, advisory_lock_key
+from rooms.models import Room, RoomRateDay
+from rooms.pricing import RateEngine
+from rooms.services import room_capacity
+
+
+def rate_horizon() -> tuple[date, date]:
+    """Half-open [start, end) window kept materialized in RoomRateDay."""
+    start = timezone.localdate()
+    return (start, start + timedelta(days=settings.ROOM_RATE_HORIZON_DAYS))
+
+
+# Local day this process last rolled the horizon forward (see ensure_rate_horizon).
+_horizon_checked_on: date | None = None
+
+
+def occupancy_keys(room: Room) -> list[tuple[int, int]]:
+    capacity = room_capacity(room)
+    return [(adults, children) for adults in range(1, capacity + 1) for children in range(0, capacity - adults + 1)]
+
+
+def rebuild_room_rates(
+    *,
+    room_ids: Iterable[int] | None = None,
+    start: date | None = None,
+    end: date | None = None,
+) -> int:
+    """
+    Recompute RoomRateDay rows for the given rooms over [start, end), clamped to the horizon.
+
+    Rooms that are inactive (or no longer exist) just lose their rows in that range.
+    Returns the number of rows written.
+    """
+    horizon_start, horizon_end = rate_horizon()
+    start = max(start or horizon_start, horizon_start)
+    end = min(end or horizon_end, horizon_end)
+
+    rooms_qs = Room.objects.select_related("room_type").order_by("code")
+    stale_qs = RoomRateDay.objects.all()
+    if room_ids is not None:
+        room_ids = sorted(set(room_ids))
+        rooms_qs = rooms_qs.filter(id__in=room_ids)
+        stale_qs = stale_qs.filter(room_id__in=room_ids)
+    if end <= start:
+        return 0
+
+    rooms = [room for room in rooms_qs if room.is_active]
+    rates = RateEngine.for_rooms(rooms)
+
+    rows: list[RoomRateDay] = []
+    for room in rooms:
+        keys = occupancy_keys(room)
+        day = start
+        while day < end:
+            for adults, children in keys:
+                price = rates.price(room, day, adults=adults, children=children)
+                if price is None:
+                    continue
+                rows.append(
+                    RoomRateDay(
+                        room=room,
+                        date=day,
+                        adults=adults,
+                        children=children,
+                        price_per_night=price,
+                        currency=rates.plan_for(room, day).currency,
+                    )
+                )
+            day += timedelta(days=1)
+
+    with transaction.atomic():
+        stale_qs.filter(date__gte=start, date__lt=end).delete()
+        RoomRateDay.objects.bulk_create(rows, batch_size=2000)
+    return len(rows)
+
+
+@transaction.atomic
+def extend_rate_horizon() -> int:
+    """
+    Materialize the days the horizon gained since the table was last built up to its end.
+
+    The horizon is measured from today, so without this the last materialized day stays
+    where the last full rebuild left it and stays near the end fall back to RateEngine.
+    Returns the number of rows written.
+    """
+    horizon_start, horizon_end = rate_horizon()
+    if connection.vendor == "postgresql":
+        # Concurrent extenders would insert the same (room, occupancy, date) rows.
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_xact_lock(%s)", [advisory_lock_key(RATE_TABLE_LOCK_NAMESPACE, 0)])
+    last = RoomRateDay.objects.aggregate(last=Max("date"))["last"]
+    if last is None:
+        # Never built: the initial build is `manage.py rebuild_room_rates`.
+        return 0
+    return rebuild_room_rates(start=max(last + timedelta(days=1), horizon_start), end=horizon_end)
+
+
+def ensure_rate_horizon() -> None:
+    """Roll the materialized horizon forward on the first call of each day in this process."""
+    global _horizon_checked_on
+    today = timezone.localdate()
+    if _horizon_checked_on != today:
+        extend_rate_horizon()
+        _horizon_checked_on = today
+
+
+def schedule_rate_rebuild(*, room_ids: Iterable[int], start: date | None = None, end: date | None = None) -> None:
+    """Rebuild after the surrounding transaction commits, so readers never see half-applied pricing."""
+    room_ids = sorted({room_id for room_id in room_ids if room_id})
+    if not room_ids:
+        return
+    transaction.on_commit(lambda: rebuild_room_rates(room_ids=room_ids, start=start, end=end))
+
+
+def totals_from_rate_table(
+    *,
+    room_ids: Iterable[int],
+    checkin: date,
+    checkout: date,
+    adults: int,
+    children: int,
+) -> dict[int, Decimal]:
+    """
+    Stay totals for rooms whose every night in [checkin, checkout) is materialized.
+
+    Rooms with gaps (outside horizon, no plan, not yet built) are omitted so callers
+    can fall back to RateEngine and keep identical results.
+    """
+    nights = (checkout - checkin).days
+    if nights <= 0:
+        return {}
+    rows = (
+        RoomRateDay.objects.filter(
+            room_id__in=list(room_ids),
+            adults=adults,
+            children=children,
+            date__gte=checkin,
+            date__lt=checkout,
+        )
+        .values("room_id")
+        .annotate(total=Sum("price_per_night"), nights=Count("id"))
+    )
+    return {row["room_id"]: row["total"] for row in rows if row["nights"] == nights}
+
+
+class StayTotalsFromTable:
+    """
+    Stay totals for one [checkin, checkout), read from RoomRateDay (one SUM per occupancy).
+
+    Only rooms with a night missing from the table are priced by a RateEngine, which is
+    loaded on the first such miss, so fully materialized searches never load pricing plans.
+    """
+
+    def __init__(self, rooms: list[Room], checkin: date, checkout: date):
+        self.rooms = rooms
+        self.checkin = checkin
+        self.checkout = checkout
+        self._totals: dict[tuple[int, int], dict[int, Decimal]] = {}
+        self._engine: RateEngine | None = None
+
+    def total(self, room: Room, *, adults: int, children: int) -> Decimal | None:
+        key = (adults, children)
+        if key not in self._totals:
+            self._totals[key] = totals_from_rate_table(
+                room_ids=[r.id for r in self.rooms],
+                checkin=self.checkin,
+                checkout=self.checkout,
+                adults=adults,
+                children=children,
+            )
+        total = self._totals[key].get(room.id)
+        if total is None:
+            if self._engine is None:
+                self._engine = RateEngine.for_rooms(self.rooms)
+            total = self._engine.total(room, self.checkin, self.checkout, adults=adults, children=children)
+        return total
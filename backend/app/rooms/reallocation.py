@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+import bisect
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from reception.changes import record_changes
+from reception.models import ROOM_OVERLAP_CONSTRAINT, ChangeEntity, Reservation, ReservationStatus
+from rooms.locks import lock_room_types
+from rooms.models import Room
+from rooms.occupancy import refresh_room_occupancy
+from rooms.public_cache import bump_public_data_version
+
+
+@dataclass(frozen=True)
+class Stay:
+    id: int
+    check_in: date
+    check_out: date
+    room_id: int
+    preferred_room_id: int | None = None
+
+
+@dataclass
+class ReallocationResult:
+    moves: dict[int, tuple[int, int]] = field(default_factory=dict)  # reservation id -> (from room, to room)
+    gap_nights_before: int = 0
+    gap_nights_after: int = 0
+    applied: bool = False
+
+
+def short_gap(nights: int, min_sellable: int) -> int:
+    # Free nights between two stays that no stay of min_sellable nights can use.
+    return nights if 0 < nights < min_sellable else 0
+
+
+def unsellable_nights(intervals_by_room: dict[int, list[tuple[date, date]]], min_sellable: int) -> int:
+    total = 0
+    for intervals in intervals_by_room.values():
+        ordered = sorted(intervals)
+        for (_, prev_end), (next_start, _) in zip(ordered, ordered[1:]):
+            total += short_gap((next_start - prev_end).days, min_sellable)
+    return total
+
+
+def solve_room_type(
+    *,
+    units: list[int],
+    fixed: dict[int, list[tuple[date, date]]],
+    stays: list[Stay],
+    min_sellable: int,
+) -> dict[int, int] | None:
+    """
+    Best-fit interval assignment of movable stays onto the units of one room type.
+
+    Stays with a preferred unit are placed first and get it whenever it is free; the rest go
+    in check-in order (longer first) to the free unit where they leave the fewest unsellable
+    nights, then the tightest fit after the previous stay, then unit order. Units keep their
+    fixed (checked-in / past) stays. Returns stay id -> unit id, or None when some stay
+    cannot be placed.
+    """
+    timeline: dict[int, list[tuple[date, date]]] = {unit: sorted(fixed.get(unit, [])) for unit in units}
+    order = sorted(
+        stays,
+        key=lambda s: (s.preferred_room_id not in timeline, s.check_in, -(s.check_out - s.check_in).days, s.id),
+    )
+
+    assignment: dict[int, int] = {}
+    for stay in order:
+        best_unit = None
+        best_key = None
+        for rank, unit in enumerate(units):
+            intervals = timeline[unit]
+            idx = bisect.bisect_right(intervals, (stay.check_in, date.max))
+            prev_end = intervals[idx - 1][1] if idx else None
+            next_start = intervals[idx][0] if idx < len(intervals) else None
+            if (prev_end and prev_end > stay.check_in) or (next_start and next_start < stay.check_out):
+                continue
+
+            gap_before = (stay.check_in - prev_end).days if prev_end else None
+            gap_after = (next_start - stay.check_out).days if next_start else None
+            cost = short_gap(gap_before or 0, min_sellable) + short_gap(gap_after or 0, min_sellable)
+            if gap_before is not None and gap_after is not None:
+                cost -= short_gap((next_start - prev_end).days, min_sellable)
+            key = (
+                unit != stay.preferred_room_id,
+                cost,
+                gap_before if gap_before is not None else float("inf"),
+                rank,
+            )
+            if best_key is None or key < best_key:
+                best_unit, best_key = unit, key
+        if best_unit is None:
+            return None
+        bisect.insort(timeline[best_unit], (stay.check_in, stay.check_out))
+        assignment[stay.id] = best_unit
+    return assignment
+
+
+@transaction.atomic
+def reallocate_rooms(*, start: date | None = None, days: int | None = None, dry_run: bool = False) -> ReallocationResult:
+    """
+    Re-solve physical room assignments of upcoming stays to minimize unsellable gaps.
+
+    Movable stays are expected, already assigned and check in within [start, start + days),
+    but not before today: checked-in/out stays and stays that already started stay where
+    they are, even when `start` lies in the past. Moves stay within the room type of the
+    current unit. Changes are applied with one bulk update and only when they reduce the
+    number of unsellable nights.
+    """
+    today = timezone.localdate()
+    start = start or today
+    end = start + timedelta(days=days or settings.REALLOCATION_HORIZON_DAYS)
+    first_movable = max(start, today)
+    min_sellable = settings.REALLOCATION_MIN_SELLABLE_NIGHTS
+
+    rooms = list(Room.objects.filter(is_active=True).order_by("code").values_list("id", "code", "room_type_id"))
+    units_by_type: dict[int, list[int]] = defaultdict(list)
+    type_of_room: dict[int, int] = {}
+    room_id_by_code: dict[str, int] = {}
+    for room_id, code, room_type_id in rooms:
+        units_by_type[room_type_id].append(room_id)
+        type_of_room[room_id] = room_type_id
+        room_id_by_code[code] = room_id
+
+    # Keep allocators out while assignments are rewritten, then read a stable picture.
+    lock_room_types(units_by_type)
+
+    fixed_by_type: dict[int, dict[int, list[tuple[date, date]]]] = defaultdict(lambda: defaultdict(list))
+    stays_by_type: dict[int, list[Stay]] = defaultdict(list)
+    rows = (
+        Reservation.objects.filter(room_id__in=list(type_of_room), check_out_date__gt=start)
+        .exclude(status=ReservationStatus.CANCELED)
+        .values_list("id", "room_id", "check_in_date", "check_out_date", "status", "preferred_room_code")
+    )
+    for reservation_id, room_id, check_in, check_out, status, preferred_code in rows:
+        room_type_id = type_of_room[room_id]
+        if status == ReservationStatus.EXPECTED and first_movable <= check_in < end:
+            stays_by_type[room_type_id].append(
+                Stay(
+                    id=reservation_id,
+                    check_in=check_in,
+                    check_out=check_out,
+                    room_id=room_id,
+                    preferred_room_id=room_id_by_code.get((preferred_code or "").upper()),
+                )
+            )
+        else:
+            fixed_by_type[room_type_id][room_id].append((check_in, check_out))
+
+    result = ReallocationResult()
+    for room_type_id, stays in stays_by_type.items():
+        units = units_by_type[room_type_id]
+        fixed = fixed_by_type[room_type_id]
+        current = {unit: list(fixed.get(unit, [])) for unit in units}
+        for stay in stays:
+            current[stay.room_id].append((stay.check_in, stay.check_out))
+        before = unsellable_nights(current, min_sellable)
+
+        assignment = solve_room_type(units=units, fixed=fixed, stays=stays, min_sellable=min_sellable)
+        after = before
+        if assignment is not None:
+            proposed = {unit: list(fixed.get(unit, [])) for unit in units}
+            for stay in stays:
+                proposed[assignment[stay.id]].append((stay.check_in, stay.check_out))
+            after = unsellable_nights(proposed, min_sellable)
+        result.gap_nights_before += before
+        if assignment is None or after >= before:
+            result.gap_nights_after += before
+            continue
+        result.gap_nights_after += after
+        for stay in stays:
+            if assignment[stay.id] != stay.room_id:
+                result.moves[stay.id] = (stay.room_id, assignment[stay.id])
+
+    if dry_run or not result.moves:
+        return result
+
+    now = timezone.now()
+    changed = [
+        Reservation(id=reservation_id, room_id=to_room, updated_at=now)
+        for reservation_id, (_, to_room) in sorted(result.moves.items())
+    ]
+    if connection.vendor == "postgresql":
+        # Swaps are only consistent once every row is updated, so check overlaps after the update.
+        with connection.cursor() as cursor:
+            cursor.execute(f'SET CONSTRAINTS "{ROOM_OVERLAP_CONSTRAINT}" DEFERRED')
+            Reservation.objects.bulk_update(changed, ["room", "updated_at"])
+            cursor.execute(f'SET CONSTRAINTS "{ROOM_OVERLAP_CONSTRAINT}" IMMEDIATE')
+    else:
+        Reservation.objects.bulk_update(changed, ["room", "updated_at"])
+    refresh_room_occupancy(room_id for move in result.moves.values() for room_id in move)
+    record_changes(ChangeEntity.RESERVATION, result.moves)
+    bump_public_data_version()
+    result.applied = True
+    return result
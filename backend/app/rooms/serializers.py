@@ -84,8 +84,7 @@ class RoomSerializer(serializers.ModelSerializer):
 
 
 class RoomReservationSerializer(serializers.ModelSerializer):
-    primary_guest_name = serializers.SerializerMethodField()
-    primary_guest_nationality_iso2 = serializers.SerializerMethodField()
+    primary_guest_nationality_iso2 = serializers.CharField(source="primary_guest_nationality", read_only=True)
 
     class Meta:
         model = Reservation
@@ -99,15 +98,3 @@ class RoomReservationSerializer(serializers.ModelSerializer):
             "primary_guest_name",
             "primary_guest_nationality_iso2",
         )
-
-    def get_primary_guest_name(self, obj):
-        primary = next((g for g in obj.guests.all() if g.is_primary), None)
-        if not primary:
-            return ""
-        return f"{primary.first_name} {primary.last_name}".strip()
-
-    def get_primary_guest_nationality_iso2(self, obj):
-        primary = next((g for g in obj.guests.all() if g.is_primary), None)
-        if not primary:
-            return ""
-        return (primary.nationality or "").strip().upper()
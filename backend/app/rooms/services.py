@@ -1,10 +1,11 @@
 from __future__ import annotations
 
 import re
-from datetime import date, timedelta
+from datetime import date
 from decimal import Decimal
 
 from rooms.models import Room, RoomType, RoomTypePricingPlan
+from rooms.pricing import RateEngine
 
 
 def preferred_room_code_from_parsed_room_name(text: str | None) -> str | None:
@@ -30,6 +31,15 @@ def preferred_room_code_from_parsed_room_name(text: str | None) -> str | None:
     return None
 
 
+def room_capacity(room: Room) -> int:
+    # Temporary capacity map until we introduce explicit capacity fields on Room.
+    code = (room.code or "").upper()
+    rt_code = (room.room_type.code or "").upper()
+    if code.startswith("T") or rt_code in {"R3"}:
+        return 4
+    return 2
+
+
 def resolve_room_type_from_text(text: str | None) -> RoomType | None:
     if not text:
         return None
@@ -77,28 +87,7 @@ def resolve_price_for_date(
     adults: int | None = None,
     children: int | None = None,
 ) -> Decimal | None:
-    plan = resolve_active_pricing_plan(room, target_date)
-    if not plan:
-        return None
-
-    matched_rules = [
-        r
-        for r in plan.rules.filter(is_active=True).order_by("sort_order", "id")
-        if r.matches_date(target_date) and r.matches_occupancy_with_children(adults=adults, children=children)
-    ]
-    if matched_rules:
-        # Prefer more specific occupancy rule (adults/children set) over generic one.
-        matched_rules.sort(
-            key=lambda r: (
-                r.priority,
-                (1 if r.adults_count is not None else 0) + (1 if r.children_count is not None else 0),
-                r.sort_order,
-                -r.id,
-            ),
-            reverse=True,
-        )
-        return matched_rules[0].price_per_night
-    return plan.base_price_per_night
+    return RateEngine.for_rooms([room]).price(room, target_date, adults=adults, children=children)
 
 
 def accommodation_total_for_period(
@@ -110,12 +99,4 @@ def accommodation_total_for_period(
 ) -> Decimal | None:
     if checkout <= checkin:
         return Decimal("0.00")
-    total = Decimal("0.00")
-    day = checkin
-    while day < checkout:
-        daily_price = resolve_price_for_date(room, day, adults=adults, children=children)
-        if daily_price is None:
-            return None
-        total += daily_price
-        day += timedelta(days=1)
-    return total
+    return RateEngine.for_rooms([room]).total(room, checkin, checkout, adults=adults, children=children)
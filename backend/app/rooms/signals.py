@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+from datetime import date, timedelta
+
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from reception.models import Reservation
+from rooms.models import Room, RoomTypePricingPlan, RoomTypePricingRule
+from rooms.occupancy import refresh_room_nights
+from rooms.public_cache import bump_public_data_version
+from rooms.rate_table import schedule_rate_rebuild
+
+
+def _rule_range(rule: RoomTypePricingRule) -> tuple[date | None, date | None]:
+    # Inclusive validity of a rule; None means open-ended.
+    start, end = rule.valid_from, rule.valid_to
+    if rule.rule_type == RoomTypePricingRule.TYPE_DAY and rule.specific_date and not rule.weekday:
+        start = max(start, rule.specific_date) if start else rule.specific_date
+        end = min(end, rule.specific_date) if end else rule.specific_date
+    return (start, end)
+
+
+def _exclusive_end(value: date | None) -> date | None:
+    if value is None:
+        return None
+    return value + timedelta(days=1)
+
+
+@receiver(pre_save, sender=RoomTypePricingPlan)
+def _remember_previous_plan_room(sender, instance: RoomTypePricingPlan, **kwargs):
+    instance._rate_previous_room_id = None
+    if instance.pk:
+        instance._rate_previous_room_id = (
+            RoomTypePricingPlan.objects.filter(pk=instance.pk).values_list("room_id", flat=True).first()
+        )
+
+
+@receiver(post_save, sender=RoomTypePricingPlan)
+@receiver(post_delete, sender=RoomTypePricingPlan)
+def _rebuild_rates_for_plan(sender, instance: RoomTypePricingPlan, **kwargs):
+    # Plan validity/default changes shift precedence across the whole horizon of the room.
+    schedule_rate_rebuild(room_ids=[instance.room_id, getattr(instance, "_rate_previous_room_id", None)])
+
+
+@receiver(pre_save, sender=RoomTypePricingRule)
+def _remember_previous_rule(sender, instance: RoomTypePricingRule, **kwargs):
+    instance._rate_previous = None
+    if instance.pk:
+        instance._rate_previous = (
+            RoomTypePricingRule.objects.filter(pk=instance.pk).select_related("pricing_plan").first()
+        )
+
+
+@receiver(post_save, sender=RoomTypePricingRule)
+@receiver(post_delete, sender=RoomTypePricingRule)
+def _rebuild_rates_for_rule(sender, instance: RoomTypePricingRule, **kwargs):
+    for rule in (instance, getattr(instance, "_rate_previous", None)):
+        if rule is None:
+            continue
+        room_id = RoomTypePricingPlan.objects.filter(pk=rule.pricing_plan_id).values_list("room_id", flat=True).first()
+        start, end = _rule_range(rule)
+        schedule_rate_rebuild(room_ids=[room_id], start=start, end=_exclusive_end(end))
+
+
+@receiver(post_save, sender=Room)
+def _rebuild_rates_for_room(sender, instance: Room, **kwargs):
+    # Activation and room type/code both affect which occupancies get materialized.
+    schedule_rate_rebuild(room_ids=[instance.id])
+
+
+def _stay(reservation: Reservation) -> tuple:
+    return (reservation.room_id, reservation.check_in_date, reservation.check_out_date, reservation.status)
+
+
+@receiver(pre_save, sender=Reservation)
+def _remember_previous_stay(sender, instance: Reservation, **kwargs):
+    # Rows loaded from the database already carry their stay (Reservation.from_db).
+    if instance.pk and not hasattr(instance, "_loaded_stay"):
+        instance._loaded_stay = (
+            Reservation.objects.filter(pk=instance.pk)
+            .values_list("room_id", "check_in_date", "check_out_date", "status")
+            .first()
+        )
+
+
+@receiver(post_save, sender=Reservation)
+def _refresh_occupancy_for_saved_reservation(sender, instance: Reservation, created: bool, **kwargs):
+    # Same transaction as the reservation write, so the bitmap never lags committed data.
+    previous = None if created else getattr(instance, "_loaded_stay", None)
+    current = _stay(instance)
+    instance._loaded_stay = current
+    if previous != current:
+        refresh_room_nights([stay[:3] for stay in (previous, current) if stay])
+
+
+@receiver(post_delete, sender=Reservation)
+def _refresh_occupancy_for_deleted_reservation(sender, instance: Reservation, **kwargs):
+    refresh_room_nights([_stay(instance)[:3]])
+
+
+@receiver(post_save, sender=Reservation)
+@receiver(post_delete, sender=Reservation)
+@receiver(post_save, sender=Room)
+@receiver(post_delete, sender=Room)
+@receiver(post_save, sender=RoomTypePricingPlan)
+@receiver(post_delete, sender=RoomTypePricingPlan)
+@receiver(post_save, sender=RoomTypePricingRule)
+@receiver(post_delete, sender=RoomTypePricingRule)
+def _bump_public_data_version(sender, **kwargs):
+    bump_public_data_version()
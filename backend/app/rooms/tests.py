@@ -0,0 +1,940 @@
+import itertools
+import logging
+import random
+import threading
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, tag
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.http import parse_http_date
+from rest_framework.test import APIClient
+
+from reception.models import Guest, Reservation, ReservationStatus
+from rooms import allocation as allocation_module
+from rooms import rate_table as rate_table_module
+from rooms.allocation import assign_room_for_reservation, lock_allocation_room_types
+from rooms.combos import allocate_party, find_best_combos
+from rooms.models import PublicDataVersion, Room, RoomRateDay, RoomType, RoomTypePricingPlan, RoomTypePricingRule
+from rooms.occupancy import free_night_mask, is_room_free
+from rooms.pricing import RateEngine
+from rooms.public_cache import _VersionBump
+from rooms.reallocation import Stay, reallocate_rooms, solve_room_type
+from rooms.rate_table import occupancy_keys, rebuild_room_rates, totals_from_rate_table
+from rooms.services import accommodation_total_for_period, resolve_price_for_date, room_capacity
+
+
+logger = logging.getLogger(__name__)
+
+
+def _reference_price(room, target_date, adults=None, children=None):
+    # Straightforward per-night resolver the rate engine must stay equivalent to.
+    for plan in RoomTypePricingPlan.objects.filter(room=room, is_active=True).order_by("-is_default", "code"):
+        if plan.valid_from and target_date < plan.valid_from:
+            continue
+        if plan.valid_to and target_date > plan.valid_to:
+            continue
+        matched = [
+            r
+            for r in plan.rules.filter(is_active=True)
+            if r.matches_date(target_date) and r.matches_occupancy_with_children(adults=adults, children=children)
+        ]
+        if not matched:
+            return plan.base_price_per_night
+        matched.sort(
+            key=lambda r: (
+                r.priority,
+                (1 if r.adults_count is not None else 0) + (1 if r.children_count is not None else 0),
+                r.sort_order,
+                -r.id,
+            ),
+            reverse=True,
+        )
+        return matched[0].price_per_night
+    return None
+
+
+class PricingFixtureMixin:
+    def _create_pricing(self):
+        self.rt = RoomType.objects.create(code="RTEST", name_i18n={"en": "Test Room"})
+        self.room = Room.objects.create(code="K1", room_type=self.rt)
+        self.plan = RoomTypePricingPlan.objects.create(
+            room=self.room,
+            code="STD",
+            name="Standard",
+            base_price_per_night=Decimal("80.00"),
+            valid_to=date(2026, 6, 30),
+            is_default=True,
+        )
+        self.summer = RoomTypePricingPlan.objects.create(
+            room=self.room,
+            code="A-SUMMER",
+            name="Summer",
+            base_price_per_night=Decimal("95.00"),
+            valid_from=date(2026, 7, 1),
+            valid_to=date(2026, 8, 31),
+        )
+        rule = RoomTypePricingRule.objects.create
+        rule(pricing_plan=self.plan, rule_type="season", price_per_night=Decimal("90.00"),
+             valid_from=date(2026, 6, 1), valid_to=date(2026, 9, 30))
+        rule(pricing_plan=self.plan, rule_type="month", month=6, price_per_night=Decimal("100.00"))
+        rule(pricing_plan=self.plan, rule_type="month", month=6, adults_count=1, price_per_night=Decimal("85.00"))
+        rule(pricing_plan=self.plan, rule_type="week", iso_week=24, price_per_night=Decimal("110.00"), sort_order=2)
+        rule(pricing_plan=self.plan, rule_type="week", iso_week=24, price_per_night=Decimal("111.00"), sort_order=2)
+        rule(pricing_plan=self.plan, rule_type="day", weekday=6, price_per_night=Decimal("120.00"))
+        rule(pricing_plan=self.plan, rule_type="day", weekday=6, specific_date=date(2026, 6, 3),
+             adults_count=2, children_count=1, price_per_night=Decimal("130.00"))
+        rule(pricing_plan=self.plan, rule_type="day", specific_date=date(2026, 6, 20),
+             price_per_night=Decimal("150.00"), is_active=False)
+        rule(pricing_plan=self.summer, rule_type="day", weekday=5, price_per_night=Decimal("140.00"))
+
+
+class RateEngineTests(PricingFixtureMixin, TestCase):
+    def setUp(self):
+        self._create_pricing()
+
+    def test_engine_matches_reference_resolver(self):
+        engine = RateEngine.for_rooms([self.room])
+        occupancies = [(None, None), (1, 0), (2, 0), (2, 1), (1, None)]
+        day = date(2026, 5, 25)
+        while day < date(2026, 9, 10):
+            for adults, children in occupancies:
+                self.assertEqual(
+                    engine.price(self.room, day, adults=adults, children=children),
+                    _reference_price(self.room, day, adults=adults, children=children),
+                    msg=f"{day} adults={adults} children={children}",
+                )
+            day += timedelta(days=1)
+
+    def test_total_uses_two_queries_regardless_of_length(self):
+        with self.assertNumQueries(2):
+            engine = RateEngine.for_rooms([self.room])
+            total = engine.total(self.room, date(2026, 6, 1), date(2026, 6, 15), adults=2, children=0)
+        expected = sum(
+            (_reference_price(self.room, date(2026, 6, 1) + timedelta(days=i), 2, 0) for i in range(14)),
+            Decimal("0.00"),
+        )
+        self.assertEqual(total, expected)
+
+    def test_wrappers_return_engine_results(self):
+        self.assertEqual(resolve_price_for_date(self.room, date(2026, 6, 3), adults=2, children=1), Decimal("130.00"))
+        self.assertEqual(
+            accommodation_total_for_period(self.room, date(2026, 7, 3), date(2026, 7, 5), adults=2),
+            Decimal("235.00"),
+        )
+        self.assertEqual(accommodation_total_for_period(self.room, date(2026, 7, 5), date(2026, 7, 5)), Decimal("0.00"))
+
+    def test_room_without_plan_has_no_price(self):
+        other = Room.objects.create(code="K2", room_type=self.rt)
+        engine = RateEngine.for_rooms([self.room, other])
+        self.assertIsNone(engine.price(other, date(2026, 6, 1)))
+        self.assertIsNone(engine.total(other, date(2026, 6, 1), date(2026, 6, 3)))
+
+
+class RoomRateTableTests(TestCase):
+    def setUp(self):
+        self.rt = RoomType.objects.create(code="R1", name_i18n={"en": "Deluxe King Room"})
+        self.room = Room.objects.create(code="K1", room_type=self.rt)
+        self.plan = RoomTypePricingPlan.objects.create(
+            room=self.room,
+            code="STD",
+            name="Standard",
+            base_price_per_night=Decimal("80.00"),
+            is_default=True,
+        )
+        self.start = timezone.localdate() + timedelta(days=3)
+
+    def test_rebuild_matches_engine_and_sums_stays(self):
+        RoomTypePricingRule.objects.create(
+            pricing_plan=self.plan, rule_type="day", weekday=6, price_per_night=Decimal("100.00")
+        )
+        rebuild_room_rates(room_ids=[self.room.id], end=self.start + timedelta(days=30))
+
+        engine = RateEngine.for_rooms([self.room])
+        checkout = self.start + timedelta(days=10)
+        totals = totals_from_rate_table(
+            room_ids=[self.room.id], checkin=self.start, checkout=checkout, adults=2, children=0
+        )
+        self.assertEqual(totals[self.room.id], engine.total(self.room, self.start, checkout, adults=2, children=0))
+        # Stays running past the materialized range are not answered from the table.
+        self.assertEqual(
+            totals_from_rate_table(
+                room_ids=[self.room.id],
+                checkin=self.start,
+                checkout=self.start + timedelta(days=60),
+                adults=2,
+                children=0,
+            ),
+            {},
+        )
+
+    def test_rule_save_rebuilds_affected_dates_on_commit(self):
+        rebuild_room_rates(room_ids=[self.room.id], end=self.start + timedelta(days=10))
+        with self.captureOnCommitCallbacks(execute=True):
+            RoomTypePricingRule.objects.create(
+                pricing_plan=self.plan,
+                rule_type="day",
+                specific_date=self.start,
+                price_per_night=Decimal("150.00"),
+            )
+        prices = dict(
+            RoomRateDay.objects.filter(room=self.room, adults=2, children=0).values_list("date", "price_per_night")
+        )
+        self.assertEqual(prices[self.start], Decimal("150.00"))
+        self.assertEqual(prices[self.start + timedelta(days=1)], Decimal("80.00"))
+
+    def test_horizon_rolls_forward(self):
+        today = timezone.localdate()
+        with self.settings(ROOM_RATE_HORIZON_DAYS=10):
+            rebuild_room_rates(room_ids=[self.room.id])
+            with mock.patch("rooms.rate_table.timezone.localdate", return_value=today + timedelta(days=3)):
+                written = rate_table_module.extend_rate_horizon()
+                self.assertEqual(rate_table_module.extend_rate_horizon(), 0)
+        dates = RoomRateDay.objects.filter(room=self.room, adults=2, children=0).values_list("date", flat=True)
+        self.assertEqual(max(dates), today + timedelta(days=12))
+        self.assertEqual(written, 3 * len(occupancy_keys(self.room)))
+
+    def test_public_search_skips_engine_when_materialized(self):
+        cache.clear()
+        params = {"checkin": self.start, "checkout": self.start + timedelta(days=3), "adults": 2}
+        with self.settings(ROOM_RATE_HORIZON_DAYS=30):
+            rebuild_room_rates(room_ids=[self.room.id])
+            # The daily horizon check runs too, and finds nothing to add.
+            with (
+                mock.patch.object(rate_table_module, "_horizon_checked_on", None),
+                mock.patch.object(rate_table_module.RateEngine, "for_rooms", wraps=RateEngine.for_rooms) as for_rooms,
+            ):
+                response = APIClient().get("/api/public/availability/", params)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["rooms"][0]["pricing"]["accommodation_total"], "240.00")
+        for_rooms.assert_not_called()
+
+
+def _brute_force_combos(rooms, adults, children, room_total, max_rooms, limit):
+    # The original exhaustive search: every 1..max_rooms subset, every member priced.
+    combos = []
+    for size in range(1, max_rooms + 1):
+        for subset in itertools.combinations(rooms, size):
+            caps = [room_capacity(r) for r in subset]
+            if sum(caps) < adults + children:
+                continue
+            order = sorted(range(len(subset)), key=lambda i: caps[i], reverse=True)
+            alloc = allocate_party(capacities=[caps[i] for i in order], adults=adults, children=children)
+            total = Decimal("0.00")
+            allocation = []
+            for alloc_idx, room_idx in enumerate(order):
+                ad, ch = alloc[alloc_idx]
+                price = room_total(subset[room_idx], ad, ch)
+                if price is None:
+                    break
+                total += price
+                allocation.append(
+                    {"room_id": subset[room_idx].id, "room_code": subset[room_idx].code, "adults": ad, "children": ch}
+                )
+            else:
+                allocation.sort(key=lambda x: x["room_code"])
+                combos.append(
+                    {
+                        "rooms_count": size,
+                        "allocation": allocation,
+                        "pricing": {"currency": "EUR", "accommodation_total": str(total)},
+                    }
+                )
+    combos.sort(
+        key=lambda c: (
+            c["rooms_count"],
+            Decimal(c["pricing"]["accommodation_total"]),
+            ",".join(str(a["room_id"]) for a in c["allocation"]),
+        )
+    )
+    return combos[:limit]
+
+
+class ComboSearchTests(TestCase):
+    def _rooms(self, count):
+        double = RoomType(code="R1")
+        triple = RoomType(code="R3")
+        rooms = []
+        for i in range(count):
+            prefix = "T" if i % 3 == 2 else "K"
+            rooms.append(Room(id=i + 1, code=f"{prefix}{i + 1:02d}", room_type=triple if prefix == "T" else double))
+        return sorted(rooms, key=lambda r: r.code)
+
+    def test_matches_exhaustive_search(self):
+        rng = random.Random(7)
+        for _ in range(40):
+            rooms = self._rooms(rng.randint(1, 9))
+            base = {r.id: Decimal(rng.choice(["60.00", "75.50", "80.00", "99.99"])) for r in rooms}
+            unpriced = {r.id for r in rooms if rng.random() < 0.1}
+
+            def room_total(room, ad, ch):
+                if room.id in unpriced:
+                    return None
+                return base[room.id] * 2 + Decimal(ad * 10 + ch * 5)
+
+            adults, children = rng.randint(1, 7), rng.randint(0, 3)
+            for max_rooms in (3, 4):
+                self.assertEqual(
+                    find_best_combos(
+                        rooms=rooms,
+                        adults=adults,
+                        children=children,
+                        room_total=room_total,
+                        max_rooms=max_rooms,
+                        limit=3,
+                    ),
+                    _brute_force_combos(rooms, adults, children, room_total, max_rooms, 3),
+                )
+
+    def test_each_allocation_is_priced_once(self):
+        rooms = self._rooms(12)
+        calls = []
+
+        def room_total(room, ad, ch):
+            calls.append((room.id, ad, ch))
+            return Decimal("100.00") + room.id
+
+        find_best_combos(rooms=rooms, adults=5, children=2, room_total=room_total, max_rooms=4, limit=3)
+        self.assertEqual(len(calls), len(set(calls)))
+
+
+class RoomOccupancyBitmapTests(TestCase):
+    def setUp(self):
+        self.rt = RoomType.objects.create(code="R1")
+        self.room = Room.objects.create(code="K1", room_type=self.rt)
+        self.other = Room.objects.create(code="K2", room_type=self.rt)
+
+    def _reservation(self, external_id, check_in, check_out, room=None, **kwargs):
+        return Reservation.objects.create(
+            external_id=external_id,
+            room_name="Deluxe King Room",
+            room_type=self.rt,
+            room=room or self.room,
+            check_in_date=check_in,
+            check_out_date=check_out,
+            **kwargs,
+        )
+
+    def test_bitmap_follows_reservation_writes(self):
+        reservation = self._reservation("A", date(2026, 6, 10), date(2026, 6, 12))
+        self.room.refresh_from_db()
+        self.assertFalse(is_room_free(self.room, date(2026, 6, 11), date(2026, 6, 13)))
+        self.assertTrue(is_room_free(self.room, date(2026, 6, 12), date(2026, 6, 14)))
+
+        mask = free_night_mask(self.room, 2026, 6)
+        self.assertEqual([day for day in range(1, 31) if not (mask >> (day - 1)) & 1], [10, 11])
+
+        reservation.room = self.other
+        reservation.save()
+        self.room.refresh_from_db()
+        self.other.refresh_from_db()
+        self.assertTrue(is_room_free(self.room, date(2026, 6, 10), date(2026, 6, 12)))
+        self.assertFalse(is_room_free(self.other, date(2026, 6, 10), date(2026, 6, 11)))
+
+        reservation.status = ReservationStatus.CANCELED
+        reservation.save()
+        self.other.refresh_from_db()
+        self.assertTrue(is_room_free(self.other, date(2026, 6, 10), date(2026, 6, 12)))
+
+    def test_moving_dates_updates_only_the_touched_nights(self):
+        self._reservation("A", date(2026, 3, 1), date(2026, 3, 3))
+        reservation = self._reservation("B", date(2026, 6, 10), date(2026, 6, 12))
+        # Drift outside the stay must be left alone: only the old and new nights are recomputed.
+        Room.objects.filter(id=self.room.id).update(occupied_nights=b"")
+
+        reservation = Reservation.objects.get(pk=reservation.pk)
+        reservation.check_in_date = date(2026, 6, 11)
+        reservation.check_out_date = date(2026, 6, 13)
+        reservation.save()
+        self.room.refresh_from_db()
+        self.assertTrue(is_room_free(self.room, date(2026, 6, 10), date(2026, 6, 11)))
+        self.assertFalse(is_room_free(self.room, date(2026, 6, 12), date(2026, 6, 13)))
+        self.assertTrue(is_room_free(self.room, date(2026, 3, 1), date(2026, 3, 3)))
+
+    def test_save_without_stay_change_skips_occupancy(self):
+        reservation = Reservation.objects.get(pk=self._reservation("A", date(2026, 6, 10), date(2026, 6, 12)).pk)
+        reservation.total_amount = Decimal("120.00")
+        with CaptureQueriesContext(connection) as queries:
+            reservation.save()
+        self.assertFalse([q for q in queries if "rooms_room" in q["sql"]])
+
+    def test_ranges_before_epoch_are_not_answered(self):
+        self.assertIsNone(is_room_free(self.room, date(2025, 12, 30), date(2026, 1, 2)))
+        self.assertIsNone(free_night_mask(self.room, 2025, 12))
+
+    def test_check_command_repairs_drift(self):
+        self._reservation("A", date(2026, 6, 10), date(2026, 6, 12))
+        Room.objects.filter(id=self.room.id).update(occupied_nights=b"")
+
+        out = StringIO()
+        call_command("check_room_occupancy", "--fix", stdout=out)
+        self.assertIn("repaired: rooms=1", out.getvalue())
+        self.room.refresh_from_db()
+        self.assertFalse(is_room_free(self.room, date(2026, 6, 10), date(2026, 6, 11)))
+
+
+class PublicResponseCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        # Version bumps wait for commit and coalesce per transaction; flush setUp's here.
+        with self.captureOnCommitCallbacks(execute=True):
+            rt = RoomType.objects.create(code="R1")
+            self.room = Room.objects.create(code="K1", room_type=rt)
+            self.plan = RoomTypePricingPlan.objects.create(
+                room=self.room, code="STD", name="Standard", base_price_per_night=Decimal("80.00"), is_default=True
+            )
+        self.client = APIClient()
+        self.params = {"checkin": "2026-07-01", "checkout": "2026-07-03", "adults": 2}
+
+    def test_etag_revalidation_and_invalidation(self):
+        first = self.client.get("/api/public/availability/", self.params)
+        self.assertEqual(first.status_code, 200)
+        etag = first["ETag"]
+        self.assertTrue(first.has_header("Last-Modified"))
+
+        not_modified = self.client.get("/api/public/availability/", self.params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(not_modified.status_code, 304)
+
+        with self.assertNumQueries(1):
+            cached = self.client.get("/api/public/availability/", self.params)
+        self.assertEqual(cached.json(), first.json())
+
+        other = self.client.get("/api/public/availability/", {**self.params, "adults": 1})
+        self.assertNotEqual(other["ETag"], etag)
+
+        self.plan.base_price_per_night = Decimal("95.00")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.plan.save()
+        changed = self.client.get("/api/public/availability/", self.params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual(changed.json()["rooms"][0]["pricing"]["accommodation_total"], "190.00")
+
+    def test_calendar_changes_with_reservations(self):
+        url = f"/api/public/rooms/{self.room.id}/calendar/"
+        first = self.client.get(url, {"month": "2026-07"})
+        with self.captureOnCommitCallbacks(execute=True):
+            Reservation.objects.create(
+                external_id="A",
+                room_name="x",
+                room=self.room,
+                check_in_date=date(2026, 7, 1),
+                check_out_date=date(2026, 7, 2),
+            )
+        second = self.client.get(url, {"month": "2026-07"}, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(second.status_code, 200)
+        self.assertFalse(second.json()["days"][0]["available"])
+
+    def test_last_modified_moves_forward_on_delete(self):
+        url = f"/api/public/rooms/{self.room.id}/calendar/"
+        with self.captureOnCommitCallbacks(execute=True):
+            reservation = Reservation.objects.create(
+                external_id="A",
+                room_name="x",
+                room=self.room,
+                check_in_date=date(2026, 7, 1),
+                check_out_date=date(2026, 7, 2),
+            )
+        first = self.client.get(url, {"month": "2026-07"})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            reservation.delete()
+        second = self.client.get(url, {"month": "2026-07"}, HTTP_IF_MODIFIED_SINCE=first["Last-Modified"])
+        self.assertEqual(second.status_code, 200)
+        self.assertTrue(second.json()["days"][0]["available"])
+        self.assertGreater(parse_http_date(second["Last-Modified"]), parse_http_date(first["Last-Modified"]))
+
+    def test_one_version_bump_per_transaction(self):
+        before = PublicDataVersion.objects.get().counter
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.plan.save()
+            self.room.save()
+        self.assertEqual(PublicDataVersion.objects.get().counter, before + 1)
+        self.assertEqual(sum(isinstance(callback, _VersionBump) for callback in callbacks), 1)
+
+
+class FlexibleSearchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        rt = RoomType.objects.create(code="R1")
+        rt3 = RoomType.objects.create(code="R3")
+        self.rooms = {}
+        for code, room_type, base in [("K1", rt, "70.00"), ("K2", rt, "75.00"), ("T1", rt3, "120.00")]:
+            room = Room.objects.create(code=code, room_type=room_type)
+            plan = RoomTypePricingPlan.objects.create(
+                room=room, code="STD", name="Standard", base_price_per_night=Decimal(base), is_default=True
+            )
+            RoomTypePricingRule.objects.create(
+                pricing_plan=plan,
+                rule_type=RoomTypePricingRule.TYPE_DAY,
+                weekday=6,
+                price_per_night=Decimal(base) + 15,
+            )
+            self.rooms[code] = room
+        Reservation.objects.create(
+            external_id="A",
+            room_name="x",
+            room=self.rooms["T1"],
+            check_in_date=date(2026, 7, 3),
+            check_out_date=date(2026, 7, 5),
+        )
+        self.client = APIClient()
+
+    def test_cells_match_single_stay_availability(self):
+        response = self.client.get(
+            "/api/public/availability/flexible/",
+            {"checkin_from": "2026-07-01", "checkin_to": "2026-07-05", "min_nights": 1, "max_nights": 3, "adults": 3},
+        )
+        self.assertEqual(response.status_code, 200)
+        cells = response.json()["cells"]
+        self.assertEqual(len(cells), 15)
+
+        for cell in cells:
+            single = self.client.get(
+                "/api/public/availability/",
+                {"checkin": cell["checkin"], "checkout": cell["checkout"], "adults": 3},
+            ).json()
+            expected = single["combos"][0] if single["combos"] else None
+            if expected:
+                expected.pop("code")
+            self.assertEqual(cell["combo"], expected, cell["checkin"])
+
+    def test_single_reservation_query(self):
+        with self.assertNumQueries(5):
+            self.client.get(
+                "/api/public/availability/flexible/",
+                {"checkin_from": "2026-07-01", "checkin_to": "2026-07-31", "max_nights": 14, "adults": 2},
+            )
+
+    def test_window_past_last_supported_date_is_rejected(self):
+        response = self.client.get(
+            "/api/public/availability/flexible/",
+            {"checkin_from": "9999-12-25", "checkin_to": "9999-12-31", "max_nights": 7, "adults": 2},
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("max_nights", response.json())
+
+
+class PublicGridTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        rt = RoomType.objects.create(code="R1")
+        self.rooms = []
+        for code in ("K1", "K2"):
+            room = Room.objects.create(code=code, room_type=rt)
+            plan = RoomTypePricingPlan.objects.create(
+                room=room, code="STD", name="Standard", base_price_per_night=Decimal("80.00"), is_default=True
+            )
+            RoomTypePricingRule.objects.create(
+                pricing_plan=plan,
+                rule_type=RoomTypePricingRule.TYPE_MONTH,
+                month=8,
+                adults_count=1,
+                price_per_night=Decimal("65.00"),
+            )
+            self.rooms.append(room)
+        Reservation.objects.create(
+            external_id="A",
+            room_name="x",
+            room=self.rooms[0],
+            check_in_date=date(2026, 7, 30),
+            check_out_date=date(2026, 8, 2),
+        )
+        self.client = APIClient()
+
+    def test_grid_is_columnar_and_matches_engine(self):
+        with self.assertNumQueries(5):
+            response = self.client.get("/api/public/grid/", {"start": "2026-07", "months": 12})
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual((body["start"], body["end"], body["days"]), ("2026-07-01", "2027-07-01", 365))
+
+        k1 = body["rooms"][0]
+        self.assertEqual(len(k1["available"]), 365)
+        self.assertEqual(k1["available"][28:33], "10001")
+        self.assertEqual(body["rooms"][1]["available"], "1" * 365)
+
+        by_occupancy = {(p["adults"], p["children"]): p["nightly"] for p in k1["prices"]}
+        self.assertEqual(set(by_occupancy), {(1, 0), (1, 1), (2, 0)})
+        self.assertEqual(by_occupancy[(1, 0)][30:32], ["80.00", "65.00"])
+        self.assertEqual(by_occupancy[(2, 0)][31], "80.00")
+
+    def test_single_occupancy(self):
+        response = self.client.get("/api/public/grid/", {"start": "2026-08", "months": 1, "adults": 1})
+        prices = response.json()["rooms"][0]["prices"]
+        self.assertEqual(len(prices), 1)
+        self.assertEqual(prices[0]["nightly"], ["65.00"] * 31)
+
+    def test_range_past_last_supported_date_is_rejected(self):
+        response = self.client.get("/api/public/grid/", {"start": "9999-12", "months": 1})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("months", response.json())
+        self.assertEqual(self.client.get("/api/public/grid/", {"start": "2026-13"}).status_code, 400)
+
+
+class PublicRoomCalendarTests(PricingFixtureMixin, TestCase):
+    def setUp(self):
+        self._create_pricing()
+        cache.clear()
+        self.client = APIClient()
+        for i, (check_in, check_out) in enumerate(
+            [
+                (date(2025, 11, 28), date(2025, 12, 2)),
+                (date(2025, 12, 10), date(2025, 12, 12)),
+                (date(2025, 12, 12), date(2025, 12, 14)),
+                (date(2025, 12, 30), date(2026, 1, 3)),
+                (date(2026, 2, 27), date(2026, 3, 2)),
+            ]
+        ):
+            Reservation.objects.create(
+                external_id=f"R{i}", room_name="x", room=self.room, check_in_date=check_in, check_out_date=check_out
+            )
+
+    def _expected_days(self, month_start, month_end, adults, children):
+        reservations = list(
+            Reservation.objects.filter(room=self.room).exclude(status=ReservationStatus.CANCELED)
+        )
+        days = []
+        d = month_start
+        while d < month_end:
+            nightly = resolve_price_for_date(self.room, d, adults=adults, children=children)
+            days.append(
+                {
+                    "date": d.isoformat(),
+                    "available": not any(r.check_in_date <= d < r.check_out_date for r in reservations),
+                    "pricing": {"currency": "EUR", "accommodation_nightly": str(nightly) if nightly is not None else None},
+                }
+            )
+            d += timedelta(days=1)
+        return days
+
+    def test_matches_per_day_reference_with_constant_queries(self):
+        url = f"/api/public/rooms/{self.room.id}/calendar/"
+        for month, month_start, month_end, queries in [
+            ("2025-12", date(2025, 12, 1), date(2026, 1, 1), 5),
+            ("2026-02", date(2026, 2, 1), date(2026, 3, 1), 4),
+            ("2026-06", date(2026, 6, 1), date(2026, 7, 1), 4),
+            ("2026-07", date(2026, 7, 1), date(2026, 8, 1), 4),
+        ]:
+            with self.assertNumQueries(queries):
+                response = self.client.get(url, {"month": month, "adults": 2, "children": 1})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json()["days"], self._expected_days(month_start, month_end, 2, 1), month)
+
+
+def _reference_allocation(reservation, preferred_code):
+    # Decision rules of the original per-room allocation loop, evaluated in memory.
+    def free(room):
+        return not any(
+            other.room_id == room.id
+            and other.id != reservation.id
+            and other.status != ReservationStatus.CANCELED
+            and other.check_in_date < reservation.check_out_date
+            and other.check_out_date > reservation.check_in_date
+            for other in Reservation.objects.all()
+        )
+
+    active = list(Room.objects.filter(is_active=True).order_by("code"))
+    preferred = next((r for r in active if r.code == preferred_code), None) if preferred_code else None
+    if preferred:
+        if free(preferred):
+            return (preferred.id, preferred.room_type_id)
+        for alt in active:
+            if alt.room_type_id == preferred.room_type_id and alt.id != preferred.id and free(alt):
+                return (alt.id, alt.room_type_id)
+    current = next((r for r in active if r.id == reservation.room_id), None)
+    if current and free(current):
+        return (current.id, reservation.room_type_id)
+    if not reservation.room_type_id:
+        return (reservation.room_id, reservation.room_type_id)
+    for room in active:
+        if room.room_type_id == reservation.room_type_id and free(room):
+            return (room.id, reservation.room_type_id)
+    return (reservation.room_id, reservation.room_type_id)
+
+
+class RoomAllocationTests(TestCase):
+    def _rooms(self, room_type, count, prefix):
+        return [Room.objects.create(code=f"{prefix}{i}", room_type=room_type) for i in range(1, count + 1)]
+
+    def test_decisions_match_reference_rules(self):
+        rng = random.Random(7)
+        types = [RoomType.objects.create(code="R1"), RoomType.objects.create(code="R2")]
+        rooms = self._rooms(types[0], 3, "K") + self._rooms(types[1], 2, "D")
+        rooms[2].is_active = False
+        rooms[2].save()
+        codes = [room.code for room in rooms] + ["X9", None]
+
+        for i in range(60):
+            check_in = date(2026, 7, 1) + timedelta(days=rng.randrange(20))
+            reservation = Reservation.objects.create(
+                external_id=f"A{i}",
+                room_name="x",
+                room_type=rng.choice(types + [None]),
+                check_in_date=check_in,
+                check_out_date=check_in + timedelta(days=rng.randrange(1, 5)),
+            )
+            if rng.random() < 0.3:
+                reservation.room = rng.choice(rooms)
+                try:
+                    reservation.save()
+                except ValidationError:
+                    reservation.room = None
+            preferred = rng.choice(codes)
+            expected = _reference_allocation(reservation, preferred)
+            assign_room_for_reservation(reservation_id=reservation.id, preferred_room_code=preferred)
+            reservation.refresh_from_db()
+            self.assertEqual((reservation.room_id, reservation.room_type_id), expected, i)
+
+    def test_query_count_does_not_depend_on_units(self):
+        counts = []
+        for units in (2, 10):
+            room_type = RoomType.objects.create(code=f"U{units}")
+            rooms = self._rooms(room_type, units, f"U{units}-")
+            for i, room in enumerate(rooms[:-1]):
+                Reservation.objects.create(
+                    external_id=f"U{units}-{i}",
+                    room_name="x",
+                    room=room,
+                    room_type=room_type,
+                    check_in_date=date(2026, 7, 1),
+                    check_out_date=date(2026, 7, 5),
+                )
+            reservation = Reservation.objects.create(
+                external_id=f"U{units}-new",
+                room_name="x",
+                room_type=room_type,
+                check_in_date=date(2026, 7, 2),
+                check_out_date=date(2026, 7, 4),
+            )
+            with CaptureQueriesContext(connection) as ctx:
+                room = assign_room_for_reservation(reservation_id=reservation.id, preferred_room_code=rooms[0].code)
+            self.assertEqual(room, rooms[-1])
+            counts.append(len(ctx.captured_queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_multi_room_lock_covers_preferred_types(self):
+        first, second = RoomType.objects.create(code="R1"), RoomType.objects.create(code="R2")
+        Room.objects.create(code="K1", room_type=second)
+        with mock.patch.object(allocation_module, "lock_room_types") as lock:
+            allocation_module.lock_allocation_room_types([(second.id, None), (first.id, "k1")])
+        lock.assert_called_once()
+        self.assertEqual(sorted(filter(None, lock.call_args.args[0])), [first.id, second.id, second.id])
+
+
+@tag("bench")
+class AllocationConcurrencyBench(TransactionTestCase):
+    """
+    N threads import overlapping stays concurrently and allocate them, the way parallel
+    booking emails do; no room may end up double-booked. Logs throughput and the time spent
+    waiting for allocation locks (INFO, rooms.tests). Run with `manage.py test --tag bench`.
+    """
+
+    threads = 8
+    per_thread = 6
+    units = 4
+
+    def test_parallel_allocation(self):
+        room_type = RoomType.objects.create(code="R1")
+        rooms = [Room.objects.create(code=f"K{i}", room_type=room_type) for i in range(1, self.units + 1)]
+        waits: list[float] = []
+        errors: list[BaseException] = []
+
+        def worker(worker_id: int):
+            try:
+                for i in range(self.per_thread):
+                    check_in = date(2026, 7, 1) + timedelta(days=(worker_id + i) % 5)
+                    with transaction.atomic():
+                        reservation = Reservation.objects.create(
+                            external_id=f"T{worker_id}-{i}",
+                            room_name="x",
+                            room_type=room_type,
+                            check_in_date=check_in,
+                            check_out_date=check_in + timedelta(days=2),
+                        )
+                        # Locks up front like the booking import; assign re-takes them for free.
+                        started = time.perf_counter()
+                        lock_allocation_room_types([(room_type.id, "K1")])
+                        waits.append(time.perf_counter() - started)
+                        assign_room_for_reservation(reservation_id=reservation.id, preferred_room_code="K1")
+            except BaseException as exc:  # surfaced in the main thread
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        started = time.perf_counter()
+        workers = [threading.Thread(target=worker, args=(n,)) for n in range(self.threads)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        self.assertEqual(errors, [])
+        total = self.threads * self.per_thread
+        assigned = list(Reservation.objects.filter(room__isnull=False).values_list("room_id", "check_in_date", "check_out_date"))
+        for room in rooms:
+            stays = sorted((ci, co) for room_id, ci, co in assigned if room_id == room.id)
+            self.assertTrue(all(prev[1] <= nxt[0] for prev, nxt in zip(stays, stays[1:])))
+
+        waits.sort()
+        logger.info(
+            "allocation bench: allocations=%d assigned=%d threads=%d elapsed=%.3fs throughput=%.1f/s "
+            "lock_wait_p50=%.1fms lock_wait_max=%.1fms",
+            total, len(assigned), self.threads, elapsed, total / elapsed,
+            waits[len(waits) // 2] * 1000, waits[-1] * 1000,
+        )
+
+
+class RoomReallocationTests(TestCase):
+    def setUp(self):
+        self.rt = RoomType.objects.create(code="R1")
+        self.k1 = Room.objects.create(code="K1", room_type=self.rt)
+        self.k2 = Room.objects.create(code="K2", room_type=self.rt)
+        # The stays below are in July 2026; only stays that have not started yet may move.
+        today = mock.patch("rooms.reallocation.timezone.localdate", return_value=date(2026, 6, 30))
+        self.today = today.start()
+        self.addCleanup(today.stop)
+
+    def _stay(self, external_id, room, check_in, nights, **kwargs):
+        return Reservation.objects.create(
+            external_id=external_id,
+            room_name="x",
+            room_type=self.rt,
+            room=room,
+            check_in_date=check_in,
+            check_out_date=check_in + timedelta(days=nights),
+            **kwargs,
+        )
+
+    def test_closes_one_night_gaps_with_a_single_swap(self):
+        self._stay("A", self.k1, date(2026, 7, 1), 2)
+        self._stay("B", self.k2, date(2026, 7, 2), 2)
+        c = self._stay("C", self.k1, date(2026, 7, 4), 2)
+        d = self._stay("D", self.k2, date(2026, 7, 5), 2)
+
+        result = reallocate_rooms(start=date(2026, 7, 1), days=30)
+        self.assertTrue(result.applied)
+        self.assertEqual((result.gap_nights_before, result.gap_nights_after), (2, 0))
+        self.assertEqual(result.moves, {c.id: (self.k1.id, self.k2.id), d.id: (self.k2.id, self.k1.id)})
+
+        c.refresh_from_db()
+        d.refresh_from_db()
+        self.assertEqual((c.room_id, d.room_id), (self.k2.id, self.k1.id))
+        self.k1.refresh_from_db()
+        self.assertFalse(is_room_free(self.k1, date(2026, 7, 5), date(2026, 7, 6)))
+        self.assertTrue(is_room_free(self.k1, date(2026, 7, 4), date(2026, 7, 5)))
+
+    def test_checked_in_and_preferred_stays_are_kept(self):
+        self._stay("A", self.k1, date(2026, 7, 1), 2, status=ReservationStatus.CHECKED_IN)
+        self._stay("B", self.k2, date(2026, 7, 2), 2)
+        c = self._stay("C", self.k1, date(2026, 7, 4), 2, preferred_room_code="K1")
+        self._stay("D", self.k2, date(2026, 7, 5), 2)
+
+        result = reallocate_rooms(start=date(2026, 7, 1), days=30, dry_run=True)
+        self.assertEqual(result.moves, {})
+        c.refresh_from_db()
+        self.assertEqual(c.room_id, self.k1.id)
+
+    def test_started_stays_are_kept_when_start_is_in_the_past(self):
+        self._stay("A", self.k1, date(2026, 7, 1), 2)
+        self._stay("B", self.k2, date(2026, 7, 2), 2)
+        self._stay("C", self.k1, date(2026, 7, 4), 2)
+        self._stay("D", self.k2, date(2026, 7, 5), 2)
+
+        # C began yesterday (not yet marked checked in) and must stay put, so D cannot swap with it.
+        self.today.return_value = date(2026, 7, 5)
+        result = reallocate_rooms(start=date(2026, 7, 1), days=30, dry_run=True)
+        self.assertEqual(result.moves, {})
+
+    def test_command_rejects_invalid_start(self):
+        for value in ["tomorrow", "2026-13-01"]:
+            with self.assertRaises(CommandError):
+                call_command("reallocate_rooms", "--start", value, "--dry-run", stdout=StringIO())
+
+    def test_solver_handles_a_year_quickly(self):
+        rng = random.Random(3)
+        units = [1, 2, 3, 4]
+        stays = []
+        free_from = {unit: date(2026, 1, 1) for unit in units}
+        for i in range(2000):
+            unit = rng.choice(units)
+            check_in = free_from[unit] + timedelta(days=rng.choice([0, 0, 1, 2]))
+            nights = rng.randint(1, 5)
+            if check_in + timedelta(days=nights) > date(2027, 1, 1):
+                continue
+            stays.append(Stay(id=i, check_in=check_in, check_out=check_in + timedelta(days=nights), room_id=unit))
+            free_from[unit] = check_in + timedelta(days=nights)
+
+        started = time.perf_counter()
+        assignment = solve_room_type(units=units, fixed={}, stays=stays, min_sellable=2)
+        elapsed = time.perf_counter() - started
+
+        self.assertIsNotNone(assignment)
+        self.assertLess(elapsed, 1.0)
+        timeline = {unit: [] for unit in units}
+        for stay in stays:
+            timeline[assignment[stay.id]].append((stay.check_in, stay.check_out))
+        for intervals in timeline.values():
+            intervals.sort()
+            self.assertTrue(all(a[1] <= b[0] for a, b in zip(intervals, intervals[1:])))
+
+
+class HouseViewTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_user("recepcija"))
+        rt = RoomType.objects.create(code="R1")
+        self.k1 = Room.objects.create(code="K1", room_type=rt)
+        self.k2 = Room.objects.create(code="K2", room_type=rt)
+
+        def stay(external_id, room, check_in, check_out, status=ReservationStatus.EXPECTED):
+            return Reservation.objects.create(
+                external_id=external_id,
+                room_name="Deluxe",
+                room=room,
+                check_in_date=check_in,
+                check_out_date=check_out,
+                status=status,
+            )
+
+        self.before = stay("A", self.k1, date(2026, 5, 28), date(2026, 6, 3))
+        self.inside = stay("B", self.k1, date(2026, 6, 5), date(2026, 6, 7))
+        self.after = stay("C", self.k2, date(2026, 6, 9), date(2026, 6, 20))
+        self.loose = stay("D", None, date(2026, 6, 2), date(2026, 6, 4))
+        stay("E", self.k2, date(2026, 6, 1), date(2026, 6, 5), status=ReservationStatus.CANCELED)
+        stay("F", self.k2, date(2026, 6, 10), date(2026, 6, 12), status=ReservationStatus.CANCELED)
+        Guest.objects.create(reservation=self.inside, first_name="Ana", last_name="Horvat", nationality="hr", is_primary=True)
+
+    def test_spans_are_clipped_offsets_per_room(self):
+        with self.assertNumQueries(2):
+            body = self.client.get("/api/rooms/house/", {"start": "2026-06-01", "days": 10}).json()
+
+        self.assertEqual((body["start"], body["end"], body["days"]), ("2026-06-01", "2026-06-11", 10))
+        spans = {row["room_code"]: row["spans"] for row in body["rooms"]}
+        self.assertEqual(
+            spans["K1"],
+            [
+                {"reservation": self.before.id, "offset": 0, "length": 2},
+                {"reservation": self.inside.id, "offset": 4, "length": 2},
+            ],
+        )
+        self.assertEqual(spans["K2"], [{"reservation": self.after.id, "offset": 8, "length": 2}])
+        self.assertEqual(body["unassigned"], [{"reservation": self.loose.id, "offset": 1, "length": 2}])
+
+        details = {row["id"]: row for row in body["reservations"]}
+        self.assertEqual(set(details), {self.before.id, self.inside.id, self.after.id, self.loose.id})
+        self.assertEqual(details[self.inside.id]["primary_guest_name"], "Ana Horvat")
+        self.assertEqual(details[self.inside.id]["primary_guest_nationality_iso2"], "HR")
+
+    def test_rejects_invalid_window(self):
+        for params in [{"start": "2026-13-01"}, {"days": "abc"}, {"days": 0}, {"days": 91}]:
+            self.assertEqual(self.client.get("/api/rooms/house/", params).status_code, 400, params)
@@ -1,8 +1,13 @@
+from django.utils import timezone
 from django.utils.dateparse import parse_date
 from rest_framework import generics
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
 from reception.models import Reservation, ReservationStatus
+from reception.pagination import KeysetPagination
+from rooms.house import house_view
 from rooms.models import Room, RoomType
 from rooms.serializers import RoomReservationSerializer, RoomSerializer, RoomTypeSerializer
 
@@ -48,13 +53,13 @@ class RoomListView(generics.ListAPIView):
 class RoomCalendarView(generics.ListAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = RoomReservationSerializer
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
         room_id = self.kwargs["room_id"]
         qs = (
             Reservation.objects.filter(room_id=room_id)
             .exclude(status=ReservationStatus.CANCELED)
-            .prefetch_related("guests")
             .order_by("check_in_date", "id")
         )
 
@@ -67,3 +72,27 @@ class RoomCalendarView(generics.ListAPIView):
         if date_to:
             qs = qs.filter(check_in_date__lt=date_to)
         return qs
+
+
+class HouseView(APIView):
+    permission_classes = [IsAuthenticated]
+    default_days = 14
+    max_days = 90
+
+    def get(self, request):
+        start_raw = (request.query_params.get("start") or "").strip()
+        try:
+            start = parse_date(start_raw) if start_raw else timezone.localdate()
+        except ValueError:
+            start = None
+        if start is None:
+            return Response({"detail": "Neispravan datum (YYYY-MM-DD)."}, status=400)
+        try:
+            days = int(request.query_params.get("days") or self.default_days)
+        except ValueError:
+            return Response({"detail": "Neispravan broj dana."}, status=400)
+        if not 1 <= days <= self.max_days:
+            return Response({"detail": f"Broj dana mora biti od 1 do {self.max_days}."}, status=400)
+
+        rooms = list(Room.objects.filter(is_active=True).select_related("room_type").order_by("code"))
+        return Response(house_view(rooms=rooms, start=start, days=days))
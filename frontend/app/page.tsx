@@ -226,7 +226,7 @@ export default function Home() {
       setLoading(true);
       setError("");
       try {
-        const params = new URLSearchParams();
+        const params = new URLSearchParams({ include_guests: "0" });
         if (status) params.set("status", status);
         if (search.trim()) params.set("search", search.trim());
         const query = params.toString();